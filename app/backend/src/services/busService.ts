@@ -2,7 +2,7 @@
 import {parse} from "csv-parse/sync";
 import {readFile} from "node:fs/promises";
 import {Arret, IncidentType, Ligne, LinePrediction, PredictionInput, PredictionOutput,} from "../Model/Model";
-import {getPrediction} from "./predictionService";
+import {getPrediction, getSnapshotPrediction} from "./predictionService";
 import {getWeather} from "./weatherService";
 
 // Define the prediction data interface for type safety
@@ -93,49 +93,58 @@ export async function getLinePrediction(id: string, incidents: IncidentType) {
     }
 
     try {
-        getWeather().then((data) => {
-            if(!data) throw new Error("Weather API returned null");
-            const inputData = {
-                ROUTE: Number(id),
-                LOCAL_TIME: data.LOCAL_TIME,
-                WEEK_DAY: data.WEEK_DAY,
-
-                INCIDENT: incidents,
-                LOCAL_MONTH: data.LOCAL_MONTH,
-                LOCAL_DAY: data.LOCAL_DAY,
-
-                TEMP: data.TEMP,
-                DEW_POINT_TEMP: data.DEW_POINT_TEMP,
-                HUMIDEX: data.HUMIDEX,
-                PRECIP_AMOUNT: data.PRECIP_AMOUNT,
-                RELATIVE_HUMIDITY: data.RELATIVE_HUMIDITY,
-                STATION_PRESSURE: data.STATION_PRESSURE,
-                VISIBILITY: data.VISIBILITY,
-                WEATHER_ENG_DESC: data.WEATHER_ENG_DESC,
-                WIND_DIRECTION: data.WIND_DIRECTION,
-                WIND_SPEED: data.WIND_SPEED,
-
-            }as PredictionInput;
-
-            getPrediction(inputData).then((prediction) => {
-                if (prediction.status == 200) {
-                    console.log("Prediction reussi:", prediction);
-                    return {
-                        status: prediction.status,
-                        prediction: prediction.prediction,
-                        incident: incidents,
-                        route: Number(id)
-                    } as PredictionOutput;
-                } else {
-                    return {
-                        status: prediction.status,
-                        prediction: null,
-                        incident: incidents,
-                        route: Number(id)
-                    }as PredictionOutput;
-                }
-            });
-        })
+        // Predictions of every route for the current weather are precomputed by the prediction API
+        const snapshotPrediction = await getSnapshotPrediction(Number(id), incidents);
+        if (snapshotPrediction !== null) {
+            return {
+                status: 200,
+                prediction: snapshotPrediction,
+                incident: incidents,
+                route: Number(id)
+            } as PredictionOutput;
+        }
+
+        // No snapshot yet (weather not published or still computing): score the route alone
+        const data = await getWeather();
+        if(!data) throw new Error("Weather API returned null");
+        const inputData = {
+            ROUTE: Number(id),
+            LOCAL_TIME: data.LOCAL_TIME,
+            WEEK_DAY: data.WEEK_DAY,
+
+            INCIDENT: incidents,
+            LOCAL_MONTH: data.LOCAL_MONTH,
+            LOCAL_DAY: data.LOCAL_DAY,
+
+            TEMP: data.TEMP,
+            DEW_POINT_TEMP: data.DEW_POINT_TEMP,
+            HUMIDEX: data.HUMIDEX,
+            PRECIP_AMOUNT: data.PRECIP_AMOUNT,
+            RELATIVE_HUMIDITY: data.RELATIVE_HUMIDITY,
+            STATION_PRESSURE: data.STATION_PRESSURE,
+            VISIBILITY: data.VISIBILITY,
+            WEATHER_ENG_DESC: data.WEATHER_ENG_DESC,
+            WIND_DIRECTION: data.WIND_DIRECTION,
+            WIND_SPEED: data.WIND_SPEED,
+
+        }as PredictionInput;
+
+        const prediction = await getPrediction(inputData);
+        if (prediction) {
+            console.log("Prediction reussi:", prediction);
+            return {
+                status: 200,
+                prediction: prediction.prediction,
+                incident: incidents,
+                route: Number(id)
+            } as PredictionOutput;
+        }
+        return {
+            status: 502,
+            prediction: null,
+            incident: incidents,
+            route: Number(id)
+        }as PredictionOutput;
     } catch (error) {
         console.error("Error in getLinePrediction:", error);
         return {
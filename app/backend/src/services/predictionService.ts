@@ -1,5 +1,7 @@
-import {PredictionInput} from "../Model/Model";
+import {PredictionInput, WeatherData} from "../Model/Model";
 const API_URL = process.env.PREDICTION_API_URL || 'http://localhost:4000';
+// Time given to the prediction API, which drops the request once it has passed
+const PREDICTION_TIMEOUT_MS = Number(process.env.PREDICTION_TIMEOUT_MS || 2000);
 
 
 export async function getPrediction(data: PredictionInput): Promise<any | null> {
@@ -10,8 +12,10 @@ export async function getPrediction(data: PredictionInput): Promise<any | null>
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'X-Request-Deadline-Ms': String(PREDICTION_TIMEOUT_MS),
             },
             body: JSON.stringify(data),
+            signal: AbortSignal.timeout(PREDICTION_TIMEOUT_MS),
         });
         if (!response.ok) {
             const errorData = await response.json();
@@ -33,3 +37,40 @@ export async function getPrediction(data: PredictionInput): Promise<any | null>
         return null;
     }
 }
+
+// Publishes the current weather to the prediction API, which then keeps a snapshot of the
+// predictions of every route and incident type for it
+export async function publishWeather(weather: WeatherData): Promise<void> {
+    const predictionApiUrl = process.env.PREDICTION_API_URL || 'http://localhost:5000';
+    try {
+        const response = await fetch(`${predictionApiUrl}/snapshot`, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(weather),
+            signal: AbortSignal.timeout(PREDICTION_TIMEOUT_MS),
+        });
+        if (!response.ok) {
+            console.error('Snapshot publication error:', await response.json());
+        }
+    } catch (error) {
+        console.error('Error publishing the weather to the prediction API:', error);
+    }
+}
+
+// Prediction of a route and incident type read from the snapshot, null when no snapshot is available
+export async function getSnapshotPrediction(route: number, incident: string): Promise<number | null> {
+    const predictionApiUrl = process.env.PREDICTION_API_URL || 'http://localhost:5000';
+    try {
+        const response = await fetch(`${predictionApiUrl}/snapshot/${route}`, {
+            signal: AbortSignal.timeout(PREDICTION_TIMEOUT_MS),
+        });
+        if (!response.ok) {
+            return null;
+        }
+        const result = await response.json();
+        return result.predictions?.[incident] ?? null;
+    } catch (error) {
+        console.error('Error reading the prediction snapshot:', error);
+        return null;
+    }
+}
@@ -2,6 +2,7 @@ import fs from 'fs';
 import path from 'path';
 import { parse } from 'csv-parse/sync';
 import {WeatherData} from "../Model/Model";
+import {publishWeather} from "./predictionService";
 
 
 
@@ -70,6 +71,8 @@ export async function getWeather(): Promise<WeatherData> {
                     LOCAL_DAY: localDateTime.getDate(),
                 };
                 cache = weather ?? cache;
+                // The prediction API recomputes its route x incident snapshot for the new weather
+                publishWeather(weather);
             })
         });
         cacheTime = now;
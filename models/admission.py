@@ -0,0 +1,147 @@
+import math
+import threading
+import time
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed, carries the Retry-After delay in seconds"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passed before `stage`, nobody is waiting for its answer anymore"""
+
+    def __init__(self, stage):
+        super().__init__(f"Deadline exceeded before {stage}")
+        self.stage = stage
+
+
+class AdmissionController:
+    """Limits the requests processed at once and sheds load before latency runs away
+
+    At most `max_concurrency` requests run at once; up to `max_queue` more
+    wait for a slot. A request is rejected immediately when the queue is
+    full or when its expected wait (requests ahead of it times the average
+    service time, divided by the slots) exceeds `target_wait`, and rejected
+    after waiting `target_wait` without getting a slot. Accepted requests
+    thus never queue for much longer than the target. A request with less
+    time left than that before its deadline waits at most its remaining
+    time and is dropped (reason 'deadline') rather than served too late.
+    """
+
+    def __init__(self, max_concurrency, max_queue, target_wait,
+                 smoothing=0.1, clock=time.monotonic):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.target_wait = target_wait
+        self.smoothing = smoothing
+        self.clock = clock
+
+        self.lock = threading.Lock()
+        # Signals a free slot to queued requests
+        self.condition = threading.Condition(self.lock)
+        # Signals that no request holds or waits for a slot, see wait_idle
+        self.idle = threading.Condition(self.lock)
+        self.active = 0
+        self.queued = 0
+        # Moving average of the time a request holds its slot
+        self.service_time = None
+        self.counters = {
+            'admitted': 0,
+            'shed_queue_full': 0,
+            'shed_expected_wait': 0,
+            'shed_timeout': 0,
+            'shed_deadline': 0
+        }
+
+    def expected_wait(self, position):
+        """Seconds before the request at `position` in the queue gets a slot (lock must be held)"""
+        if self.service_time is None:
+            return 0.0
+        return position * self.service_time / self.max_concurrency
+
+    def retry_after(self):
+        """Whole seconds until the current queue should have drained (lock must be held)"""
+        return max(1, math.ceil(self.expected_wait(self.queued + self.active)))
+
+    def acquire(self, timeout=None):
+        """Wait for a slot, at most `timeout` seconds when given, return the time waited or raise Overloaded"""
+        with self.lock:
+            if timeout is not None and timeout <= 0:
+                self.counters['shed_deadline'] += 1
+                raise Overloaded('deadline', self.retry_after())
+            if self.active < self.max_concurrency and not self.queued:
+                self.active += 1
+                self.counters['admitted'] += 1
+                return 0.0
+            if self.queued >= self.max_queue:
+                self.counters['shed_queue_full'] += 1
+                raise Overloaded('queue_full', self.retry_after())
+            expected_wait = self.expected_wait(self.queued + 1)
+            if expected_wait > self.target_wait:
+                self.counters['shed_expected_wait'] += 1
+                raise Overloaded('expected_wait', self.retry_after())
+            by_deadline = timeout is not None and timeout < self.target_wait
+            if by_deadline and expected_wait > timeout:
+                self.counters['shed_deadline'] += 1
+                raise Overloaded('deadline', self.retry_after())
+
+            start = self.clock()
+            deadline = start + (timeout if by_deadline else self.target_wait)
+            self.queued += 1
+            try:
+                while self.active >= self.max_concurrency:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        reason = 'deadline' if by_deadline else 'timeout'
+                        self.counters['shed_' + reason] += 1
+                        raise Overloaded(reason, self.retry_after())
+                    self.condition.wait(remaining)
+            finally:
+                self.queued -= 1
+                # A shed request may be the last one wait_idle is waiting for
+                if not self.active and not self.queued:
+                    self.idle.notify_all()
+            self.active += 1
+            self.counters['admitted'] += 1
+            return self.clock() - start
+
+    def release(self, service_time=None):
+        """Free the slot of a request that held it for `service_time` seconds (None leaves the average out)"""
+        with self.lock:
+            self.active -= 1
+            if service_time is None:
+                pass
+            elif self.service_time is None:
+                self.service_time = service_time
+            else:
+                self.service_time += self.smoothing * (service_time - self.service_time)
+            self.condition.notify()
+            if not self.active and not self.queued:
+                self.idle.notify_all()
+
+    def wait_idle(self, timeout):
+        """Wait until no request holds or waits for a slot, at most `timeout` seconds"""
+        with self.lock:
+            deadline = self.clock() + timeout
+            while self.active or self.queued:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return
+                self.idle.wait(remaining)
+
+    def stats(self):
+        with self.lock:
+            return {
+                **self.counters,
+                'active': self.active,
+                'queued': self.queued,
+                'service_time_ms': round(self.service_time * 1000, 3) if self.service_time is not None else None,
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'target_wait_ms': self.target_wait * 1000
+            }
@@ -1,21 +1,55 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, has_request_context, request, jsonify, stream_with_context
 from flask_cors import CORS
 import sys
 import os
+import base64
+import hmac
+import json
+import threading
+import time
+
+import numpy as np
 
 # Add models directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-# Import all necessary classes and functions from predictor
-# This ensures the custom classes are available for unpickling
+import predictor
+# Import all necessary functions from predictor
+# (load_preprocessor makes the custom classes available for unpickling)
 from predictor import (
     predict,
-    MultiLabelBinarizerWrapper,
-    cyclical_encoding,
+    predict_batch,
+    predict_incidents,
+    predict_network,
+    predict_columns,
+    validate_row,
+    validate_columns,
+    select_rows,
+    get_one_hot_block,
+    get_status,
+    get_model_version,
+    get_loaded_model,
+    activate_model,
+    rollback_model,
+    start_registry_watcher,
+    registry as model_registry,
+    start_warm_up,
+    warm_up,
     preprocessing,
-    get_preprocessor
+    get_preprocessor,
+    TIERS,
+    DEFAULT_TIER
 )
 
+from prediction_cache import PredictionCache, canonical_row
+from snapshot import SnapshotManager
+from micro_batcher import MicroBatcher
+from request_capture import RequestCapture
+from profiler import SamplingProfiler
+from admission import AdmissionController, DeadlineExceeded, Overloaded
+from columnar import COLUMNAR_CONTENT_TYPES, DECODERS, ENCODERS
+from metrics import REGISTRY, REQUEST_LATENCY, STAGE_LATENCY, ADMISSION_WAIT, CounterCollector, GaugeCollector, StageTimer
+
 app = Flask(__name__)
 CORS(app)
 
@@ -27,6 +61,681 @@ REQUIRED_FIELDS = [
     'WEATHER_ENG_DESC', 'WIND_DIRECTION', 'WIND_SPEED'
 ]
 
+# Load the artifacts and warm up the model at startup instead of on the first request
+EAGER_LOAD = os.environ.get('PREDICTION_API_EAGER_LOAD', 'False').lower() == 'true'
+if EAGER_LOAD:
+    warm_up()
+
+# Prediction cache, keyed on the canonical form of the input (0 entries disables it)
+CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))
+CACHE_DECIMALS = int(os.environ.get('PREDICTION_CACHE_DECIMALS', 2))
+prediction_cache = None
+if CACHE_SIZE > 0:
+    prediction_cache = PredictionCache(
+        max_entries=CACHE_SIZE,
+        ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 3600)),
+        max_bytes=int(os.environ.get('PREDICTION_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+        version_func=get_model_version
+    )
+
+# Network-wide route x incident predictions for the current weather hour, scored with
+# the latency tier PREDICTION_SNAPSHOT_TIER (a rough estimate is enough for the heatmap)
+SNAPSHOT_TIER = os.environ.get('PREDICTION_SNAPSHOT_TIER', DEFAULT_TIER)
+if SNAPSHOT_TIER not in TIERS:
+    raise ValueError(f"PREDICTION_SNAPSHOT_TIER must be one of {', '.join(TIERS)}")
+# Seconds between two checks of the snapshot against the model version and the hour
+SNAPSHOT_REFRESH_SECONDS = float(os.environ.get('PREDICTION_SNAPSHOT_REFRESH_SECONDS', 60))
+snapshot_manager = SnapshotManager(
+    lambda row: predict_network(row, SNAPSHOT_TIER), get_model_version, refresh_interval=SNAPSHOT_REFRESH_SECONDS
+)
+
+# Coalesce concurrent /predict requests into one model call (needs a threaded server)
+MICRO_BATCHING = os.environ.get('PREDICTION_MICRO_BATCHING', 'False').lower() == 'true'
+micro_batcher = None
+if MICRO_BATCHING:
+    micro_batcher = MicroBatcher(
+        predict_batch,
+        max_batch_size=int(os.environ.get('PREDICTION_BATCH_MAX_SIZE', 64)),
+        max_wait=float(os.environ.get('PREDICTION_BATCH_WINDOW_MS', 2)) / 1000
+    )
+
+# Maximum number of rows accepted by the batch endpoint
+MAX_BATCH_SIZE = int(os.environ.get('PREDICTION_API_MAX_BATCH_SIZE', 10000))
+
+# Rows scored together by /predict/stream, and the longest accepted input line
+STREAM_CHUNK_SIZE = int(os.environ.get('PREDICTION_STREAM_CHUNK_SIZE', 1000))
+STREAM_MAX_LINE_BYTES = int(os.environ.get('PREDICTION_STREAM_MAX_LINE_BYTES', 64 * 1024))
+
+# Admin endpoints are disabled unless a token is configured (sent in the X-Admin-Token header)
+ADMIN_TOKEN = os.environ.get('PREDICTION_ADMIN_TOKEN')
+
+# Sampling profiler of POST /admin/profile, an admin endpoint that must also be enabled;
+# it only runs during a profile, at most PREDICTION_PROFILE_MAX_SECONDS
+PROFILER_ENABLED = os.environ.get('PREDICTION_PROFILER_ENABLED', 'False').lower() == 'true'
+PROFILE_MAX_SECONDS = float(os.environ.get('PREDICTION_PROFILE_MAX_SECONDS', 60))
+PROFILE_INTERVAL_MS = 10
+profile_lock = threading.Lock()
+active_profiler = None
+
+# Seconds between two checks of the model registry's current version (0 disables it)
+MODEL_WATCH_INTERVAL = float(os.environ.get('PREDICTION_MODEL_WATCH_INTERVAL', 5))
+if MODEL_WATCH_INTERVAL > 0 and not predictor.forked_workers:
+    start_registry_watcher(MODEL_WATCH_INTERVAL)
+
+# Sampled capture of prediction requests to a JSONL file, replayed by scripts/load_test.py
+CAPTURE_RATE = float(os.environ.get('PREDICTION_CAPTURE_RATE', 0))
+CAPTURE_MAX_BYTES = int(os.environ.get('PREDICTION_CAPTURE_MAX_BYTES', 1024 * 1024))
+CAPTURED_ENDPOINTS = {'/predict', '/predict/batch', '/predict/incidents'}
+request_capture = None
+if CAPTURE_RATE > 0:
+    request_capture = RequestCapture(
+        os.environ.get('PREDICTION_CAPTURE_FILE', './captures/traffic.jsonl'),
+        CAPTURE_RATE
+    )
+
+# Admission control of the prediction endpoints (0 concurrency disables it): requests
+# beyond the limit queue for a slot and are shed with a 503 once their wait would
+# exceed the target, so the accepted ones keep a bounded latency. Interactive and
+# bulk requests use separate lanes, each with its own slots and queue.
+MAX_CONCURRENCY = int(os.environ.get('PREDICTION_MAX_CONCURRENCY', 0))
+ENDPOINT_LANES = {
+    '/predict': 'interactive',
+    '/predict/incidents': 'interactive',
+    '/predict/batch': 'bulk',
+    '/predict/stream': 'bulk'
+}
+lanes = None
+if MAX_CONCURRENCY > 0:
+    lanes = {
+        'interactive': AdmissionController(
+            max_concurrency=MAX_CONCURRENCY,
+            max_queue=int(os.environ.get('PREDICTION_MAX_QUEUE', 64)),
+            target_wait=float(os.environ.get('PREDICTION_QUEUE_TARGET_MS', 100)) / 1000
+        ),
+        'bulk': AdmissionController(
+            max_concurrency=int(os.environ.get('PREDICTION_BULK_MAX_CONCURRENCY', 1)),
+            max_queue=int(os.environ.get('PREDICTION_BULK_MAX_QUEUE', 4)),
+            target_wait=float(os.environ.get('PREDICTION_BULK_QUEUE_TARGET_MS', 10000)) / 1000
+        )
+    }
+
+# Micro-batches only gather the /predict requests holding an interactive slot
+if micro_batcher is not None and lanes is not None and MAX_CONCURRENCY < micro_batcher.max_batch_size:
+    app.logger.warning(
+        "PREDICTION_MAX_CONCURRENCY (%d) caps micro-batches below PREDICTION_BATCH_MAX_SIZE (%d)",
+        MAX_CONCURRENCY, micro_batcher.max_batch_size
+    )
+
+# Bulk requests are scored in chunks of this many rows; while interactive requests
+# are running or queued, bulk work pauses between chunks and keeps this share of the time
+BULK_CHUNK_SIZE = int(os.environ.get('PREDICTION_BULK_CHUNK_SIZE', 500))
+BULK_SHARE = float(os.environ.get('PREDICTION_BULK_SHARE', 0.2))
+
+# Prediction requests can carry the milliseconds their client will wait for the answer,
+# counted from when the request is picked up; work is dropped with a 504 once it has
+# passed. PREDICTION_DEFAULT_DEADLINE_MS applies to requests without it (0 for none).
+DEADLINE_HEADER = 'X-Request-Deadline-Ms'
+DEFAULT_DEADLINE_MS = float(os.environ.get('PREDICTION_DEFAULT_DEADLINE_MS', 0))
+deadline_lock = threading.Lock()
+deadline_counts = {}  # (endpoint, stage): requests dropped
+
+# Cache and micro-batching counters, read when /metrics is scraped
+CACHE_COUNTERS = ['hits', 'misses', 'deduplicated', 'evictions', 'expirations', 'invalidations']
+ADMISSION_OUTCOMES = ['admitted', 'shed_queue_full', 'shed_expected_wait', 'shed_timeout', 'shed_deadline']
+if prediction_cache is not None:
+    REGISTRY.register(CounterCollector(
+        'prediction_cache_events_total', 'Prediction cache events', 'event',
+        lambda: {event: prediction_cache.stats()[event] for event in CACHE_COUNTERS}
+    ))
+if micro_batcher is not None:
+    REGISTRY.register(CounterCollector(
+        'prediction_micro_batching_total', 'Micro-batched requests, batches, failed batches and expired requests', 'kind',
+        lambda: {kind: micro_batcher.stats()[kind] for kind in ('requests', 'batches', 'errors', 'expired')}
+    ))
+if lanes is not None:
+    REGISTRY.register(CounterCollector(
+        'prediction_api_admission_total', 'Requests admitted or shed by admission control', ('lane', 'outcome'),
+        lambda: {
+            (lane, outcome): stats[outcome]
+            for lane, stats in ((lane, controller.stats()) for lane, controller in lanes.items())
+            for outcome in ADMISSION_OUTCOMES
+        }
+    ))
+    REGISTRY.register(GaugeCollector(
+        'prediction_api_admission_requests', 'Requests holding or waiting for a processing slot', ('lane', 'state'),
+        lambda: {
+            (lane, state): stats[state]
+            for lane, stats in ((lane, controller.stats()) for lane, controller in lanes.items())
+            for state in ('active', 'queued')
+        }
+    ))
+REGISTRY.register(CounterCollector(
+    'prediction_api_deadline_exceeded_total', 'Requests dropped because their deadline passed', ('endpoint', 'stage'),
+    lambda: deadline_stats()
+))
+if request_capture is not None:
+    REGISTRY.register(CounterCollector(
+        'prediction_capture_records_total', 'Captured, dropped and failed request capture records', 'event',
+        lambda: {event: request_capture.stats()[event] for event in ('captured', 'dropped', 'write_errors')}
+    ))
+
+
+def missing_fields_error(data):
+    """Return the error message for missing required fields, or None"""
+    missing_fields = [field for field in REQUIRED_FIELDS if field not in data]
+    if missing_fields:
+        return f"Missing required fields: {', '.join(missing_fields)}"
+    return None
+
+def admin_error():
+    """Return the error response of a request without a valid admin token, or None"""
+    if not ADMIN_TOKEN:
+        return jsonify({
+            "success": False,
+            "error": "Admin endpoints are disabled, set PREDICTION_ADMIN_TOKEN to enable them"
+        }), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({
+            "success": False,
+            "error": "Invalid admin token"
+        }), 403
+    return None
+
+def positive_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+def read_ndjson(stream, max_line_bytes, block_size=1 << 16):
+    """Yield (line number, row, error) for each non-empty line of an NDJSON stream
+
+    The body is read in blocks, so memory use does not depend on its size;
+    lines longer than max_line_bytes are skipped with an error.
+    """
+    line_number = 0
+    pending = b''
+    skipping = False  # The rest of an overlong line is discarded
+    while True:
+        block = stream.read(block_size)
+        if block:
+            lines = (pending + block).split(b'\n')
+            pending = lines.pop()
+        else:
+            lines, pending = [pending], b''
+
+        for line in lines:
+            if skipping:
+                skipping = False
+                continue
+            line_number += 1
+            if len(line) > max_line_bytes:
+                yield line_number, None, f"Line longer than {max_line_bytes} bytes"
+                continue
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line), None
+            except ValueError as e:
+                yield line_number, None, f"Invalid JSON: {e}"
+
+        if not block:
+            return
+        if len(pending) > max_line_bytes:
+            # Report the line now and drop what was read of it
+            if not skipping:
+                line_number += 1
+                yield line_number, None, f"Line longer than {max_line_bytes} bytes"
+                skipping = True
+            pending = b''
+
+def score_stream_chunk(chunk, tier=DEFAULT_TIER):
+    """Validate and score a chunk of (line number, row, error), return its NDJSON results
+
+    The response has already started, so failures are reported on the rows
+    of the chunk rather than raised, and the stream goes on with the next one.
+    """
+    results = []
+    valid_rows = []
+    try:
+        for line_number, row, error in chunk:
+            if error is None:
+                if not isinstance(row, dict):
+                    error = "Row must be a JSON object"
+                else:
+                    error = missing_fields_error(row) or validate_row(row)
+            if error is None:
+                valid_rows.append(row)
+                results.append({"line": line_number, "success": True})
+            else:
+                results.append({"line": line_number, "success": False, "error": error})
+    except Exception as e:
+        app.logger.exception("Failed to validate a /predict/stream chunk")
+        return ''.join(
+            json.dumps({"line": line_number, "success": False, "error": str(e)}) + '\n'
+            for line_number, _, _ in chunk
+        )
+
+    # Make predictions for all valid rows of the chunk in one pass
+    try:
+        predictions = iter(predict_batch(valid_rows, tier=tier))
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        app.logger.exception("Failed to score a /predict/stream chunk")
+        for result in results:
+            if result['success']:
+                result.update(success=False, error=str(e))
+        predictions = iter(())
+    for result in results:
+        if result['success']:
+            result['prediction'] = float(next(predictions))
+    return ''.join(json.dumps(result) + '\n' for result in results)
+
+def predict_one(row, tier=DEFAULT_TIER):
+    """Score one validated row, coalesced with concurrent requests of the full tier when micro-batching is on"""
+    if micro_batcher is not None and tier == DEFAULT_TIER:
+        return micro_batcher.submit(row, remaining_time())
+    return predict(row, tier)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+def deadline_stats():
+    with deadline_lock:
+        return dict(deadline_counts)
+
+def count_deadline_exceeded(stage):
+    endpoint = request.url_rule.rule
+    with deadline_lock:
+        deadline_counts[(endpoint, stage)] = deadline_counts.get((endpoint, stage), 0) + 1
+
+def deadline_response(e):
+    """Return the 504 response of a request dropped because its deadline passed"""
+    count_deadline_exceeded(e.stage)
+    return jsonify({
+        "success": False,
+        "error": str(e)
+    }), 504
+
+def check_deadline(stage):
+    """Raise DeadlineExceeded when the deadline of the current request passed before `stage`"""
+    deadline = g.get('deadline')
+    if deadline is not None and time.perf_counter() >= deadline:
+        raise DeadlineExceeded(stage)
+
+def check_inference_deadline():
+    """Deadline check run by predictor.score, in request threads only (the micro-batcher drops expired rows itself)"""
+    if has_request_context():
+        check_deadline('inference')
+
+predictor.before_inference = check_inference_deadline
+
+def remaining_time():
+    """Seconds left before the deadline of the current request, None without a deadline"""
+    deadline = g.get('deadline')
+    return None if deadline is None else deadline - time.perf_counter()
+
+@app.before_request
+def read_deadline():
+    """Set g.deadline from the deadline header of prediction requests (or the default deadline)"""
+    if request.url_rule is None or request.url_rule.rule not in ENDPOINT_LANES:
+        return None
+    value = request.headers.get(DEADLINE_HEADER)
+    if value is None:
+        deadline_ms = DEFAULT_DEADLINE_MS
+    else:
+        try:
+            deadline_ms = float(value)
+        except ValueError:
+            deadline_ms = None
+        if deadline_ms is None or not deadline_ms > 0:
+            return jsonify({
+                "success": False,
+                "error": f"{DEADLINE_HEADER} must be a positive number of milliseconds"
+            }), 400
+    if deadline_ms > 0:
+        g.deadline = g.request_start + deadline_ms / 1000
+    return None
+
+@app.before_request
+def read_tier():
+    """Set g.tier from the tier query parameter of prediction requests (the full model by default)"""
+    if request.url_rule is None or request.url_rule.rule not in ENDPOINT_LANES:
+        return None
+    g.tier = request.args.get('tier', DEFAULT_TIER)
+    if g.tier not in TIERS:
+        return jsonify({
+            "success": False,
+            "error": f"Unknown tier {g.tier!r}, expected one of {', '.join(TIERS)}"
+        }), 400
+    # Tiers without a truncation that pays off for the active model are not served
+    available = get_loaded_model().tiers if g.tier != DEFAULT_TIER else (DEFAULT_TIER,)
+    if g.tier not in available:
+        return jsonify({
+            "success": False,
+            "error": f"Tier {g.tier!r} is not configured for this model, available: {', '.join(available)}"
+        }), 404
+    return None
+
+@app.before_request
+def admit_request():
+    """Take a slot in the lane of prediction requests, or shed them with 503 and Retry-After"""
+    if lanes is None or request.url_rule is None or request.url_rule.rule not in ENDPOINT_LANES:
+        return None
+    lane = ENDPOINT_LANES[request.url_rule.rule]
+    try:
+        # Requests whose deadline passes while queued are dropped without being processed
+        waited = lanes[lane].acquire(remaining_time())
+    except Overloaded as e:
+        if e.reason == 'deadline':
+            return deadline_response(DeadlineExceeded('admission'))
+        response = jsonify({
+            "success": False,
+            "error": f"Server overloaded ({e.reason}), retry later"
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+    ADMISSION_WAIT.observe(waited, request.url_rule.rule)
+    # Requests admitted before the model is loaded also wait for the loading,
+    # their time would make the service time average shed everything after them
+    g.admitted = (lane, time.perf_counter(), predictor.active_model is not None)
+    return None
+
+@app.teardown_request
+def release_request_slot(exc):
+    # Runs after streamed responses are fully sent, so a stream holds its slot until the end
+    admitted = g.pop('admitted', None)
+    if admitted is not None:
+        lane, admitted_at, warm = admitted
+        lanes[lane].release(time.perf_counter() - admitted_at if warm else None)
+
+def yield_to_interactive(bulk_time):
+    """
+    Pause bulk work that just ran for bulk_time seconds while interactive
+    requests are running or queued, for at most bulk_time * (1 / BULK_SHARE - 1)
+    """
+    if lanes is not None:
+        lanes['interactive'].wait_idle(bulk_time * (1 / BULK_SHARE - 1))
+
+def score_in_chunks(score_rows, n_rows):
+    """Score rows [0, n_rows) with score_rows(start, end), in chunks yielding to interactive requests"""
+    if lanes is None:
+        return score_rows(0, n_rows)
+    predictions = []
+    for start in range(0, n_rows, BULK_CHUNK_SIZE):
+        check_deadline('predict')
+        chunk_start = time.perf_counter()
+        predictions.append(score_rows(start, min(start + BULK_CHUNK_SIZE, n_rows)))
+        yield_to_interactive(time.perf_counter() - chunk_start)
+    return np.concatenate(predictions) if predictions else np.empty(0)
+
+@app.after_request
+def record_request_latency(response):
+    """Observe the latency of every request, by endpoint, method and status"""
+    start = g.get('request_start')
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        latency = time.perf_counter() - start
+        REQUEST_LATENCY.observe(latency, endpoint, request.method, str(response.status_code))
+        if active_profiler is not None and endpoint in ENDPOINT_LANES:
+            active_profiler.request_done()
+        if request_capture is not None and endpoint in CAPTURED_ENDPOINTS and request_capture.sampled():
+            capture_request(response, latency)
+    return response
+
+def capture_request(response, latency):
+    """Queue a sampled request for the capture file (bodies above CAPTURE_MAX_BYTES are skipped)"""
+    if request.content_length is None or request.content_length > CAPTURE_MAX_BYTES:
+        return
+    # The body was already read by the endpoint, get_data returns the cached bytes
+    body = request.get_data()
+    record = {
+        "time": time.time(),
+        "method": request.method,
+        "path": request.full_path if request.query_string else request.path,
+        "content_type": request.content_type,
+        "status": response.status_code,
+        "latency_ms": round(latency * 1000, 3)
+    }
+    if request.is_json:
+        record["body"] = body.decode('utf-8', 'replace')
+    else:
+        record["body_base64"] = base64.b64encode(body).decode('ascii')
+    request_capture.offer(record)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus metrics in the text exposition format: request latency by
+    endpoint, method and status, latency of the request and model stages,
+    rows per model call, cache and micro-batching counters
+    """
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/health', methods=['GET'])
+def health():
+    """
+    Liveness endpoint: the process is up and able to answer
+
+    Returns:
+    {
+        "success": true,
+        "status": "alive",
+        "model_loaded": <bool>,
+        "model_version": <short artifact digest or null>,
+        "load_times": {"preprocessor": <seconds>, "model": <seconds>, "warm_up": <seconds>},
+        "warmed_up": <bool>,
+        ...
+    }
+    """
+    return jsonify({
+        "success": True,
+        "status": "alive",
+        **get_status()
+    }), 200
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """
+    Readiness endpoint: 200 once the artifacts are loaded and warmed up, 503 before
+
+    Without eager loading, the first call starts the warm-up in the background
+    so the worker becomes ready without serving a slow request.
+    """
+    status = get_status()
+    if status['warmed_up']:
+        return jsonify({"success": True, "status": "ready", **status}), 200
+    if status['warm_up_error']:
+        return jsonify({"success": False, "status": "failed", **status}), 503
+    start_warm_up()
+    return jsonify({"success": False, "status": "warming_up", **status}), 503
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    Prediction cache counters (hits, misses, deduplicated, evictions,
+    expirations, invalidations) and current size
+    """
+    if prediction_cache is None:
+        return jsonify({"success": True, "enabled": False}), 200
+    return jsonify({"success": True, "enabled": True, **prediction_cache.stats()}), 200
+
+@app.route('/batching/stats', methods=['GET'])
+def batching_stats():
+    """
+    Micro-batching counters (requests, batches, largest batch, errors),
+    mean batch size and current wait window
+    """
+    if micro_batcher is None:
+        return jsonify({"success": True, "enabled": False}), 200
+    return jsonify({"success": True, "enabled": True, **micro_batcher.stats()}), 200
+
+@app.route('/admission/stats', methods=['GET'])
+def admission_stats():
+    """
+    Admission control counters of each lane (admitted and shed requests by
+    reason), requests running and queued, and the average service time
+    """
+    if lanes is None:
+        return jsonify({"success": True, "enabled": False}), 200
+    return jsonify({
+        "success": True,
+        "enabled": True,
+        "lanes": {lane: controller.stats() for lane, controller in lanes.items()}
+    }), 200
+
+@app.route('/admin/model', methods=['GET'])
+def model_info():
+    """
+    Active model version and its manifest, registry versions and reload state
+
+    Returns:
+    {
+        "success": true,
+        "active": <version in use by this process>,
+        "manifest": {<artifacts, features, training data, metrics>} or null,
+        "current": <registry version every worker converges to>,
+        "previous": <version a rollback would activate>,
+        "versions": [<published versions, oldest first>],
+        "reload": {"loading": ..., "error": ..., "previous": ...}
+    }
+    """
+    error = admin_error()
+    if error:
+        return error
+    loaded = get_loaded_model()
+    return jsonify({
+        "success": True,
+        "active": loaded.version,
+        "manifest": loaded.manifest,
+        "current": model_registry.current(),
+        "previous": model_registry.previous(),
+        "versions": model_registry.versions(),
+        "reload": get_status()['reload']
+    }), 200
+
+@app.route('/admin/model/activate', methods=['POST'])
+def model_activate():
+    """
+    Load, warm up and switch to a published model version
+
+    Expected input format:
+    {
+        "version": "<published version>"
+    }
+
+    Predictions keep being served by the previous version until the new one
+    is warmed up. The version then becomes the registry's current one, so
+    the other workers switch on their next registry check.
+    """
+    error = admin_error()
+    if error:
+        return error
+    data = request.get_json(silent=True)
+    version = data.get('version') if isinstance(data, dict) else None
+    if not isinstance(version, str) or not version:
+        return jsonify({
+            "success": False,
+            "error": "Request body must be a JSON object with a 'version' string"
+        }), 400
+    try:
+        activate_model(version)
+    except KeyError as e:
+        return jsonify({"success": False, "error": e.args[0]}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Could not load version {version!r}: {e}"}), 500
+    return jsonify({"success": True, "active": version}), 200
+
+@app.route('/admin/model/rollback', methods=['POST'])
+def model_rollback():
+    """
+    Switch back to the version activated before the current one
+    """
+    error = admin_error()
+    if error:
+        return error
+    try:
+        version = rollback_model()
+    except KeyError as e:
+        return jsonify({"success": False, "error": e.args[0]}), 409
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Rollback failed: {e}"}), 500
+    return jsonify({"success": True, "active": version}), 200
+
+@app.route('/admin/profile', methods=['POST'])
+def profile():
+    """
+    Sample the Python stacks of this process's threads and return them as collapsed stacks
+
+    Expected input format (seconds, requests or both):
+    {
+        "seconds": 10,
+        "requests": 500,
+        "interval_ms": 10,
+        "idle": false
+    }
+
+    Profiles for `seconds`, or until `requests` prediction requests have
+    completed, at most PREDICTION_PROFILE_MAX_SECONDS; one profile runs at
+    a time. Stacks of threads blocked waiting are left out unless `idle`
+    is true. Under serve.py only the worker answering is profiled, and
+    only with PREDICTION_API_WORKER_THREADS above 1 (409 otherwise).
+
+    Returns (text/plain), one "outer;...;inner <samples>" line per stack,
+    the input of flamegraph.pl or speedscope:
+    werkzeug.serving:WSGIRequestHandler.run_wsgi;...;predictor:predict_batch 42
+    """
+    global active_profiler
+    error = admin_error()
+    if error:
+        return error
+    if not PROFILER_ENABLED:
+        return jsonify({
+            "success": False,
+            "error": "Profiling is disabled, set PREDICTION_PROFILER_ENABLED=true to enable it"
+        }), 403
+    if app.config.get('WORKER_THREADS') == 1:
+        # The profile would hold the only request thread, no request could run while it samples
+        return jsonify({
+            "success": False,
+            "error": "Profiling needs PREDICTION_API_WORKER_THREADS above 1 under serve.py"
+        }), 409
+    data = request.get_json(silent=True)
+    data = data if isinstance(data, dict) else {}
+    seconds = data.get('seconds')
+    n_requests = data.get('requests')
+    interval_ms = data.get('interval_ms', PROFILE_INTERVAL_MS)
+    if seconds is None and n_requests is None or not all(
+            positive_number(value) for value in (seconds, n_requests, interval_ms) if value is not None):
+        return jsonify({
+            "success": False,
+            "error": "Request body must be a JSON object with a positive 'seconds' or 'requests' "
+                     "(and an optional positive 'interval_ms')"
+        }), 400
+
+    if not profile_lock.acquire(blocking=False):
+        return jsonify({
+            "success": False,
+            "error": "A profile is already running"
+        }), 409
+    try:
+        profiler = SamplingProfiler(interval_ms / 1000, n_requests, bool(data.get('idle')))
+        profiler.start(ignore=[threading.get_ident()])
+        active_profiler = profiler
+        try:
+            profiler.wait(min(seconds or PROFILE_MAX_SECONDS, PROFILE_MAX_SECONDS))
+        finally:
+            active_profiler = None
+            body = profiler.stop()
+    finally:
+        profile_lock.release()
+
+    response = Response(body, mimetype='text/plain')
+    response.headers['X-Profile-Samples'] = str(profiler.samples)
+    response.headers['X-Profile-Requests'] = str(profiler.requests)
+    response.headers['X-Profile-Seconds'] = f"{profiler.elapsed:.3f}"
+    return response, 200
+
 @app.route('/predict', methods=['POST'])
 def predict_delay():
     """
@@ -59,7 +768,9 @@ def predict_delay():
     }
     """
     try:
+        timer = StageTimer(STAGE_LATENCY, '/predict')
         data = request.json
+        timer.mark('parse')
 
         # Check if JSON data is present
         if not data:
@@ -67,29 +778,395 @@ def predict_delay():
                 "success": False,
                 "error": "No JSON data provided in request body"
             }), 400
+        if not isinstance(data, dict):
+            return jsonify({
+                "success": False,
+                "error": "Request body must be a JSON object"
+            }), 400
 
-        # Validate required fields
-        missing_fields = [field for field in REQUIRED_FIELDS if field not in data]
-        if missing_fields:
+        # Validate required fields and values
+        check_deadline('validate')
+        error = missing_fields_error(data) or validate_row(data)
+        timer.mark('validate')
+        if error:
             return jsonify({
                 "success": False,
-                "error": f"Missing required fields: {', '.join(missing_fields)}"
+                "error": error
             }), 400
 
-        # Make prediction
-        prediction = predict(data)
+        # Make prediction, shared with identical requests through the cache
+        check_deadline('predict')
+        if prediction_cache is not None:
+            key, row = canonical_row(data, CACHE_DECIMALS)
+            prediction = prediction_cache.get_or_compute(
+                ('predict', g.tier, key), lambda: predict_one(row, g.tier), remaining_time()
+            )
+        else:
+            prediction = predict_one(data, g.tier)
+        timer.mark('predict')
 
-        return jsonify({
+        response = jsonify({
             "success": True,
             "prediction": float(prediction)
+        })
+        timer.mark('serialize')
+        return response, 200
+
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_delay_batch():
+    """
+    Endpoint to predict bus delays for many rows at once
+
+    Expected input format:
+    {
+        "rows": [<same object as /predict>, ...]
+    }
+
+    Every row is validated on its own; valid rows are preprocessed and
+    scored together in a single model call.
+
+    The rows can also be sent as columns (one array per input field) in
+    the Arrow IPC stream (Content-Type: application/vnd.apache.arrow.stream)
+    or MessagePack (Content-Type: application/msgpack) format. The answer
+    then uses the same format, with a "prediction" column (null for
+    invalid rows) and an "error" column (null for valid rows).
+
+    Returns:
+    {
+        "success": true,
+        "results": [
+            {"success": true, "prediction": <predicted_delay_in_minutes>},
+            {"success": false, "error": "Missing required fields: TEMP"},
+            ...
+        ]
+    }
+    """
+    try:
+        columnar_format = COLUMNAR_CONTENT_TYPES.get(request.mimetype)
+        if columnar_format is not None:
+            return predict_columnar_batch(columnar_format)
+
+        timer = StageTimer(STAGE_LATENCY, '/predict/batch')
+        data = request.json
+        timer.mark('parse')
+
+        if not isinstance(data, dict) or not isinstance(data.get('rows'), list):
+            return jsonify({
+                "success": False,
+                "error": "Request body must be a JSON object with a 'rows' list"
+            }), 400
+
+        rows = data['rows']
+        if len(rows) > MAX_BATCH_SIZE:
+            return jsonify({
+                "success": False,
+                "error": f"Batch too large: {len(rows)} rows (maximum is {MAX_BATCH_SIZE})"
+            }), 413
+
+        # Validate each row, keeping the position of the valid ones
+        check_deadline('validate')
+        results = [None] * len(rows)
+        valid_indices = []
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                error = "Row must be a JSON object"
+            else:
+                error = missing_fields_error(row) or validate_row(row)
+            if error:
+                results[index] = {"success": False, "error": error}
+            else:
+                valid_indices.append(index)
+        timer.mark('validate')
+
+        # Make predictions for all valid rows in one pass (per chunk with priority lanes)
+        check_deadline('predict')
+        valid_rows = [rows[index] for index in valid_indices]
+        tier = g.tier
+        predictions = score_in_chunks(
+            lambda start, end: predict_batch(valid_rows[start:end], tier=tier), len(valid_rows)
+        )
+        timer.mark('predict')
+        for index, prediction in zip(valid_indices, predictions):
+            results[index] = {"success": True, "prediction": float(prediction)}
+
+        response = jsonify({
+            "success": True,
+            "results": results
+        })
+        timer.mark('serialize')
+        return response, 200
+
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+def predict_columnar_batch(columnar_format):
+    """Score a columnar batch and answer in the same format, see predict_delay_batch"""
+    timer = StageTimer(STAGE_LATENCY, '/predict/batch')
+    try:
+        columns = DECODERS[columnar_format](request.get_data())
+    except ImportError as e:
+        return jsonify({
+            "success": False,
+            "error": f"The {columnar_format} format is not available on this server: {e}"
+        }), 415
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Invalid {columnar_format} payload: {e}"
+        }), 400
+    timer.mark('parse')
+
+    n_rows = max((len(values) for values in columns.values()), default=0)
+    if n_rows > MAX_BATCH_SIZE:
+        return jsonify({
+            "success": False,
+            "error": f"Batch too large: {n_rows} rows (maximum is {MAX_BATCH_SIZE})"
+        }), 413
+
+    # Validate the columns, keeping the position of the valid rows
+    check_deadline('validate')
+    try:
+        columns, errors = validate_columns(columns)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    valid_indices = np.flatnonzero([error is None for error in errors])
+    timer.mark('validate')
+
+    # Make predictions for all valid rows in one pass, straight from the columns
+    check_deadline('predict')
+    predictions = np.full(len(errors), np.nan)
+    predictions[valid_indices] = score_in_chunks(
+        lambda start, end: predict_columns(select_rows(columns, valid_indices[start:end]), g.tier),
+        len(valid_indices)
+    )
+    timer.mark('predict')
+
+    body = ENCODERS[columnar_format](predictions, errors)
+    timer.mark('serialize')
+    return Response(body, mimetype=request.mimetype), 200
+
+@app.route('/predict/stream', methods=['POST'])
+def predict_delay_stream():
+    """
+    Endpoint to predict bus delays for an unbounded stream of rows
+
+    Expected input: newline-delimited JSON (application/x-ndjson), one
+    /predict object per line, possibly sent with chunked transfer encoding.
+
+    The body is read incrementally and scored in chunks of
+    PREDICTION_STREAM_CHUNK_SIZE rows; the results of each chunk are
+    streamed back as soon as it is scored, so memory use stays bounded.
+    Clients sending large bodies must read the response while sending.
+
+    Returns (application/x-ndjson), one line per non-empty input line:
+    {"line": 1, "success": true, "prediction": <predicted_delay_in_minutes>}
+    {"line": 2, "success": false, "error": "Missing required fields: TEMP"}
+    """
+    stream = request.stream
+    tier = g.tier
+
+    def generate():
+        chunk = []
+        try:
+            for item in read_ndjson(stream, STREAM_MAX_LINE_BYTES):
+                chunk.append(item)
+                if len(chunk) >= STREAM_CHUNK_SIZE:
+                    check_deadline('predict')
+                    start = time.perf_counter()
+                    results = score_stream_chunk(chunk, tier)
+                    elapsed = time.perf_counter() - start
+                    yield results
+                    yield_to_interactive(elapsed)
+                    chunk = []
+            if chunk:
+                check_deadline('predict')
+                yield score_stream_chunk(chunk, tier)
+        except DeadlineExceeded as e:
+            # The response has already started, the stream ends with an error line
+            count_deadline_exceeded(e.stage)
+            yield json.dumps({"success": False, "error": str(e)}) + '\n'
+        except Exception as e:
+            # e.g. the request body could not be read, the stream ends with an error line
+            app.logger.exception("/predict/stream failed")
+            yield json.dumps({"success": False, "error": str(e)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/predict/incidents', methods=['POST'])
+def predict_delay_incidents():
+    """
+    Endpoint to predict bus delay for every incident type at once
+
+    Expected input format: same object as /predict, INCIDENT is optional
+    and ignored.
+
+    Returns:
+    {
+        "success": true,
+        "predictions": {
+            "External": <predicted_delay_in_minutes>,
+            "Operational": <predicted_delay_in_minutes>,
+            ...
+        }
+    }
+    """
+    try:
+        data = request.json
+
+        # Check if JSON data is present
+        if not data:
+            return jsonify({
+                "success": False,
+                "error": "No JSON data provided in request body"
+            }), 400
+        if not isinstance(data, dict):
+            return jsonify({
+                "success": False,
+                "error": "Request body must be a JSON object"
+            }), 400
+
+        # INCIDENT is filled in for each category, validate the rest of the row
+        incidents, _ = get_one_hot_block('INCIDENT')
+        row = dict(data, INCIDENT=incidents[0])
+        check_deadline('validate')
+        error = missing_fields_error(row) or validate_row(row)
+        if error:
+            return jsonify({
+                "success": False,
+                "error": error
+            }), 400
+
+        check_deadline('predict')
+        if prediction_cache is not None:
+            key, row = canonical_row(row, CACHE_DECIMALS)
+            predictions = prediction_cache.get_or_compute(
+                ('incidents', g.tier, key), lambda: predict_incidents(row, g.tier), remaining_time()
+            )
+        else:
+            predictions = predict_incidents(row, g.tier)
+
+        return jsonify({
+            "success": True,
+            "predictions": {incident: float(value) for incident, value in predictions.items()}
         }), 200
 
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+def snapshot_response(snapshot, body):
+    """Serve a pre-serialized snapshot body, answering 304 when the client ETag matches"""
+    if request.if_none_match.contains(snapshot.etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.set_etag(snapshot.etag)
+    return response
+
+@app.route('/snapshot', methods=['POST'])
+def publish_snapshot_weather():
+    """
+    Publish the current weather/time input (same object as /predict,
+    ROUTE and INCIDENT are ignored). When its hour or weather differs from
+    the current snapshot, predictions for every route x incident are
+    recomputed in the background with one model call. The snapshot then
+    follows the hour and the model version on its own until the next
+    publication.
+
+    Returns 202 while a new snapshot is being computed, 200 when the
+    current snapshot already matches.
+    """
+    try:
+        data = request.json
+
+        # Check if JSON data is present
+        if not data:
+            return jsonify({
+                "success": False,
+                "error": "No JSON data provided in request body"
+            }), 400
+        if not isinstance(data, dict):
+            return jsonify({
+                "success": False,
+                "error": "Request body must be a JSON object"
+            }), 400
+
+        routes, _ = get_one_hot_block('ROUTE')
+        incidents, _ = get_one_hot_block('INCIDENT')
+        row = dict(data, ROUTE=routes[0], INCIDENT=incidents[0])
+        error = missing_fields_error(row) or validate_row(row)
+        if error:
+            return jsonify({
+                "success": False,
+                "error": error
+            }), 400
+
+        if snapshot_manager.submit(row):
+            return jsonify({"success": True, "status": "computing"}), 202
+        return jsonify({"success": True, "status": "current", "etag": snapshot_manager.current().etag}), 200
+
     except Exception as e:
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
+@app.route('/snapshot', methods=['GET'])
+def get_snapshot():
+    """
+    Predictions of the current snapshot for every route and incident type
+
+    Supports If-None-Match: answers 304 when the snapshot did not change.
+    """
+    snapshot = snapshot_manager.current()
+    if snapshot is None:
+        return jsonify({
+            "success": False,
+            "error": snapshot_manager.error or "No snapshot available, publish the weather with POST /snapshot"
+        }), 404
+    return snapshot_response(snapshot, snapshot.body)
+
+@app.route('/snapshot/<route>', methods=['GET'])
+def get_route_snapshot(route):
+    """
+    Predictions of the current snapshot for one route, by incident type
+
+    Supports If-None-Match: answers 304 when the snapshot did not change.
+    """
+    snapshot = snapshot_manager.current()
+    if snapshot is None:
+        return jsonify({
+            "success": False,
+            "error": snapshot_manager.error or "No snapshot available, publish the weather with POST /snapshot"
+        }), 404
+    body = snapshot.route_bodies.get(route)
+    if body is None:
+        return jsonify({
+            "success": False,
+            "error": f"Unknown ROUTE: {route!r}"
+        }), 404
+    return snapshot_response(snapshot, body)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PREDICTION_API_PORT', 5000))
     host = os.environ.get('PREDICTION_API_HOST', '127.0.0.1')
@@ -0,0 +1,67 @@
+import numpy as np
+
+# Columnar batch formats, selected by the request Content-Type
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+MSGPACK_CONTENT_TYPE = 'application/msgpack'
+COLUMNAR_CONTENT_TYPES = {
+    ARROW_CONTENT_TYPE: 'arrow',
+    MSGPACK_CONTENT_TYPE: 'msgpack',
+    'application/x-msgpack': 'msgpack'
+}
+
+
+def decode_arrow(body):
+    """Read an Arrow IPC stream into input columns (one array or list per field)
+
+    Numeric columns without nulls are handed over as NumPy arrays (without a
+    copy for single-chunk float64 columns); the other columns become lists.
+    """
+    import pyarrow
+
+    table = pyarrow.ipc.open_stream(body).read_all()
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        if column.null_count == 0 and (pyarrow.types.is_floating(column.type) or pyarrow.types.is_integer(column.type)):
+            columns[name] = column.to_numpy()
+        else:
+            columns[name] = column.to_pylist()
+    return columns
+
+
+def encode_arrow(predictions, errors):
+    """Write the predictions and errors as a two-column Arrow IPC stream"""
+    import pyarrow
+
+    table = pyarrow.table({
+        'prediction': pyarrow.array(predictions, type=pyarrow.float64(), mask=np.isnan(predictions)),
+        'error': pyarrow.array(errors, type=pyarrow.string())
+    })
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_msgpack(body):
+    """Read a MessagePack map of field name -> array into input columns"""
+    import msgpack
+
+    columns = msgpack.unpackb(body)
+    if not isinstance(columns, dict) or not all(isinstance(values, list) for values in columns.values()):
+        raise ValueError("MessagePack payload must be a map of field name -> array")
+    return columns
+
+
+def encode_msgpack(predictions, errors):
+    """Write the predictions and errors as a MessagePack map of arrays"""
+    import msgpack
+
+    return msgpack.packb({
+        'success': True,
+        'prediction': [None if np.isnan(value) else value for value in predictions.tolist()],
+        'error': errors
+    })
+
+
+DECODERS = {'arrow': decode_arrow, 'msgpack': decode_msgpack}
+ENCODERS = {'arrow': encode_arrow, 'msgpack': encode_msgpack}
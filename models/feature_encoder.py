@@ -0,0 +1,389 @@
+import json
+from itertools import count, repeat
+from operator import itemgetter
+
+import numpy as np
+
+# Fields read from the raw input rows
+INPUT_FIELDS = [
+    'ROUTE', 'LOCAL_TIME', 'WEEK_DAY', 'INCIDENT', 'LOCAL_MONTH', 'LOCAL_DAY',
+    'TEMP', 'DEW_POINT_TEMP', 'HUMIDEX', 'PRECIP_AMOUNT', 'RELATIVE_HUMIDITY',
+    'STATION_PRESSURE', 'VISIBILITY', 'WEATHER_ENG_DESC', 'WIND_DIRECTION', 'WIND_SPEED'
+]
+
+# Fields that must hold numbers
+NUMERIC_FIELDS = [
+    'LOCAL_MONTH', 'LOCAL_DAY', 'TEMP', 'DEW_POINT_TEMP', 'HUMIDEX',
+    'PRECIP_AMOUNT', 'RELATIVE_HUMIDITY', 'STATION_PRESSURE', 'VISIBILITY',
+    'WIND_DIRECTION', 'WIND_SPEED'
+]
+
+DAY_MAPPING = {
+    'Monday': 0,
+    'Tuesday': 1,
+    'Wednesday': 2,
+    'Thursday': 3,
+    'Friday': 4,
+    'Saturday': 5,
+    'Sunday': 6
+}
+
+# Regroup weather conditions into broader categories
+WEATHER_MAP = {
+    'Moderate Rain': 'Rain',
+    'Freezing Rain': 'Rain',
+    'Heavy Rain': 'Rain',
+    'Freezing Fog': 'Fog',
+    'Haze': 'Fog',
+    'Moderate Snow': 'Snow'
+}
+
+SUMMER_MONTHS = [5, 6, 7, 8, 9]
+
+# Version of the JSON spec written by FeatureEncoder.save
+SPEC_FORMAT = 1
+
+# VISIBILITY labels for the buckets <4, 4-8, 8-12, 12-16 and >=16 km
+VISIBILITY_THRESHOLDS = [4, 8, 12, 16]
+VISIBILITY_LABELS = [
+    "No visibility",
+    "Very poor visibility",
+    "Poor visibility",
+    "Correct visibility",
+    "Great visibility"
+]
+
+
+def cyclical_table(max_value):
+    """Return the (cos, sin) lookup tables for the integers 0..max_value-1"""
+    values = np.arange(max_value, dtype=np.float64)
+    return np.cos(2 * np.pi * values / max_value), np.sin(2 * np.pi * values / max_value)
+
+
+def factorize(values):
+    """Return the distinct values (in order of appearance) and the position of each value among them"""
+    # One pass: each value maps to the index of its first occurrence...
+    first = {}
+    occurrences = np.fromiter(map(first.setdefault, values, count()), dtype=np.intp, count=len(values))
+    # ...renumbered in order of appearance
+    numbers = np.empty(len(values), dtype=np.intp)
+    numbers[list(first.values())] = np.arange(len(first))
+    return list(first), numbers[occurrences]
+
+
+def lookup_column(lookup, values, default=-1):
+    """Map every value through a dict in one pass, `default` for values missing from it"""
+    return np.fromiter(map(lookup.get, values, repeat(default)), dtype=np.intp, count=len(values))
+
+
+def write_columns(out, columns):
+    """Write {output column: values} into out, one block per run of consecutive columns
+
+    Assigning a single column of a wide row-major matrix touches a cache line
+    per row, so consecutive columns are stacked and written together.
+    """
+    indices = sorted(columns)
+    first = 0
+    for i in range(1, len(indices) + 1):
+        if i == len(indices) or indices[i] != indices[i - 1] + 1:
+            block = np.array([columns[index] for index in indices[first:i]], dtype=np.float32)
+            out[:, indices[first]:indices[i - 1] + 1] = block.T
+            first = i
+
+
+class RowColumn:
+    """One field of a list of input dicts, read from the dicts on access
+
+    Iterating maps itemgetter over the rows, so a column that is only looked
+    up once is read in the same pass as the lookup instead of being copied
+    into a list first.
+    """
+
+    __slots__ = ('rows', 'getter')
+
+    def __init__(self, rows, field):
+        self.rows = rows
+        self.getter = itemgetter(field)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return map(self.getter, self.rows)
+
+    def __getitem__(self, index):
+        return self.getter(self.rows[index])
+
+
+def rows_to_columns(data_rows):
+    """Turn input dicts into columns: float64 arrays for numeric fields, lists otherwise"""
+    columns = {}
+    for field in INPUT_FIELDS:
+        values = map(itemgetter(field), data_rows)
+        if field in NUMERIC_FIELDS:
+            columns[field] = np.fromiter(values, dtype=np.float64, count=len(data_rows))
+        else:
+            columns[field] = list(values)
+    return columns
+
+
+def parse_local_time(value):
+    """Parse a HH:MM:SS string into (hour, minute), raise ValueError if invalid"""
+    parts = str(value).split(':')
+    if len(parts) != 3 or not all(part.isdigit() and 1 <= len(part) <= 2 for part in parts):
+        raise ValueError(f"Invalid LOCAL_TIME (expected HH:MM:SS): {value!r}")
+    hour, minute, second = (int(part) for part in parts)
+    if hour > 23 or minute > 59 or second > 59:
+        raise ValueError(f"Invalid LOCAL_TIME (expected HH:MM:SS): {value!r}")
+    return hour, minute
+
+
+class FeatureEncoder:
+    """NumPy implementation of the fitted preprocessing pipeline
+
+    Reproduces the feature engineering of predictor.preprocessing and the
+    ColumnTransformer stored in preprocessor.pkl, writing every transformer
+    output straight into its slice of a preallocated float32 matrix.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.n_features = spec['n_features']
+        self.yeo_johnson = spec['yeo_johnson']
+        self.numerical = spec['numerical']
+        self.nominal = spec['nominal']
+        self.ordinal = spec['ordinal']
+        self.multi_label = spec['multi_label']
+        self.passthrough = spec['passthrough']
+        # Pickle the spec was exported from, when loaded from a spec file
+        self.source = None
+
+        # Category -> output column lookups
+        self.nominal_lookup = {
+            column['name']: {category: index for index, category in enumerate(column['categories'])}
+            for column in self.nominal
+        }
+        self.visibility_codes = np.array(
+            [self.ordinal['categories'].index(label) for label in VISIBILITY_LABELS], dtype=np.float64
+        )
+        self.multi_label_index = {label: index for index, label in enumerate(self.multi_label['classes'])}
+
+        self.hour_table = cyclical_table(24)
+        self.minute_table = cyclical_table(60)
+        # Unknown week days map to NaN, like the pandas .map() of the training pipeline
+        week_cos, week_sin = cyclical_table(7)
+        self.week_day_table = (np.append(week_cos, np.nan), np.append(week_sin, np.nan))
+        # Minute of the day of the LOCAL_TIME strings parsed, bounded by the number of valid HH:MM:SS values
+        self.local_times = {}
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor):
+        """Compile an encoder from the fitted ColumnTransformer"""
+        transformers = preprocessor.named_transformers_
+        slices = preprocessor.output_indices_
+
+        power = transformers['yeo_johnson']
+        scaler = transformers['numerical']
+        one_hot = transformers['nominal']
+        ordinal = transformers['ordinal']
+        multi_label = transformers['multi_label']
+        columns = {name: list(cols) for name, _, cols in preprocessor.transformers_ if name != 'remainder'}
+
+        nominal = []
+        offset = slices['nominal'].start
+        for name, categories in zip(columns['nominal'], one_hot.categories_):
+            nominal.append({'name': name, 'categories': categories.tolist(), 'start': offset})
+            offset += len(categories)
+
+        spec = {
+            'n_features': len(preprocessor.get_feature_names_out()),
+            'yeo_johnson': {
+                'columns': columns['yeo_johnson'],
+                'lambdas': power.lambdas_.tolist(),
+                'mean': power._scaler.mean_.tolist() if power.standardize else None,
+                'scale': power._scaler.scale_.tolist() if power.standardize else None,
+                'start': slices['yeo_johnson'].start,
+            },
+            'numerical': {
+                'columns': columns['numerical'],
+                'mean': scaler.mean_.tolist(),
+                'scale': scaler.scale_.tolist(),
+                'start': slices['numerical'].start,
+            },
+            'nominal': nominal,
+            'ordinal': {
+                'categories': [str(category) for category in ordinal.categories_[0]],
+                'start': slices['ordinal'].start,
+            },
+            'multi_label': {
+                'classes': [str(label) for label in multi_label.mlb.classes_],
+                'start': slices['multi_label'].start,
+            },
+            'passthrough': {
+                'columns': columns['passthrough'],
+                'start': slices['passthrough'].start,
+            },
+        }
+        return cls(spec)
+
+    @classmethod
+    def load(cls, path):
+        """Load an encoder from the JSON spec written by save(), without pandas or sklearn"""
+        with open(path) as f:
+            spec = json.load(f)
+        if spec.pop('format', None) != SPEC_FORMAT:
+            raise ValueError(f"{path} is not a version {SPEC_FORMAT} preprocessor spec")
+        source = spec.pop('source', None)
+        encoder = cls(spec)
+        encoder.source = source
+        return encoder
+
+    def save(self, path, source=None):
+        """Write the fitted parameters as a JSON spec, with a description of the pickle they come from"""
+        with open(path, 'w') as f:
+            json.dump({'format': SPEC_FORMAT, 'source': source, **self.spec}, f, indent=1)
+
+    def categories(self, column):
+        """Return the categories of a one-hot encoded column and the index of its first output column"""
+        for nominal in self.nominal:
+            if nominal['name'] == column:
+                return nominal['categories'], nominal['start']
+        raise KeyError(f"{column} is not a one-hot encoded column")
+
+    def encode_rows(self, data_rows):
+        """Encode a list of input dicts, reading the category fields while they are looked up"""
+        columns = {}
+        for field in INPUT_FIELDS:
+            if field in NUMERIC_FIELDS:
+                values = map(itemgetter(field), data_rows)
+                columns[field] = np.fromiter(values, dtype=np.float64, count=len(data_rows))
+            else:
+                columns[field] = RowColumn(data_rows, field)
+        return self.encode_columns(columns)
+
+    def encode_columns(self, columns):
+        """Encode input columns (one sequence per input field) into a float32 feature matrix"""
+        n_rows = len(columns['LOCAL_TIME'])
+        out = np.zeros((n_rows, self.n_features), dtype=np.float32)
+        numeric = {field: np.asarray(columns[field], dtype=np.float64) for field in NUMERIC_FIELDS}
+        # Output columns other than the one-hot blocks, written together at the end
+        dense = {}
+
+        # Yeo-Johnson transformation, then standardization
+        start = self.yeo_johnson['start']
+        for i, (column, lmbda) in enumerate(zip(self.yeo_johnson['columns'], self.yeo_johnson['lambdas'])):
+            values = yeo_johnson_transform(numeric[column], lmbda)
+            if self.yeo_johnson['mean'] is not None:
+                values = (values - self.yeo_johnson['mean'][i]) / self.yeo_johnson['scale'][i]
+            dense[start + i] = values
+
+        # Standard scaling
+        start = self.numerical['start']
+        for i, column in enumerate(self.numerical['columns']):
+            dense[start + i] = (numeric[column] - self.numerical['mean'][i]) / self.numerical['scale'][i]
+
+        # One-hot encoding, SEASON is derived from LOCAL_MONTH
+        rows = np.arange(n_rows)
+        for nominal in self.nominal:
+            name = nominal['name']
+            if name == 'SEASON':
+                lookup = self.nominal_lookup[name]
+                is_summer = np.isin(numeric['LOCAL_MONTH'], SUMMER_MONTHS)
+                indices = np.where(is_summer, lookup['Summer'], lookup['Winter'])
+            else:
+                indices = self.lookup_categories(name, columns[name])
+            out[rows, nominal['start'] + indices] = 1
+
+        # Ordinal encoding of the VISIBILITY buckets
+        buckets = np.zeros(n_rows, dtype=np.intp)
+        for threshold in VISIBILITY_THRESHOLDS:
+            buckets += numeric['VISIBILITY'] >= threshold
+        dense[self.ordinal['start']] = self.visibility_codes[buckets]
+
+        # Multi-label binarization of the regrouped weather conditions
+        start = self.multi_label['start']
+        codes, inverse = self.weather_codes(columns['WEATHER_ENG_DESC'])
+        for i in range(codes.shape[1]):
+            dense[start + i] = codes[:, i][inverse]
+
+        # Cyclical encodings and binary precipitation flag
+        start = self.passthrough['start']
+        derived = self.passthrough_columns(columns, numeric)
+        for i, column in enumerate(self.passthrough['columns']):
+            dense[start + i] = derived[column]
+
+        write_columns(out, dense)
+        return out
+
+    def lookup_categories(self, name, values):
+        """Return the category index of every value, raise ValueError on unknown categories"""
+        codes = lookup_column(self.nominal_lookup[name], values)
+        if (codes < 0).any():
+            unknown = sorted({str(values[index]) for index in np.flatnonzero(codes < 0)})
+            raise ValueError(f"Found unknown categories {unknown} in column {name}")
+        return codes
+
+    def weather_codes(self, descriptions):
+        """Binarize the distinct weather descriptions, return (codes, index of each row's code)"""
+        distinct, inverse = factorize(descriptions)
+        codes = np.zeros((len(distinct), len(self.multi_label_index)), dtype=np.float32)
+        for row, description in enumerate(distinct):
+            for condition in description.split(','):
+                condition = WEATHER_MAP.get(condition, condition)
+                # Conditions unknown to the fitted binarizer are ignored
+                if condition in self.multi_label_index:
+                    codes[row, self.multi_label_index[condition]] = 1
+        return codes, inverse
+
+    def minutes_of_day(self, values):
+        """Return the minute of the day of LOCAL_TIME values, caching the valid values parsed"""
+        minutes = lookup_column(self.local_times, values)
+        for index in np.flatnonzero(minutes < 0):
+            value = values[index]
+            if value not in self.local_times:
+                hour, minute = parse_local_time(value)
+                self.local_times[value] = hour * 60 + minute
+            minutes[index] = self.local_times[value]
+        return minutes
+
+    def passthrough_columns(self, columns, numeric):
+        """Compute the cyclical encodings and the precipitation flag"""
+        hours, minutes = np.divmod(self.minutes_of_day(columns['LOCAL_TIME']), 60)
+        # Unknown week days point to the NaN entry of the table
+        week_days = lookup_column(DAY_MAPPING, columns['WEEK_DAY'], default=7)
+
+        derived = {
+            'LOCAL_TIME_HOUR_COS': self.hour_table[0][hours],
+            'LOCAL_TIME_HOUR_SIN': self.hour_table[1][hours],
+            'LOCAL_TIME_MINUTE_COS': self.minute_table[0][minutes],
+            'LOCAL_TIME_MINUTE_SIN': self.minute_table[1][minutes],
+            'WEEK_DAY_COS': self.week_day_table[0][week_days],
+            'WEEK_DAY_SIN': self.week_day_table[1][week_days],
+            'PRECIP_AMOUNT_BINARY': numeric['PRECIP_AMOUNT'] > 0,
+        }
+        for column, max_value in (('LOCAL_MONTH', 12), ('LOCAL_DAY', 31), ('WIND_DIRECTION', 360)):
+            angle = 2 * np.pi * numeric[column] / max_value
+            derived[f'{column}_COS'] = np.cos(angle)
+            derived[f'{column}_SIN'] = np.sin(angle)
+        return derived
+
+
+def yeo_johnson_transform(x, lmbda):
+    """Yeo-Johnson transformation of x, as computed by sklearn's PowerTransformer"""
+    out = np.zeros_like(x)
+    pos = x >= 0
+
+    with np.errstate(invalid='ignore'):
+        # when x >= 0
+        if abs(lmbda) < np.spacing(1.0):
+            out[pos] = np.log1p(x[pos])
+        else:
+            out[pos] = (np.power(x[pos] + 1, lmbda) - 1) / lmbda
+
+        # when x < 0
+        if abs(lmbda - 2) > np.spacing(1.0):
+            out[~pos] = -(np.power(-x[~pos] + 1, 2 - lmbda) - 1) / (2 - lmbda)
+        else:
+            out[~pos] = -np.log1p(-x[~pos])
+
+    return out
@@ -0,0 +1,142 @@
+import bisect
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the rows-per-model-call histogram buckets
+BATCH_ROWS_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+
+def format_labels(names, values, extra=()):
+    """Format label pairs as {name="value",...} (empty string without labels)"""
+    pairs = [(name, value) for name, value in zip(names, values)] + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Histogram:
+    """Prometheus histogram, one series per combination of label values"""
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.series = {}  # label values -> [count per bucket..., count above the last bucket, sum]
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {labels: list(values) for labels, values in self.series.items()}
+        for label_values, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                labels = format_labels(self.label_names, label_values, [('le', bound)])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {values[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CounterCollector:
+    """Counters read from a callback at scrape time, e.g. the cache statistics
+
+    `collect` returns {label value: value}, or {(label values...): value}
+    when `label_name` is a tuple of label names.
+    """
+    metric_type = 'counter'
+
+    def __init__(self, name, documentation, label_name, collect):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_name if isinstance(label_name, tuple) else (label_name,)
+        self.collect = collect
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for label_values, value in self.collect().items():
+            if not isinstance(label_values, tuple):
+                label_values = (label_values,)
+            lines.append(f"{self.name}{format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class GaugeCollector(CounterCollector):
+    """Current values read from a callback at scrape time, e.g. the queue depth"""
+    metric_type = 'gauge'
+
+
+class MetricsRegistry:
+    """Metrics rendered together in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """Records the time spent in each consecutive stage of a request"""
+
+    def __init__(self, histogram, endpoint):
+        self.histogram = histogram
+        self.endpoint = endpoint
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        """Close the current stage, started at the previous mark"""
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, self.endpoint, stage)
+        self.last = now
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'prediction_api_request_duration_seconds',
+    'Time spent handling HTTP requests',
+    ['endpoint', 'method', 'status']
+))
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    'prediction_api_stage_duration_seconds',
+    'Time spent in each stage of a prediction request',
+    ['endpoint', 'stage']
+))
+MODEL_STAGE_LATENCY = REGISTRY.register(Histogram(
+    'prediction_model_stage_duration_seconds',
+    'Time spent encoding features and running the inference backend, per model call',
+    ['stage']
+))
+BATCH_ROWS = REGISTRY.register(Histogram(
+    'prediction_model_batch_rows',
+    'Rows scored per model call',
+    buckets=BATCH_ROWS_BUCKETS
+))
+ADMISSION_WAIT = REGISTRY.register(Histogram(
+    'prediction_api_admission_wait_seconds',
+    'Time accepted requests waited for a processing slot',
+    ['endpoint']
+))
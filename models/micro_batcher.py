@@ -0,0 +1,134 @@
+import threading
+import time
+
+from admission import DeadlineExceeded
+from prediction_cache import InFlightCall
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into vectorized batch calls
+
+    A background thread takes the queued rows, up to `max_batch_size`, and
+    scores them with one `predict_batch` call. The time it waits for the
+    batch to fill adapts to the traffic: when fewer than one more request
+    is expected within `max_wait` seconds (low traffic) rows are scored
+    immediately, otherwise it waits for about the time needed to fill the
+    batch at the observed arrival rate, never more than `max_wait`.
+    Rows whose request deadline passed while queued are dropped from the
+    batch and their request raises DeadlineExceeded.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=64, max_wait=0.002,
+                 smoothing=0.2, clock=time.monotonic):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.smoothing = smoothing
+        self.clock = clock
+
+        self.condition = threading.Condition()
+        self.queue = []  # (row, InFlightCall, expiry on `clock` or None)
+        self.thread = None
+        # Moving average of the time between two requests
+        self.interarrival = float('inf')
+        self.last_arrival = None
+        self.counters = {
+            'requests': 0,
+            'batches': 0,
+            'largest_batch': 0,
+            'errors': 0,
+            'expired': 0
+        }
+
+    def submit(self, row, timeout=None):
+        """Queue a validated row and block until its prediction is available
+
+        With a `timeout` (seconds left before the request's deadline), the row
+        is not scored once it expired and DeadlineExceeded is raised instead.
+        """
+        call = InFlightCall()
+        with self.condition:
+            now = self.clock()
+            expiry = None if timeout is None else now + timeout
+            if self.last_arrival is not None:
+                gap = now - self.last_arrival
+                if self.interarrival == float('inf'):
+                    self.interarrival = gap
+                else:
+                    self.interarrival += self.smoothing * (gap - self.interarrival)
+            self.last_arrival = now
+
+            self.queue.append((row, call, expiry))
+            self.counters['requests'] += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='micro-batcher', daemon=True)
+                self.thread.start()
+            self.condition.notify()
+        return call.wait()
+
+    def window(self, queued):
+        """Seconds to wait for more rows given the number already queued (lock must be held)"""
+        if queued >= self.max_batch_size or self.interarrival > self.max_wait:
+            return 0.0
+        return min(self.max_wait, (self.max_batch_size - queued) * self.interarrival)
+
+    def run(self):
+        """Background loop collecting and scoring batches"""
+        while True:
+            with self.condition:
+                while not self.queue:
+                    self.condition.wait()
+                deadline = self.clock() + self.window(len(self.queue))
+                while len(self.queue) < self.max_batch_size:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                expired = self.drop_expired()
+                batch = self.queue[:self.max_batch_size]
+                del self.queue[:self.max_batch_size]
+            for _, call, _ in expired:
+                call.set_error(DeadlineExceeded('micro_batch'))
+            if batch:
+                self.score(batch)
+
+    def drop_expired(self):
+        """Remove and return the queued rows whose deadline passed (lock must be held)"""
+        now = self.clock()
+        expired = [entry for entry in self.queue if entry[2] is not None and entry[2] <= now]
+        if expired:
+            self.queue = [entry for entry in self.queue if entry[2] is None or entry[2] > now]
+            self.counters['expired'] += len(expired)
+        return expired
+
+    def score(self, batch):
+        """Score a batch with one model call and hand each result to its request"""
+        with self.condition:
+            self.counters['batches'] += 1
+            self.counters['largest_batch'] = max(self.counters['largest_batch'], len(batch))
+        try:
+            predictions = self.predict_batch([row for row, _, _ in batch])
+        except Exception as e:
+            with self.condition:
+                self.counters['errors'] += 1
+            for _, call, _ in batch:
+                call.set_error(e)
+            return
+
+        for (_, call, _), prediction in zip(batch, predictions):
+            call.set_result(float(prediction))
+
+    def stats(self):
+        """Return the counters, the mean batch size and the current wait window"""
+        with self.condition:
+            batches = self.counters['batches']
+            scored = self.counters['requests'] - self.counters['expired'] - len(self.queue)
+            return {
+                **self.counters,
+                'mean_batch_size': round(scored / batches, 2) if batches else None,
+                'queued': len(self.queue),
+                'interarrival_ms': round(self.interarrival * 1000, 3) if self.interarrival != float('inf') else None,
+                'window_ms': round(self.window(1) * 1000, 3),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000
+            }
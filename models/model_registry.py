@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+MANIFEST_FILE = 'manifest.json'
+# Name of the active version
+CURRENT_FILE = 'CURRENT'
+# Activated versions, one per line, oldest first (used by rollback)
+HISTORY_FILE = 'HISTORY'
+
+
+def sha256_file(path):
+    """Return the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_atomic(path, text):
+    """Write a small text file so readers see either the old or the new content"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    with os.fdopen(fd, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts stored as <root>/<version>/ directories.
+
+    Each version holds preprocessor.pkl, the inference backend artifacts and
+    a manifest.json (artifact digests, feature count and names, training data
+    digest, metrics). The CURRENT file names the active version, so every
+    worker process reading the registry converges on the same version.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def versions(self):
+        """Return the published versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        manifests = []
+        for name in os.listdir(self.root):
+            if os.path.isfile(os.path.join(self.root, name, MANIFEST_FILE)):
+                manifests.append(self.manifest(name))
+        return [manifest['version'] for manifest in sorted(manifests, key=lambda m: (m['created_at'], m['version']))]
+
+    def path(self, version):
+        """Return the directory of a published version, raise KeyError if unknown"""
+        if version not in self.versions():
+            raise KeyError(f"Unknown model version: {version!r}")
+        return os.path.join(self.root, version)
+
+    def manifest(self, version):
+        with open(os.path.join(self.root, version, MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    def current(self):
+        """Return the active version, or None when the registry has not been activated"""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def history(self):
+        try:
+            with open(os.path.join(self.root, HISTORY_FILE)) as f:
+                return [line.strip() for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def activate(self, version):
+        """Make a published version the active one"""
+        self.path(version)
+        write_atomic(os.path.join(self.root, CURRENT_FILE), version + '\n')
+        with open(os.path.join(self.root, HISTORY_FILE), 'a') as f:
+            f.write(version + '\n')
+
+    def previous(self):
+        """Return the version active before the current one, or None"""
+        current = self.current()
+        for version in reversed(self.history()):
+            if version != current and os.path.isdir(os.path.join(self.root, version)):
+                return version
+        return None
+
+    def verify(self, version):
+        """Check the artifacts of a version against the digests of its manifest"""
+        directory = self.path(version)
+        manifest = self.manifest(version)
+        for name, digest in manifest['artifacts'].items():
+            if sha256_file(os.path.join(directory, name)) != digest:
+                raise ValueError(f"Artifact {name} of version {version!r} does not match its manifest")
+        return manifest
+
+    def publish(self, version, files, **metadata):
+        """
+        Copy artifact files into a new version directory and write its manifest.
+
+        Parameters:
+        version (str): Name of the new version (letters, digits, '.', '_' and '-').
+        files (list): Paths of the artifacts, copied under their base name, or
+            (path, name) pairs where name may include a subdirectory.
+        metadata: Extra manifest entries (features, training data, metrics...).
+
+        Returns:
+        dict: The manifest of the new version.
+        """
+        if not version or not all(c.isalnum() or c in '._-' for c in version) or version.startswith('.'):
+            raise ValueError(f"Invalid version name: {version!r}")
+        target = os.path.join(self.root, version)
+        if os.path.exists(target):
+            raise ValueError(f"Version {version!r} already exists")
+
+        os.makedirs(self.root, exist_ok=True)
+        # Build the version aside, then rename it so it never appears half-written
+        staging = tempfile.mkdtemp(dir=self.root, prefix='.tmp-')
+        try:
+            artifacts = {}
+            for path in files:
+                path, name = path if isinstance(path, tuple) else (path, os.path.basename(path))
+                os.makedirs(os.path.dirname(os.path.join(staging, name)), exist_ok=True)
+                shutil.copyfile(path, os.path.join(staging, name))
+                artifacts[name] = sha256_file(os.path.join(staging, name))
+            manifest = {
+                'version': version,
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'artifacts': artifacts,
+                **metadata
+            }
+            with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return manifest
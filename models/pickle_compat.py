@@ -0,0 +1,19 @@
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.preprocessing import MultiLabelBinarizer
+
+
+# Same class as in the data preprocessing scripts, needed to unpickle preprocessor.pkl
+class MultiLabelBinarizerWrapper(BaseEstimator, TransformerMixin):
+    def __init__(self):
+        self.mlb = MultiLabelBinarizer()
+
+    def fit(self, X, y=None):
+        self.mlb.fit(X.iloc[:, 0])
+        return self
+
+    def transform(self, X):
+        return self.mlb.transform(X.iloc[:, 0])
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array([str(cls) for cls in self.mlb.classes_])
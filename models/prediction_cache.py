@@ -0,0 +1,194 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from admission import DeadlineExceeded
+from feature_encoder import INPUT_FIELDS, NUMERIC_FIELDS
+
+
+def canonical_row(data_row, decimals=2):
+    """Return the canonical (key, row) form of a validated input row
+
+    Numeric fields are converted to floats rounded to `decimals`, ROUTE is
+    kept as given and the other fields are converted to strings; unused
+    fields are dropped. The returned row is the one to score, so every
+    request sharing a key gets exactly the same prediction: with the cache
+    on, inputs are quantized to `decimals` before scoring.
+    """
+    row = {}
+    for field in INPUT_FIELDS:
+        value = data_row[field]
+        if field in NUMERIC_FIELDS:
+            value = round(float(value), decimals)
+        elif field != 'ROUTE':
+            value = str(value)
+        row[field] = value
+    key = tuple(row[field] for field in INPUT_FIELDS)
+    return key, row
+
+
+def estimate_size(obj):
+    """Rough size in bytes of a cache key or value (containers are walked one level deep)"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in obj.items())
+    elif isinstance(obj, (tuple, list)):
+        size += sum(sys.getsizeof(item) for item in obj)
+    return size
+
+
+class InFlightCall:
+    """Result of a computation shared by every request waiting on the same key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def set_result(self, value):
+        self.value = value
+        self.done.set()
+
+    def set_error(self, error):
+        self.error = error
+        self.done.set()
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class PredictionCache:
+    """Bounded LRU + TTL cache with in-flight deduplication
+
+    Entries are evicted in least-recently-used order once either
+    `max_entries` or `max_bytes` is exceeded, and expire `ttl` seconds after
+    being stored. Concurrent misses on the same key share one computation.
+    When `version_func` returns a new value (the model artifact changed),
+    the whole cache is dropped.
+    """
+
+    def __init__(self, max_entries=10000, ttl=3600.0, max_bytes=64 * 1024 * 1024,
+                 version_func=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.version_func = version_func
+        self.clock = clock
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires_at, size, value)
+        self.in_flight = {}
+        self.bytes = 0
+        self.version = None
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'deduplicated': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    def get_or_compute(self, key, compute, timeout=None):
+        """Return the cached value for key, or compute it once and store it
+
+        A request sharing another one's computation waits at most `timeout`
+        seconds (its own time left) and then raises DeadlineExceeded. When
+        that computation failed because its request ran out of time, the
+        waiting requests do not inherit the error and compute the value again.
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        version = self.version_func() if self.version_func else None
+        while True:
+            with self.lock:
+                self.check_version(version)
+                entry = self.entries.get(key)
+                if entry is not None:
+                    if entry[0] > self.clock():
+                        self.entries.move_to_end(key)
+                        self.counters['hits'] += 1
+                        return entry[2]
+                    self.remove(key)
+                    self.counters['expirations'] += 1
+
+                call = self.in_flight.get(key)
+                if call is not None:
+                    self.counters['deduplicated'] += 1
+                    leader = False
+                else:
+                    call = self.in_flight[key] = InFlightCall()
+                    self.counters['misses'] += 1
+                    leader = True
+
+            if leader:
+                break
+            if not call.done.wait(None if deadline is None else max(0.0, deadline - self.clock())):
+                raise DeadlineExceeded('predict')
+            if not isinstance(call.error, DeadlineExceeded):
+                return call.wait()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            call.set_error(e)
+            raise
+
+        with self.lock:
+            self.in_flight.pop(key, None)
+            # Do not store values computed with a model that has been replaced meanwhile
+            if version == self.version:
+                self.store(key, value)
+        call.set_result(value)
+        return value
+
+    def check_version(self, version):
+        """Drop every entry when the model version changed (lock must be held)"""
+        if version == self.version:
+            return
+        if self.version is not None:
+            self.counters['invalidations'] += 1
+        self.entries.clear()
+        self.bytes = 0
+        self.version = version
+
+    def store(self, key, value):
+        """Insert an entry and evict until the limits are met (lock must be held)"""
+        if key in self.entries:
+            self.remove(key)
+        size = estimate_size(key) + estimate_size(value)
+        self.entries[key] = (self.clock() + self.ttl, size, value)
+        self.bytes += size
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            self.remove(next(iter(self.entries)))
+            self.counters['evictions'] += 1
+
+    def remove(self, key):
+        """Remove an entry (lock must be held)"""
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        """Drop every entry"""
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Return the counters and the current size of the cache"""
+        with self.lock:
+            return {
+                **self.counters,
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'in_flight': len(self.in_flight),
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'version': self.version
+            }
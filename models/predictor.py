@@ -1,74 +1,724 @@
+import hashlib
+import json
 import os
+import sys
+import threading
+import time
+import warnings
 
 import numpy as np
-import pandas as pd
-import joblib
-from sklearn.base import BaseEstimator, TransformerMixin
-from sklearn.preprocessing import MultiLabelBinarizer
+
+from metrics import MODEL_STAGE_LATENCY, BATCH_ROWS
+from model_registry import ModelRegistry, sha256_file
+from feature_encoder import (
+    FeatureEncoder,
+    INPUT_FIELDS,
+    NUMERIC_FIELDS,
+    DAY_MAPPING,
+    WEATHER_MAP,
+    SUMMER_MONTHS,
+    factorize,
+    parse_local_time,
+    rows_to_columns
+)
 
 def cyclical_encoding(df, column, max_value):
     """Apply cyclical encoding to a single value."""
+    import pandas as pd
     num_col = pd.to_numeric(df[column])
     cos = np.cos(2 * np.pi * num_col / max_value).tolist()
     sin = np.sin(2 * np.pi * num_col / max_value).tolist()
     return cos, sin
 
-class MultiLabelBinarizerWrapper(BaseEstimator, TransformerMixin):
-    def __init__(self):
-        self.mlb = MultiLabelBinarizer()
+def __getattr__(name):
+    # The unpickling wrapper needs sklearn, it is only imported when asked for
+    if name == 'MultiLabelBinarizerWrapper':
+        from pickle_compat import MultiLabelBinarizerWrapper
+        return MultiLabelBinarizerWrapper
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    def fit(self, X, y=None):
-        self.mlb.fit(X.iloc[:, 0])
-        return self
+# Get the directory of the current file
+current_dir = os.path.dirname(os.path.abspath(__file__))
+# Model version in use (preprocessor, encoder and backend), replaced as a whole on reload
+active_model = None
+# Guards the lazy loaders against concurrent first requests
+load_lock = threading.RLock()
+# Serializes reloads, predictions never wait on it
+reload_lock = threading.Lock()
 
-    def transform(self, X):
-        return self.mlb.transform(X.iloc[:, 0])
+# Versioned artifacts; until a version is activated the artifacts next to this file are used
+registry = ModelRegistry(os.environ.get('PREDICTION_MODEL_REGISTRY', os.path.join(current_dir, 'registry')))
 
-    def get_feature_names_out(self, input_features=None):
-        return np.array([str(cls) for cls in self.mlb.classes_])
+# Loading, warm-up and reload state reported by the health endpoints
+warm_up_state = {'started': False, 'done': False, 'error': None}
+reload_state = {'loading': None, 'error': None, 'previous': None}
 
-# Get the directory of the current file
-current_dir = os.path.dirname(os.path.abspath(__file__))
-preprocessor = None
-model = None
+# The model used to be fed the sparse output of the ColumnTransformer, where
+# XGBoost treats every zero entry as missing. The encoder produces dense
+# matrices, so zeros are flagged as missing to keep the same predictions.
+MISSING_VALUE = 0.0
+
+# Preprocessing artifacts of a model directory: the fitted parameters as JSON
+# (written by scripts/export_model.py), else the pickled ColumnTransformer
+PREPROCESSOR_SPEC = 'preprocessor_spec.json'
+PREPROCESSOR_PICKLE = 'preprocessor.pkl'
+
+# Inference backend used by get_model(), see INFERENCE_BACKENDS
+INFERENCE_BACKEND = os.environ.get('PREDICTION_BACKEND', 'sklearn')
+
+# Threads used by one predict call of the backend (unset keeps the library default)
+INFERENCE_THREADS = int(os.environ['PREDICTION_INFERENCE_THREADS']) if os.environ.get('PREDICTION_INFERENCE_THREADS') else None
+
+# Latency tiers: number of boosting rounds scored by each tier, picked offline from the
+# accuracy-versus-latency curve of scripts/tune_latency_tiers.py; only `full` (all rounds)
+# is available for a model without a truncation that pays off
+LATENCY_TIERS_FILE = 'latency_tiers.json'
+TIERS = ['fast', 'balanced', 'full']
+DEFAULT_TIER = 'full'
+
+# Worker count, inference threads per worker and CPU pinning tuned for the host
+# by scripts/tune_inference.py, read by serve.py (environment variables take precedence)
+INFERENCE_CONFIG_FILE = os.environ.get('PREDICTION_INFERENCE_CONFIG', os.path.join(current_dir, 'inference_config.json'))
+
+# Score each row with the model of its season, loaded from the summer/ and winter/
+# subdirectories of the model artifacts (the global model is used when missing)
+SEASON_ROUTING = os.environ.get('PREDICTION_SEASON_MODELS', 'False').lower() == 'true'
+SEASONS = ['Summer', 'Winter']
+
+# Synthetic input used to warm up the model
+WARM_UP_ROW = {
+    "ROUTE": 91,
+    "LOCAL_TIME": "02:30:00",
+    "WEEK_DAY": "Sunday",
+    "INCIDENT": "External",
+    "LOCAL_MONTH": 1.0,
+    "LOCAL_DAY": 1.0,
+    "TEMP": 3.7,
+    "DEW_POINT_TEMP": 1.7,
+    "HUMIDEX": 1.982109270289648,
+    "PRECIP_AMOUNT": 0.0,
+    "RELATIVE_HUMIDITY": 87.0,
+    "STATION_PRESSURE": 100.27,
+    "VISIBILITY": 16.1,
+    "WEATHER_ENG_DESC": "Clear",
+    "WIND_DIRECTION": 28.0,
+    "WIND_SPEED": 17.0
+}
+
+def file_digest(path):
+    """Return a short SHA-256 digest of a file, used as artifact version"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+def load_preprocessor(path):
+    """Unpickle a fitted ColumnTransformer (imports pandas and sklearn)"""
+    import joblib
+    from pickle_compat import MultiLabelBinarizerWrapper
+
+    # preprocessor.pkl was pickled from a script, so the wrapper class is looked up in __main__
+    main_module = sys.modules['__main__']
+    if not hasattr(main_module, 'MultiLabelBinarizerWrapper'):
+        main_module.MultiLabelBinarizerWrapper = MultiLabelBinarizerWrapper
+    return joblib.load(path)
+
+def load_encoder(directory):
+    """
+    Load the feature encoder of a model directory.
+
+    The JSON spec written by scripts/export_model.py is read with NumPy only;
+    without it, or when preprocessor.pkl changed since it was exported, the
+    encoder is compiled from the unpickled preprocessor.
+
+    Returns:
+    tuple: (FeatureEncoder, unpickled preprocessor or None)
+    """
+    spec_path = os.path.join(directory, PREPROCESSOR_SPEC)
+    pickle_path = os.path.join(directory, PREPROCESSOR_PICKLE)
+    if os.path.isfile(spec_path):
+        encoder = FeatureEncoder.load(spec_path)
+        digest = (encoder.source or {}).get('sha256')
+        if not os.path.isfile(pickle_path) or digest == sha256_file(pickle_path):
+            return encoder, None
+        warnings.warn(f"{spec_path} was exported from another {PREPROCESSOR_PICKLE}, "
+                      f"using the pickle (run scripts/export_model.py to update it)")
+    preprocessor = load_preprocessor(pickle_path)
+    return FeatureEncoder.from_preprocessor(preprocessor), preprocessor
+
+class SklearnBackend:
+    """Pickled XGBRegressor sklearn wrapper"""
+    artifact = 'xgb_model.pkl'
+
+    def __init__(self, path, n_threads=None):
+        import joblib
+        self.model = joblib.load(path)
+        self.model.set_params(missing=MISSING_VALUE)
+        self.set_threads(n_threads)
+
+    def set_threads(self, n_threads):
+        if n_threads is not None:
+            self.model.set_params(n_jobs=n_threads)
+
+    @property
+    def n_rounds(self):
+        return self.model.get_booster().num_boosted_rounds()
+
+    def predict(self, features, iteration_range=None):
+        return self.model.predict(features, iteration_range=iteration_range)
+
+
+class BoosterBackend:
+    """Native XGBoost Booster loaded from the UBJSON model format, scored with inplace_predict"""
+    artifact = 'xgb_model.ubj'
+
+    def __init__(self, path, n_threads=None):
+        import xgboost
+        self.booster = xgboost.Booster()
+        self.booster.load_model(path)
+        self.set_threads(n_threads)
+
+    def set_threads(self, n_threads):
+        if n_threads is not None:
+            self.booster.set_param({'nthread': n_threads})
+
+    @property
+    def n_rounds(self):
+        return self.booster.num_boosted_rounds()
+
+    def predict(self, features, iteration_range=None):
+        # (0, 0) scores every round
+        return self.booster.inplace_predict(features, iteration_range=iteration_range or (0, 0), missing=MISSING_VALUE)
+
+
+class OnnxBackend:
+    """ONNX Runtime session on the converted tree ensemble"""
+    artifact = 'xgb_model.onnx'
+    # The converted ensemble cannot be truncated, every tier scores all the trees
+    n_rounds = None
+
+    def __init__(self, path, n_threads=None):
+        self.path = path
+        self.set_threads(n_threads)
+
+    def set_threads(self, n_threads):
+        # The thread pools belong to the session, so it is created again
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = n_threads or 0
+        self.session = onnxruntime.InferenceSession(self.path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, features, iteration_range=None):
+        # ONNX tree ensembles only treat NaN as missing
+        features = np.where(features == MISSING_VALUE, np.float32(np.nan), features).astype(np.float32, copy=False)
+        return self.session.run(None, {self.input_name: features})[0].ravel()
+
+
+class NumpyTreeBackend:
+    """Flattened node tables evaluated with NumPy only, no XGBoost at serving time"""
+    artifact = 'xgb_model_trees.npz'
+
+    def __init__(self, path, n_threads=None):
+        from tree_ensemble import TreeEnsemble
+        self.ensemble = TreeEnsemble.load(path, missing=MISSING_VALUE)
+
+    def set_threads(self, n_threads):
+        # NumPy gathers run on the calling thread
+        pass
+
+    @property
+    def n_rounds(self):
+        return len(self.ensemble.roots)
+
+    def predict(self, features, iteration_range=None):
+        return self.ensemble.predict(features, iteration_range)
+
+
+INFERENCE_BACKENDS = {
+    'sklearn': SklearnBackend,
+    'booster': BoosterBackend,
+    'onnx': OnnxBackend,
+    'numpy': NumpyTreeBackend
+}
+
+
+def load_backend(name, directory=current_dir, n_threads=None):
+    """Instantiate an inference backend from its artifact in directory"""
+    if name not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend {name!r}, expected one of {sorted(INFERENCE_BACKENDS)}")
+    backend = INFERENCE_BACKENDS[name]
+    path = os.path.join(directory, backend.artifact)
+    return backend(path, n_threads), file_digest(path)
+
+
+def load_latency_tiers(directory, backend):
+    """Return the iteration range of each available tier, only `full` (None, every round) when not tuned"""
+    tiers = {DEFAULT_TIER: None}
+    path = os.path.join(directory, LATENCY_TIERS_FILE)
+    if backend.n_rounds is None or not os.path.exists(path):
+        return tiers
+    with open(path) as f:
+        spec = json.load(f)
+    if spec['n_rounds'] != backend.n_rounds:
+        warnings.warn(f"{path} was tuned for a model of {spec['n_rounds']} rounds, "
+                      f"not {backend.n_rounds}, only the full tier is available")
+        return tiers
+    for tier, n_rounds in spec['tiers'].items():
+        if tier in TIERS and n_rounds is not None and n_rounds < backend.n_rounds:
+            tiers[tier] = (0, n_rounds)
+    return tiers
+
+
+class LoadedModel:
+    """Preprocessor, feature encoder and inference backend of one model version
+
+    Predictions read the active LoadedModel once, so a request never mixes
+    the encoder of one version with the model of another.
+    """
+
+    def __init__(self, directory, version=None, manifest=None):
+        self.directory = directory
+        self.manifest = manifest
+        self.load_times = {}
+
+        start = time.perf_counter()
+        self.encoder, self._preprocessor = load_encoder(directory)
+        self.load_times['preprocessor'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.backend, digest = load_backend(INFERENCE_BACKEND, directory, INFERENCE_THREADS)
+        self.load_times['model'] = time.perf_counter() - start
+        self.version = version or digest
+        self.tiers = load_latency_tiers(directory, self.backend)
+
+        if manifest is not None and manifest.get('n_features', self.encoder.n_features) != self.encoder.n_features:
+            raise ValueError(
+                f"Version {version!r} expects {manifest['n_features']} features, "
+                f"its preprocessor produces {self.encoder.n_features}"
+            )
+
+        # Season models, loaded on first use (None when the season has no artifacts)
+        self.season_models = {}
+        self.season_lock = threading.Lock()
+
+    @property
+    def preprocessor(self):
+        """The fitted ColumnTransformer, unpickled on first use when the encoder comes from its spec"""
+        if self._preprocessor is None:
+            self._preprocessor = load_preprocessor(os.path.join(self.directory, PREPROCESSOR_PICKLE))
+        return self._preprocessor
+
+    def season_model(self, season):
+        """Return the LoadedModel of a season, loading it lazily, or None without artifacts"""
+        if season not in self.season_models:
+            with self.season_lock:
+                if season not in self.season_models:
+                    directory = os.path.join(self.directory, season.lower())
+                    loaded = None
+                    if any(os.path.isfile(os.path.join(directory, name)) for name in (PREPROCESSOR_SPEC, PREPROCESSOR_PICKLE)):
+                        loaded = LoadedModel(directory, f"{self.version}/{season.lower()}")
+                    self.season_models[season] = loaded
+        return self.season_models[season]
+
+    def model_for_row(self, data_row):
+        """Return the model scoring a row: its season model when routing and able to encode it, else self"""
+        if not SEASON_ROUTING:
+            return self
+        season = 'Summer' if float(data_row['LOCAL_MONTH']) in SUMMER_MONTHS else 'Winter'
+        season_model = self.season_model(season)
+        # Network rows carry no ROUTE, the season model then scores its own routes
+        if season_model is None or ('ROUTE' in data_row and data_row['ROUTE'] not in season_model.encoder.nominal_lookup['ROUTE']):
+            return self
+        return season_model
+
+    def warm_up(self):
+        """Run synthetic inferences so the first requests on this version are not slow"""
+        start = time.perf_counter()
+        predict_batch([WARM_UP_ROW], self)
+        # One row per season, so the season models are loaded as well when routing
+        predict_batch([dict(WARM_UP_ROW, LOCAL_MONTH=7.0)] + [WARM_UP_ROW] * 63, self)
+        self.load_times['warm_up'] = time.perf_counter() - start
+
+
+def load_model_version(version=None):
+    """Load a registry version, or the artifacts next to this file when version is None"""
+    if version is None:
+        return LoadedModel(current_dir)
+    manifest = registry.verify(version)
+    return LoadedModel(registry.path(version), version, manifest)
+
+def get_loaded_model():
+    """Return the active model version, loading the registry's current one on first use"""
+    global active_model
+    loaded = active_model
+    if loaded is None:
+        with load_lock:
+            if active_model is None:
+                active_model = load_model_version(registry.current())
+            loaded = active_model
+    return loaded
 
 def get_preprocessor():
     """Load preprocessor lazily"""
-    global preprocessor
-    if preprocessor is None:
-        preprocessor = joblib.load(os.path.join(current_dir, 'preprocessor.pkl'))
-    return preprocessor
+    return get_loaded_model().preprocessor
+
+def get_encoder():
+    """Return the NumPy feature encoder compiled from the preprocessor"""
+    return get_loaded_model().encoder
 
 def get_model():
-    """Load model lazily"""
-    global model
-    if model is None:
-        model = joblib.load(os.path.join(current_dir, 'xgb_model.pkl'))
-    return model
+    """Load the inference backend lazily"""
+    return get_loaded_model().backend
+
+def get_model_version():
+    """Return the version of the active model, loading it if needed"""
+    return get_loaded_model().version
+
+def read_inference_config(path=INFERENCE_CONFIG_FILE):
+    """Return the tuned inference configuration, {} when there is none or it was tuned for another backend"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        config = json.load(f)
+    if config.get('backend') != INFERENCE_BACKEND:
+        warnings.warn(f"{path} was tuned for the {config.get('backend')} backend, not {INFERENCE_BACKEND}, ignoring it")
+        return {}
+    return config
+
+def available_cores():
+    """Return the cores this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count()))
+
+def worker_cores(slot, n_threads, cores=None):
+    """Return the cores of the worker in `slot`, each worker taking the next n_threads cores"""
+    cores = cores or available_cores()
+    return sorted({cores[(slot * n_threads + i) % len(cores)] for i in range(n_threads)})
+
+def pin_to_cores(cores):
+    """
+    Restrict this process to the given cores, before its inference threads
+    are started so they inherit it. Returns False where not supported (macOS).
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        return False
+    os.sched_setaffinity(0, cores)
+    return True
+
+def set_inference_threads(n_threads):
+    """Set the thread count of the inference backend, e.g. in each forked worker"""
+    global INFERENCE_THREADS
+    with load_lock:
+        INFERENCE_THREADS = n_threads
+        if active_model is not None:
+            active_model.backend.set_threads(n_threads)
+
+def reload_model(version=None):
+    """Load, warm up and switch to a model version without interrupting predictions
+
+    The version (the registry's current one by default) is fully loaded and
+    warmed up before replacing the active model in a single assignment;
+    requests in flight finish on the version they started with.
+    """
+    global active_model
+    with reload_lock:
+        version = version or registry.current()
+        reload_state.update(loading=version, error=None)
+        try:
+            loaded = load_model_version(version)
+            loaded.warm_up()
+        except Exception as e:
+            reload_state.update(loading=None, error=f"{version}: {e}")
+            raise
+        previous = active_model
+        active_model = loaded
+        reload_state.update(loading=None, previous=previous.version if previous is not None else None)
+        return loaded.version
+
+def activate_model(version):
+    """Switch to a published version, then make it the registry's current one for every worker"""
+    registry.path(version)
+    reload_model(version)
+    registry.activate(version)
+    return version
+
+def rollback_model():
+    """Switch back to the version activated before the current one"""
+    version = registry.previous()
+    if version is None:
+        raise KeyError("No previous model version to roll back to")
+    return activate_model(version)
+
+# Called by score() between encoding and inference, set by the app to drop
+# requests whose deadline passed while their rows were encoded
+before_inference = None
+
+watcher = {'pid': None, 'failed': None}
+# Set by serve.py, which imports the app in the Gunicorn master and starts a watcher
+# in each worker after the fork: a watcher thread in the master could hold
+# reload_lock while a worker is forked and leave it locked in that worker
+forked_workers = False
+
+def start_registry_watcher(interval):
+    """Poll the registry in a background thread and reload when another process activated a version"""
+    with load_lock:
+        if watcher['pid'] == os.getpid():
+            return
+        watcher['pid'] = os.getpid()
+    threading.Thread(target=_watch_registry, args=(interval,), name='registry-watcher', daemon=True).start()
+
+def _watch_registry(interval):
+    while True:
+        time.sleep(interval)
+        check_registry()
+
+def check_registry():
+    """Reload when the registry's current version differs from the active one, return the version loaded or None"""
+    version = registry.current()
+    loaded = active_model
+    # A version that failed to load is not retried until CURRENT changes
+    if version is None or loaded is None or version in (loaded.version, watcher['failed']):
+        return None
+    try:
+        reload_model(version)
+        watcher['failed'] = None
+        return version
+    except Exception:
+        # The error is reported through get_status()
+        watcher['failed'] = version
+        return None
+
+def warm_up():
+    """Load every artifact and run synthetic inferences so the first request is not slow"""
+    warm_up_state['started'] = True
+    try:
+        get_loaded_model().warm_up()
+        warm_up_state['done'] = True
+    except Exception as e:
+        warm_up_state['error'] = str(e)
+        raise
+
+def start_warm_up():
+    """Run warm_up() in a background thread, once"""
+    with load_lock:
+        if warm_up_state['started']:
+            return
+        warm_up_state['started'] = True
+    threading.Thread(target=_warm_up_quietly, name='warm-up', daemon=True).start()
+
+def _warm_up_quietly():
+    try:
+        warm_up()
+    except Exception:
+        # The error is reported through get_status()
+        pass
+
+def get_status():
+    """Return the loading and warm-up state of the prediction artifacts"""
+    loaded = active_model
+    return {
+        "preprocessor_loaded": loaded is not None,
+        "model_loaded": loaded is not None,
+        "model_version": loaded.version if loaded is not None else None,
+        "backend": INFERENCE_BACKEND,
+        "season_models": {
+            season: model is not None for season, model in loaded.season_models.items()
+        } if loaded is not None and SEASON_ROUTING else None,
+        "latency_tiers": {
+            tier: iteration_range[1] if iteration_range else None for tier, iteration_range in loaded.tiers.items()
+        } if loaded is not None else None,
+        "inference_threads": INFERENCE_THREADS,
+        "cpu_cores": available_cores(),
+        "pid": os.getpid(),
+        "load_times": {name: round(seconds, 4) for name, seconds in loaded.load_times.items()} if loaded is not None else {},
+        "warmed_up": warm_up_state['done'],
+        "warm_up_error": warm_up_state['error'],
+        "reload": dict(reload_state)
+    }
+
+def get_one_hot_block(column):
+    """Return the categories of a nominal column and the index of its first output column"""
+    return get_encoder().categories(column)
+
+
+def validate_row(data_row):
+    """Check the values of a single input row, return an error message or None"""
+    if 'ROUTE' not in data_row:
+        return "Missing required fields: ROUTE"
+    for field in NUMERIC_FIELDS:
+        value = data_row[field]
+        if isinstance(value, bool):
+            return f"Invalid numeric value for {field}: {value!r}"
+        try:
+            float(value)
+        except (TypeError, ValueError):
+            return f"Invalid numeric value for {field}: {value!r}"
+    try:
+        parse_local_time(data_row['LOCAL_TIME'])
+    except ValueError as e:
+        return str(e)
+    if not is_one_of(data_row['WEEK_DAY'], DAY_MAPPING):
+        return f"Unknown WEEK_DAY: {data_row['WEEK_DAY']!r}"
+    if not isinstance(data_row['WEATHER_ENG_DESC'], str):
+        return f"Invalid WEATHER_ENG_DESC: {data_row['WEATHER_ENG_DESC']!r}"
+    for column in ('ROUTE', 'INCIDENT'):
+        value = data_row[column]
+        if isinstance(value, bool) or not is_one_of(value, get_encoder().nominal_lookup[column]):
+            return f"Unknown {column}: {value!r}"
+    return None
+
+
+def is_one_of(value, known):
+    """Whether value is a key of known, False for unhashable values (lists, dicts)"""
+    try:
+        return value in known
+    except TypeError:
+        return False
+
+
+def numeric_column(values):
+    """Convert a numeric input column to float64, return (array, indices of invalid values)"""
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'iuf':
+        return values.astype(np.float64, copy=False), []
+    values = list(values)
+    # None would become NaN and bools are rejected like in validate_row
+    if not any(value is None or isinstance(value, bool) for value in values):
+        try:
+            return np.asarray(values, dtype=np.float64), []
+        except (TypeError, ValueError):
+            pass
+    array = np.full(len(values), np.nan)
+    invalid = []
+    for index, value in enumerate(values):
+        try:
+            if value is None or isinstance(value, bool):
+                raise TypeError
+            array[index] = float(value)
+        except (TypeError, ValueError):
+            invalid.append(index)
+    return array, invalid
+
+
+def validate_columns(columns):
+    """Check input columns (one sequence per input field) row by row
+
+    Returns the columns ready for preprocessing_columns (numeric fields as
+    float64 arrays, other fields as lists) and, for each row, the error
+    validate_row would report or None. Raises ValueError when fields are
+    missing or the columns differ in length.
+    """
+    missing_fields = [field for field in INPUT_FIELDS if field not in columns]
+    if missing_fields:
+        raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
+    lengths = {len(columns[field]) for field in INPUT_FIELDS}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+    n_rows = lengths.pop()
+
+    errors = [None] * n_rows
+    checked = {}
+    for field in NUMERIC_FIELDS:
+        checked[field], invalid = numeric_column(columns[field])
+        for index in invalid:
+            errors[index] = errors[index] or f"Invalid numeric value for {field}: {columns[field][index]!r}"
+    for field in INPUT_FIELDS:
+        if field not in checked:
+            values = columns[field]
+            checked[field] = values.tolist() if isinstance(values, np.ndarray) else list(values)
+
+    # The remaining checks run once per distinct value, in the order of validate_row
+    lookup = get_encoder().nominal_lookup
+    checks = [
+        ('LOCAL_TIME', local_time_error),
+        ('WEEK_DAY', lambda value: None if is_one_of(value, DAY_MAPPING) else f"Unknown WEEK_DAY: {value!r}"),
+        ('WEATHER_ENG_DESC', lambda value: None if isinstance(value, str) else f"Invalid WEATHER_ENG_DESC: {value!r}"),
+        ('ROUTE', lambda value: category_error('ROUTE', value, lookup)),
+        ('INCIDENT', lambda value: category_error('INCIDENT', value, lookup))
+    ]
+    for field, check in checks:
+        try:
+            distinct, inverse = factorize(checked[field])
+        except TypeError:
+            raise ValueError(f"Column {field} must hold scalar values")
+        messages = [check(value) for value in distinct]
+        invalid = np.array([message is not None for message in messages])[inverse]
+        for index in np.flatnonzero(invalid):
+            errors[index] = errors[index] or messages[inverse[index]]
+    return checked, errors
+
+
+def local_time_error(value):
+    """Return the LOCAL_TIME error message of a value, or None"""
+    try:
+        parse_local_time(value)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def category_error(column, value, lookup):
+    """Return the error message of a ROUTE or INCIDENT value unknown to the encoder, or None"""
+    if isinstance(value, bool) or not is_one_of(value, lookup[column]):
+        return f"Unknown {column}: {value!r}"
+    return None
+
+
+def select_rows(columns, indices):
+    """Return the given rows of checked input columns"""
+    return {
+        field: values[indices] if isinstance(values, np.ndarray) else [values[index] for index in indices]
+        for field, values in columns.items()
+    }
+
 
 def preprocessing(data_row):
     """Preprocess input data for prediction"""
-    df = pd.DataFrame([data_row])
+    return preprocessing_batch([data_row])
+
+
+def preprocessing_batch(data_rows, loaded=None):
+    """Preprocess a list of input rows into a dense float32 feature matrix"""
+    encoder = (loaded or get_loaded_model()).encoder
+    start = time.perf_counter()
+    processed_rows = encoder.encode_rows(data_rows)
+    MODEL_STAGE_LATENCY.observe(time.perf_counter() - start, 'encode')
+    return processed_rows
+
+
+def preprocessing_columns(columns, loaded=None):
+    """Preprocess checked input columns into a dense float32 feature matrix"""
+    encoder = (loaded or get_loaded_model()).encoder
+    start = time.perf_counter()
+    processed_rows = encoder.encode_columns(columns)
+    MODEL_STAGE_LATENCY.observe(time.perf_counter() - start, 'encode')
+    return processed_rows
+
+
+def reference_preprocessing_batch(data_rows):
+    """Preprocess rows with pandas and the fitted ColumnTransformer
+
+    Reference implementation of preprocessing_batch, kept to check that the
+    compiled encoder reproduces the training pipeline.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(list(data_rows))
+    for column in NUMERIC_FIELDS:
+        df[column] = pd.to_numeric(df[column])
 
     # LOCAL_TIME decomposing and cyclical encoding
-    df['LOCAL_TIME'] = pd.to_datetime(df['LOCAL_TIME'], format='%H:%M:%S').dt.time
-    df['LOCAL_TIME_HOUR'] = pd.to_datetime(df['LOCAL_TIME'], format='%H:%M:%S').dt.hour
-    df['LOCAL_TIME_MINUTE'] = pd.to_datetime(df['LOCAL_TIME'], format='%H:%M:%S').dt.minute
+    local_time = pd.to_datetime(df['LOCAL_TIME'], format='%H:%M:%S')
+    df['LOCAL_TIME_HOUR'] = local_time.dt.hour
+    df['LOCAL_TIME_MINUTE'] = local_time.dt.minute
     df['LOCAL_TIME_HOUR_COS'], df['LOCAL_TIME_HOUR_SIN'] = cyclical_encoding(df, 'LOCAL_TIME_HOUR', 24)
     df['LOCAL_TIME_MINUTE_COS'], df['LOCAL_TIME_MINUTE_SIN'] = cyclical_encoding(df, 'LOCAL_TIME_MINUTE', 60)
     df = df.drop(columns=['LOCAL_TIME', 'LOCAL_TIME_HOUR', 'LOCAL_TIME_MINUTE'])
 
     # WEEK_DAY cyclical encoding
-    day_mapping = {
-        'Monday': 0,
-        'Tuesday': 1,
-        'Wednesday': 2,
-        'Thursday': 3,
-        'Friday': 4,
-        'Saturday': 5,
-        'Sunday': 6
-    }
-    df['WEEK_DAY'] = df['WEEK_DAY'].map(day_mapping)
+    df['WEEK_DAY'] = df['WEEK_DAY'].map(DAY_MAPPING)
     df['WEEK_DAY_COS'], df['WEEK_DAY_SIN'] = cyclical_encoding(df, 'WEEK_DAY', 7)
     df = df.drop(columns=['WEEK_DAY'])
 
@@ -79,49 +729,28 @@ def preprocessing(data_row):
     df['LOCAL_DAY_COS'], df['LOCAL_DAY_SIN'] = cyclical_encoding(df, 'LOCAL_DAY', 31)
     df = df.drop(columns=['LOCAL_DAY'])
 
-    # Transform WEATHER_ENG_DESC to a list of conditions
-    df['WEATHER_ENG_DESC_LIST'] = df['WEATHER_ENG_DESC'].str.split(',')
-    # Regroup weather conditions into broader categories
-    weather_map = {
-        'Moderate Rain': 'Rain',
-        'Freezing Rain': 'Rain',
-        'Heavy Rain': 'Rain',
-        'Freezing Fog': 'Fog',
-        'Haze': 'Fog',
-        'Moderate Snow': 'Snow'
-    }
-    df['WEATHER_ENG_DESC_LIST'] = df['WEATHER_ENG_DESC_LIST'].apply(
-        lambda lst: [weather_map.get(condition, condition) for condition in lst]
-    )
-    # Drop the original WEATHER_ENG_DESC column
+    # Transform WEATHER_ENG_DESC to a list of regrouped conditions
+    df['WEATHER_ENG_DESC_LIST'] = [
+        [WEATHER_MAP.get(condition, condition) for condition in lst]
+        for lst in df['WEATHER_ENG_DESC'].str.split(',')
+    ]
     df = df.drop(columns=['WEATHER_ENG_DESC'])
 
-    # Create the season variable
-    def month_to_season(month):
-        if month in [5, 6, 7, 8, 9]:
-            return 'Summer'
-        else:
-            return 'Winter'
-    df['SEASON'] = df['LOCAL_MONTH'].apply(month_to_season)
+    # Create the season variable (Summer: May-September)
+    df['SEASON'] = np.where(df['LOCAL_MONTH'].isin(SUMMER_MONTHS), 'Summer', 'Winter')
     df = df.drop(columns=['LOCAL_MONTH'])
 
     # Transformation of the PRECIP_AMOUNT variable to binary presence/absence
-    df['PRECIP_AMOUNT_BINARY'] = df['PRECIP_AMOUNT'].apply(lambda x: 1 if x > 0 else 0)
+    df['PRECIP_AMOUNT_BINARY'] = (df['PRECIP_AMOUNT'] > 0).astype(int)
     df = df.drop(columns=['PRECIP_AMOUNT'])
 
     # Transformation of the VISIBILITY variable to a categorical variable
-    def visibility_transformation(visibility):
-        if 16 <= visibility:
-            return "Great visibility"
-        elif 12 <= visibility:
-            return "Correct visibility"
-        elif 8 <= visibility:
-            return "Poor visibility"
-        elif 4 <= visibility:
-            return "Very poor visibility"
-        else:
-            return "No visibility"
-    df['VISIBILITY'] = df['VISIBILITY'].apply(visibility_transformation)
+    visibility = df['VISIBILITY']
+    df['VISIBILITY'] = np.select(
+        [visibility >= 16, visibility >= 12, visibility >= 8, visibility >= 4],
+        ["Great visibility", "Correct visibility", "Poor visibility", "Very poor visibility"],
+        default="No visibility"
+    )
 
     # WIND_DIRECTION cyclical encoding
     df['WIND_DIRECTION_COS'], df['WIND_DIRECTION_SIN'] = cyclical_encoding(df, 'WIND_DIRECTION', 360)
@@ -131,8 +760,114 @@ def preprocessing(data_row):
     return features_processed
 
 
-def predict(data_row):
+def score(processed_rows, loaded=None, tier=DEFAULT_TIER):
+    """Run the inference backend on a feature matrix, with the rounds of a latency tier, and return delays in minutes"""
+    loaded = loaded or get_loaded_model()
+    if before_inference is not None:
+        before_inference()
+    start = time.perf_counter()
+    # A tier the model does not configure (e.g. a season model) scores every round
+    pred = loaded.backend.predict(processed_rows, loaded.tiers.get(tier))
+    MODEL_STAGE_LATENCY.observe(time.perf_counter() - start, 'inference')
+    BATCH_ROWS.observe(len(processed_rows))
+    return np.expm1(pred)
+
+
+def predict(data_row, tier=DEFAULT_TIER):
     """Make prediction for a single data row"""
-    processed_row = preprocessing(data_row)
-    pred = get_model().predict(processed_row)
-    return np.expm1(pred[0])
+    return predict_batch([data_row], tier=tier)[0]
+
+
+def predict_batch(data_rows, loaded=None, tier=DEFAULT_TIER):
+    """Make predictions for a list of data rows with a single model call"""
+    data_rows = list(data_rows)
+    if not data_rows:
+        return np.empty(0)
+    loaded = loaded or get_loaded_model()
+    if SEASON_ROUTING:
+        return predict_by_season(rows_to_columns(data_rows), loaded, tier)
+    return score(preprocessing_batch(data_rows, loaded), loaded, tier)
+
+
+def known_categories(encoder, columns):
+    """Return the mask of the rows whose ROUTE and INCIDENT are known to an encoder"""
+    known = np.ones(len(columns['ROUTE']), dtype=bool)
+    for column in ('ROUTE', 'INCIDENT'):
+        lookup = encoder.nominal_lookup[column]
+        distinct, inverse = factorize(columns[column])
+        known &= np.array([value in lookup for value in distinct], dtype=bool)[inverse]
+    return known
+
+
+def predict_by_season(columns, loaded, tier=DEFAULT_TIER):
+    """Make predictions with the model of each row's season (one model call per season)
+
+    Rows are routed by LOCAL_MONTH with the rule of month_to_season in the
+    training scripts. Rows of a season without a model, or whose ROUTE or
+    INCIDENT is unknown to their season model, are scored by the global
+    model. Predictions are returned in the input order.
+    """
+    is_summer = np.isin(np.asarray(columns['LOCAL_MONTH'], dtype=np.float64), SUMMER_MONTHS)
+    predictions = np.empty(len(is_summer))
+    unrouted = np.ones(len(is_summer), dtype=bool)
+    for season, in_season in zip(SEASONS, (is_summer, ~is_summer)):
+        season_model = loaded.season_model(season) if in_season.any() else None
+        if season_model is None:
+            continue
+        indices = np.flatnonzero(in_season & known_categories(season_model.encoder, columns))
+        if len(indices):
+            processed_rows = preprocessing_columns(select_rows(columns, indices), season_model)
+            predictions[indices] = score(processed_rows, season_model, tier)
+            unrouted[indices] = False
+
+    indices = np.flatnonzero(unrouted)
+    if len(indices):
+        predictions[indices] = score(preprocessing_columns(select_rows(columns, indices), loaded), loaded, tier)
+    return predictions
+
+
+def predict_columns(columns, tier=DEFAULT_TIER):
+    """Make predictions for checked input columns with a single model call"""
+    if not len(columns['ROUTE']):
+        return np.empty(0)
+    loaded = get_loaded_model()
+    if SEASON_ROUTING:
+        return predict_by_season(columns, loaded, tier)
+    return score(preprocessing_columns(columns, loaded), loaded, tier)
+
+
+def predict_incidents(data_row, tier=DEFAULT_TIER):
+    """Make predictions for every known INCIDENT category of a single data row
+
+    The row is preprocessed once, then only the INCIDENT one-hot block is
+    swapped between the copies so all categories are scored in one model call.
+    """
+    loaded = get_loaded_model().model_for_row(data_row)
+    categories, start = loaded.encoder.categories('INCIDENT')
+    processed_row = preprocessing_batch([dict(data_row, INCIDENT=categories[0])], loaded)
+    processed_rows = np.repeat(processed_row, len(categories), axis=0)
+    processed_rows[:, start:start + len(categories)] = np.eye(len(categories))
+
+    pred = score(processed_rows, loaded, tier)
+    return {str(category): value for category, value in zip(categories, pred)}
+
+
+def predict_network(data_row, tier=DEFAULT_TIER):
+    """Make predictions for every known ROUTE x INCIDENT combination of a weather/time row
+
+    Returns (routes, incidents, predictions), predictions having shape
+    (len(routes), len(incidents)). The row is preprocessed once and only
+    the ROUTE and INCIDENT one-hot blocks differ between the scored rows.
+    """
+    loaded = get_loaded_model().model_for_row(data_row)
+    routes, route_start = loaded.encoder.categories('ROUTE')
+    incidents, incident_start = loaded.encoder.categories('INCIDENT')
+    n_routes, n_incidents = len(routes), len(incidents)
+
+    processed_row = preprocessing_batch([dict(data_row, ROUTE=routes[0], INCIDENT=incidents[0])], loaded)
+    processed_rows = np.repeat(processed_row, n_routes * n_incidents, axis=0)
+    processed_rows[:, route_start:route_start + n_routes] = np.repeat(np.eye(n_routes), n_incidents, axis=0)
+    processed_rows[:, incident_start:incident_start + n_incidents] = np.tile(np.eye(n_incidents), (n_routes, 1))
+
+    pred = score(processed_rows, loaded, tier)
+    return routes, incidents, pred.reshape(n_routes, n_incidents)
@@ -0,0 +1,111 @@
+import collections
+import sys
+import threading
+import time
+
+# Modules whose frames are innermost in threads blocked waiting (idle server
+# threads, queues, sockets, conditions)
+IDLE_MODULES = {'threading', 'selectors', 'socketserver', 'socket', 'queue', 'ssl'}
+
+
+def thread_cpu_time(native_id):
+    """Return the nanoseconds a thread has run, from /proc (Linux), or None"""
+    try:
+        with open(f'/proc/self/task/{native_id}/schedstat', 'rb') as f:
+            return int(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class SamplingProfiler:
+    """Samples the Python stacks of the running threads into collapsed stacks
+
+    A background thread reads the frames of every other thread each
+    `interval` seconds and counts the stacks, rendered in the collapsed
+    format of flamegraph.pl and speedscope ("outer;...;inner count"). It
+    only exists between start() and stop(), so the profiler costs nothing
+    when it is not in use. Unless `idle` is set, threads blocked in a wait
+    or, on Linux, that did not run since the previous sample (sleeping,
+    blocked in native code) are left out, so the stacks show where the CPU
+    time goes. The session ends on stop(), or once `max_requests` calls to
+    request_done() were counted.
+    """
+
+    def __init__(self, interval=0.01, max_requests=None, idle=False):
+        self.interval = interval
+        self.max_requests = max_requests
+        self.idle = idle
+
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        # Set when max_requests requests completed
+        self.done = threading.Event()
+        self.thread = None
+        self.ignored = set()
+        self.counts = collections.Counter()
+        # CPU time of each thread at the previous sample
+        self.cpu_times = {}
+        self.samples = 0
+        self.requests = 0
+        self.started = None
+        self.elapsed = None
+
+    def start(self, ignore=()):
+        """Start sampling every thread except those with the `ignore` idents"""
+        self.ignored = set(ignore)
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, name='sampling-profiler', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        self.ignored.add(threading.get_ident())
+        while not self.stopping.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        """Count the current stack of each thread"""
+        native_ids = {thread.ident: thread.native_id for thread in threading.enumerate()}
+        cpu_times = {}
+        for ident, frame in sys._current_frames().items():
+            if ident in self.ignored:
+                continue
+            cpu_times[ident] = thread_cpu_time(native_ids.get(ident))
+            if not self.idle and self.waiting(ident, frame, cpu_times[ident]):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            self.counts[';'.join(reversed(stack))] += 1
+        self.cpu_times = cpu_times
+        self.samples += 1
+
+    def waiting(self, ident, frame, cpu_time):
+        """Whether the thread is blocked in a wait or did not run since the previous sample"""
+        if frame.f_globals.get('__name__') in IDLE_MODULES:
+            return True
+        previous = self.cpu_times.get(ident)
+        return cpu_time is not None and previous is not None and cpu_time == previous
+
+    def request_done(self):
+        """Count a completed request, ends the session after max_requests"""
+        with self.lock:
+            self.requests += 1
+            if self.max_requests is not None and self.requests >= self.max_requests:
+                self.done.set()
+
+    def wait(self, timeout):
+        """Wait until max_requests requests completed, at most `timeout` seconds"""
+        self.done.wait(timeout)
+
+    def stop(self):
+        """Stop sampling, return the collapsed stacks, most sampled first"""
+        self.stopping.set()
+        self.thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return ''.join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
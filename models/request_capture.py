@@ -0,0 +1,74 @@
+import json
+import os
+import queue
+import random
+import threading
+
+
+class RequestCapture:
+    """Samples requests and appends them to a JSONL file from a background thread
+
+    Requests only pay for the sampling draw and a queue insert; the records
+    are serialized and written by a writer thread. When the writer falls
+    behind and the queue is full, records are dropped rather than slowing
+    down the requests.
+    """
+
+    def __init__(self, path, sample_rate, max_queue=10000, random_func=random.random):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.random_func = random_func
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.counters = {
+            'captured': 0,
+            'dropped': 0,
+            'write_errors': 0
+        }
+
+    def sampled(self):
+        """Draw whether the current request is captured"""
+        return self.sample_rate >= 1 or self.random_func() < self.sample_rate
+
+    def offer(self, record):
+        """Queue a record for writing, return False when it was dropped"""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self.lock:
+                self.counters['dropped'] += 1
+            return False
+        with self.lock:
+            self.counters['captured'] += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='request-capture', daemon=True)
+                self.thread.start()
+        return True
+
+    def run(self):
+        """Background loop writing the queued records
+
+        Each record is appended with a single write on an O_APPEND file, so
+        the lines of several worker processes sharing the file never mix.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        while True:
+            record = self.queue.get()
+            try:
+                os.write(fd, (json.dumps(record) + '\n').encode())
+            except (OSError, TypeError, ValueError):
+                with self.lock:
+                    self.counters['write_errors'] += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                **self.counters,
+                'queued': self.queue.qsize(),
+                'sample_rate': self.sample_rate,
+                'path': self.path
+            }
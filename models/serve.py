@@ -0,0 +1,94 @@
+import gc
+import itertools
+import multiprocessing
+import os
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+# Add models directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import predictor
+
+# Configuration written by scripts/tune_inference.py, used as the defaults below
+INFERENCE_CONFIG = predictor.read_inference_config()
+# Number of forked worker processes
+WORKERS = int(os.environ.get('PREDICTION_API_WORKERS', INFERENCE_CONFIG.get('workers', multiprocessing.cpu_count())))
+# Inference threads of each worker, the workers share the cores by default
+THREADS_PER_WORKER = int(os.environ.get(
+    'PREDICTION_INFERENCE_THREADS',
+    INFERENCE_CONFIG.get('threads_per_worker', max(1, multiprocessing.cpu_count() // WORKERS))
+))
+# Pin each worker to its own THREADS_PER_WORKER cores (Linux only)
+CPU_AFFINITY = os.environ.get(
+    'PREDICTION_CPU_AFFINITY', str(INFERENCE_CONFIG.get('cpu_affinity', False))
+).lower() == 'true'
+# Request threads of each worker, more than 1 lets micro-batching coalesce requests
+WORKER_THREADS = int(os.environ.get('PREDICTION_API_WORKER_THREADS', 1))
+# Seconds a worker may spend on one request before being restarted
+TIMEOUT = int(os.environ.get('PREDICTION_API_TIMEOUT', 60))
+
+
+def pre_fork(server, worker):
+    """Give the new worker the lowest CPU slot not held by a running worker, so restarted workers reuse it"""
+    used = {getattr(running, 'cpu_slot', None) for running in server.WORKERS.values()}
+    worker.cpu_slot = next(slot for slot in itertools.count() if slot not in used)
+
+
+def post_fork(server, worker):
+    """Give each worker its own inference thread count, cores and registry watcher"""
+    if CPU_AFFINITY:
+        predictor.pin_to_cores(predictor.worker_cores(worker.cpu_slot, THREADS_PER_WORKER))
+    predictor.set_inference_threads(THREADS_PER_WORKER)
+    from app import MODEL_WATCH_INTERVAL
+    if MODEL_WATCH_INTERVAL > 0:
+        predictor.start_registry_watcher(MODEL_WATCH_INTERVAL)
+
+
+class PredictionServer(BaseApplication):
+    """
+    Gunicorn application serving the Flask API with preforked workers.
+
+    The preprocessor and the model are loaded and warmed up once in the
+    master process, then the workers are forked and share those pages
+    copy-on-write instead of each loading its own copy.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # A single thread in the master, so no OpenMP thread pool exists when forking
+        predictor.set_inference_threads(1)
+        # Registry watchers only run in the workers, see post_fork
+        predictor.forked_workers = True
+        predictor.warm_up()
+        from app import app
+        # A worker with a single request thread cannot serve requests while it is profiled
+        app.config['WORKER_THREADS'] = WORKER_THREADS
+
+        # Objects loaded so far are never collected, the garbage collector
+        # would otherwise touch (and copy) their pages in every worker
+        gc.collect()
+        gc.freeze()
+        return app
+
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PREDICTION_API_PORT', 5000))
+    host = os.environ.get('PREDICTION_API_HOST', '127.0.0.1')
+    PredictionServer({
+        'bind': f"{host}:{port}",
+        'workers': WORKERS,
+        'threads': WORKER_THREADS,
+        'preload_app': True,
+        'pre_fork': pre_fork,
+        'post_fork': post_fork,
+        'timeout': TIMEOUT
+    }).run()
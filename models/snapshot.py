@@ -0,0 +1,160 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Fields describing the weather and time of a snapshot (ROUTE and INCIDENT vary inside it)
+WEATHER_FIELDS = [
+    'LOCAL_TIME', 'WEEK_DAY', 'LOCAL_MONTH', 'LOCAL_DAY',
+    'TEMP', 'DEW_POINT_TEMP', 'HUMIDEX', 'PRECIP_AMOUNT',
+    'RELATIVE_HUMIDITY', 'STATION_PRESSURE', 'VISIBILITY',
+    'WEATHER_ENG_DESC', 'WIND_DIRECTION', 'WIND_SPEED'
+]
+
+
+def weather_hour(data_row):
+    """Return the weather/time payload of a row, with LOCAL_TIME truncated to the hour"""
+    payload = {field: data_row[field] for field in WEATHER_FIELDS}
+    payload['LOCAL_TIME'] = f"{str(data_row['LOCAL_TIME']).split(':')[0].zfill(2)}:00:00"
+    return payload
+
+
+WEEK_DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def advance_hours(payload, hours, year):
+    """Return a weather/time payload moved `hours` later, the weather itself unchanged"""
+    start = datetime(year, int(payload['LOCAL_MONTH']), int(payload['LOCAL_DAY']),
+                     int(payload['LOCAL_TIME'].split(':')[0]))
+    moved = start + timedelta(hours=hours)
+    week_day = WEEK_DAYS[(WEEK_DAYS.index(payload['WEEK_DAY']) + (moved.date() - start.date()).days) % 7]
+    return dict(
+        payload, LOCAL_TIME=f"{moved.hour:02d}:00:00", WEEK_DAY=week_day,
+        LOCAL_MONTH=moved.month, LOCAL_DAY=moved.day
+    )
+
+
+class Snapshot:
+    """Route x incident predictions for one weather hour, serialized once for O(1) reads"""
+
+    def __init__(self, payload, model_version, routes, incidents, predictions):
+        self.payload = payload
+        self.model_version = model_version
+        self.computed_at = time.time()
+
+        self.routes = {
+            str(route): {str(incident): float(value) for incident, value in zip(incidents, row)}
+            for route, row in zip(routes, predictions)
+        }
+        key = json.dumps({'weather': payload, 'model_version': model_version}, sort_keys=True)
+        self.etag = hashlib.sha1(key.encode()).hexdigest()[:16]
+
+        self.body = json.dumps({
+            "success": True,
+            "etag": self.etag,
+            "computed_at": self.computed_at,
+            "model_version": model_version,
+            "weather": payload,
+            "routes": self.routes
+        })
+        self.route_bodies = {
+            route: json.dumps({
+                "success": True,
+                "etag": self.etag,
+                "route": route,
+                "weather": payload,
+                "predictions": values
+            })
+            for route, values in self.routes.items()
+        }
+
+
+class SnapshotManager:
+    """Recomputes the network snapshot in a background thread when the weather hour changes
+
+    `compute` takes a weather/time payload and returns (routes, incidents,
+    predictions) with predictions of shape (len(routes), len(incidents));
+    `version_func` returns the version of the model in use. Every
+    `refresh_interval` seconds the thread also recomputes the snapshot when
+    the model version changed, or when the hour changed since the weather
+    was published (the last published weather, moved to the current hour).
+    """
+
+    def __init__(self, compute, version_func, refresh_interval=60.0, clock=time.time):
+        self.compute = compute
+        self.version_func = version_func
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.snapshot = None
+        self.pending = None
+        self.published = None  # (payload, publication time) of the last published weather
+        self.error = None
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def submit(self, data_row):
+        """Publish the current weather input, return True if a new snapshot will be computed"""
+        payload = weather_hour(data_row)
+        with self.condition:
+            self.published = (payload, self.clock())
+        return self.schedule(payload)
+
+    def refresh(self):
+        """Schedule the last published weather at the current hour and model version, return True if recomputed"""
+        with self.condition:
+            if self.published is None:
+                return False
+            payload, published_at = self.published
+        # Hour boundaries crossed since the publication
+        hours = int(self.clock() // 3600 - published_at // 3600)
+        if hours:
+            payload = advance_hours(payload, hours, datetime.fromtimestamp(published_at).year)
+        return self.schedule(payload)
+
+    def schedule(self, payload):
+        """Queue a payload unless the current or pending snapshot already matches it and the model version"""
+        key = (json.dumps(payload, sort_keys=True), self.version_func())
+        with self.condition:
+            current = self.snapshot
+            if current is not None and key == (json.dumps(current.payload, sort_keys=True), current.model_version):
+                return False
+            if self.pending is not None and key == self.pending[0]:
+                return True
+            self.pending = (key, payload)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='snapshot', daemon=True)
+                self.thread.start()
+            self.condition.notify()
+        return True
+
+    def run(self):
+        """Background loop computing the latest pending payload"""
+        while True:
+            with self.condition:
+                if self.pending is None:
+                    self.condition.wait(self.refresh_interval)
+                if self.pending is None:
+                    self.refresh()
+                if self.pending is None:
+                    continue
+                (_, model_version), payload = self.pending
+
+            try:
+                routes, incidents, predictions = self.compute(payload)
+                snapshot = Snapshot(payload, model_version, routes, incidents, predictions)
+                error = None
+            except Exception as e:
+                snapshot, error = None, str(e)
+
+            with self.condition:
+                if snapshot is not None:
+                    # Atomic swap, readers keep the snapshot they already hold
+                    self.snapshot = snapshot
+                self.error = error
+                if self.pending is not None and self.pending[1] is payload:
+                    self.pending = None
+
+    def current(self):
+        """Return the latest computed snapshot, or None"""
+        return self.snapshot
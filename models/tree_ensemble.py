@@ -0,0 +1,130 @@
+import json
+
+import numpy as np
+
+# Objectives whose prediction is the raw sum of the leaf values
+IDENTITY_OBJECTIVES = ['reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror']
+
+# Rows evaluated at once, bounds the (rows x trees) index arrays
+CHUNK_SIZE = 64
+
+
+def flatten_booster(booster):
+    """
+    Flatten an XGBoost booster into array-backed node tables.
+
+    All trees are concatenated into one node table. Leaves point to
+    themselves, so every row can be pushed down every tree for the same
+    number of levels.
+
+    Parameters:
+    booster (xgboost.Booster): The trained booster (only needed at export time).
+
+    Returns:
+    dict: NumPy arrays, as saved by TreeEnsemble.save.
+    """
+    learner = json.loads(booster.save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective not in IDENTITY_OBJECTIVES:
+        raise ValueError(f"Unsupported objective {objective!r}, expected one of {IDENTITY_OBJECTIVES}")
+    trees = learner['gradient_booster']['model']['trees']
+
+    features, thresholds, lefts, rights, default_lefts, values, roots, depths = [], [], [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        left = np.asarray(tree['left_children'], dtype=np.int32)
+        right = np.asarray(tree['right_children'], dtype=np.int32)
+        is_leaf = left == -1
+        own_index = np.arange(len(left), dtype=np.int32)
+
+        features.append(np.where(is_leaf, 0, tree['split_indices']).astype(np.int32))
+        thresholds.append(np.where(is_leaf, 0, tree['split_conditions']).astype(np.float32))
+        # Leaf values are stored in split_conditions
+        values.append(np.where(is_leaf, tree['split_conditions'], 0).astype(np.float32))
+        lefts.append(np.where(is_leaf, own_index, left) + offset)
+        rights.append(np.where(is_leaf, own_index, right) + offset)
+        default_lefts.append(np.asarray(tree['default_left'], dtype=bool))
+        roots.append(offset)
+        depths.append(tree_depth(left, right))
+        offset += len(left)
+
+    # base_score is serialized as "[2.5E0]" by recent XGBoost versions
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    return {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts).astype(np.int32),
+        'right': np.concatenate(rights).astype(np.int32),
+        'default_left': np.concatenate(default_lefts),
+        'value': np.concatenate(values),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'max_depth': np.int32(max(depths)),
+        'base_score': np.float32(base_score),
+        'n_features': np.int32(learner['learner_model_param']['num_feature'])
+    }
+
+
+def tree_depth(left, right):
+    """Return the depth of a tree given its child arrays (-1 for leaves)"""
+    depth, level = 0, [0]
+    while True:
+        children = [child for node in level for child in (left[node], right[node]) if child != -1]
+        if not children:
+            return depth
+        depth, level = depth + 1, children
+
+
+class TreeEnsemble:
+    """Vectorized evaluator of a flattened tree ensemble, NumPy only"""
+
+    def __init__(self, tables, missing=np.nan):
+        self.feature = tables['feature']
+        self.threshold = tables['threshold']
+        self.left = tables['left']
+        self.right = tables['right']
+        self.default_left = tables['default_left']
+        self.value = tables['value']
+        self.roots = tables['roots']
+        self.max_depth = int(tables['max_depth'])
+        self.base_score = np.float32(tables['base_score'])
+        self.n_features = int(tables['n_features'])
+        self.missing = missing
+        # Children interleaved as [left, right] so one gather picks the next node
+        self.children = np.stack([self.left, self.right], axis=1).ravel()
+
+    @classmethod
+    def load(cls, path, missing=np.nan):
+        """Load node tables written by save()"""
+        with np.load(path) as data:
+            return cls({name: data[name] for name in data.files}, missing=missing)
+
+    @staticmethod
+    def save(tables, path):
+        """Write node tables to a .npz file"""
+        np.savez(path, **tables)
+
+    def predict(self, features, iteration_range=None):
+        """Predict a float32 feature matrix, optionally using only trees [start, end)"""
+        features = np.asarray(features, dtype=np.float32)
+        roots = self.roots if iteration_range is None else self.roots[iteration_range[0]:iteration_range[1]]
+        out = np.empty(len(features), dtype=np.float32)
+        for start in range(0, len(features), CHUNK_SIZE):
+            out[start:start + CHUNK_SIZE] = self.predict_chunk(features[start:start + CHUNK_SIZE], roots)
+        return out
+
+    def predict_chunk(self, features, roots):
+        """Push a chunk of rows down every tree, one level at a time"""
+        n_rows = len(features)
+        # Missing values become NaN so they can be detected after the gather
+        if not np.isnan(self.missing):
+            features = np.where(features == self.missing, np.float32(np.nan), features)
+        flat_features = features.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.int32) * self.n_features)[:, None]
+
+        nodes = np.broadcast_to(roots, (n_rows, len(roots))).copy()
+        for _ in range(self.max_depth):
+            values = flat_features[row_offsets + self.feature[nodes]]
+            go_right = np.where(np.isnan(values), ~self.default_left[nodes], values >= self.threshold[nodes])
+            nodes = self.children[2 * nodes + go_right]
+
+        return self.value[nodes].sum(axis=1, dtype=np.float32) + self.base_score
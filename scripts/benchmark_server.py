@@ -0,0 +1,43 @@
+import json
+import os
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from sample_inputs import load_sample_rows
+
+# Running prediction API (python models/app.py or python models/serve.py)
+PREDICTION_API_URL = os.environ.get('PREDICTION_API_URL', 'http://localhost:5000')
+# Distinct rows, so the prediction cache does not answer every request
+N_REQUESTS = 2000
+CONCURRENCY = [1, 4, 16]
+
+
+def post_predict(row):
+    """Send one /predict request and return its latency in seconds"""
+    request = urllib.request.Request(
+        f"{PREDICTION_API_URL}/predict",
+        data=json.dumps(row).encode(),
+        headers={'Content-Type': 'application/json'}
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+rows = load_sample_rows(N_REQUESTS * len(CONCURRENCY))
+with urllib.request.urlopen(f"{PREDICTION_API_URL}/ready") as response:
+    print(f"Server status: {json.loads(response.read())}")
+
+print(f"\n{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+for i, clients in enumerate(CONCURRENCY):
+    batch = rows[i * N_REQUESTS:(i + 1) * N_REQUESTS]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = np.array(list(pool.map(post_predict, batch))) * 1000
+    elapsed = time.perf_counter() - start
+    print(f"{clients:>8}{len(batch) / elapsed:>10.1f}"
+          f"{np.percentile(latencies, 50):>10.2f}{np.percentile(latencies, 99):>10.2f}")
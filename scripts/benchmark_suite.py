@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# The serving path is measured without the prediction cache and the registry watcher
+os.environ.setdefault('PREDICTION_CACHE_SIZE', '0')
+os.environ.setdefault('PREDICTION_MODEL_WATCH_INTERVAL', '0')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models'))
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+# Each case is repeated until about this many rows are scored, within these bounds
+ROWS_PER_CASE = 200000
+MIN_REPEATS = 5
+MAX_REPEATS = 200
+# Fresh processes started to measure the cold start
+COLD_RUNS = 3
+RESULTS_DIR = './reports/benchmarks'
+# The compiled encoder must be this many times faster than the pandas reference
+MIN_ENCODER_SPEEDUP = 10
+ENCODER_CHECK_SIZES = [1, 10000]
+ENCODER_CHECK_REPEATS = 15
+
+
+def peak_rss_mb():
+    """Return the peak resident memory of this process so far, in MB"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(name, batch_size, call, repeats):
+    """Time `repeats` calls after one warm-up call, return the latency statistics"""
+    call()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    return {
+        'name': name,
+        'batch_size': batch_size,
+        'repeats': repeats,
+        'p50_ms': round(float(np.percentile(timings, 50)), 4),
+        'p90_ms': round(float(np.percentile(timings, 90)), 4),
+        'p99_ms': round(float(np.percentile(timings, 99)), 4),
+        'mean_ms': round(float(timings.mean()), 4),
+        'rows_per_s': round(batch_size * 1000 / float(timings.mean()), 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+
+
+def repeats_for(batch_size):
+    return max(MIN_REPEATS, min(MAX_REPEATS, ROWS_PER_CASE // batch_size))
+
+
+def warm_cases(batch_sizes):
+    """Measure preprocessing, prediction and the Flask endpoints on a warm process"""
+    from sample_inputs import load_sample_rows
+    from predictor import predict, predict_batch, preprocessing, preprocessing_batch
+    import app as app_module
+
+    rows = load_sample_rows(max(batch_sizes))
+    client = app_module.app.test_client()
+    results = []
+
+    # Single rows go through the single-row functions, larger batches through the batch ones
+    row = rows[0]
+    cases = [
+        ('preprocessing', lambda: preprocessing(row)),
+        ('predict', lambda: predict(row)),
+        ('POST /predict', lambda: client.post('/predict', json=row))
+    ]
+    for name, call in cases:
+        results.append(measure(name, 1, call, repeats_for(1)))
+
+    for batch_size in [size for size in batch_sizes if size > 1]:
+        batch = rows[:batch_size]
+        cases = [
+            ('preprocessing_batch', lambda: preprocessing_batch(batch)),
+            ('predict_batch', lambda: predict_batch(batch))
+        ]
+        if batch_size <= app_module.MAX_BATCH_SIZE:
+            body = {'rows': batch}
+            cases.append(('POST /predict/batch', lambda: client.post('/predict/batch', json=body)))
+        for name, call in cases:
+            results.append(measure(name, batch_size, call, repeats_for(batch_size)))
+    return results
+
+
+def encoder_speedup(sizes, repeats):
+    """Compare preprocessing_batch with reference_preprocessing_batch on dict rows, calls interleaved"""
+    from sample_inputs import load_sample_rows
+    from predictor import preprocessing_batch, reference_preprocessing_batch
+
+    rows = load_sample_rows(max(sizes))
+    results = []
+    for size in sizes:
+        batch = rows[:size]
+        timings = {'encoder': [], 'reference': []}
+        for _ in range(repeats + 1):
+            for name, call in (('encoder', preprocessing_batch), ('reference', reference_preprocessing_batch)):
+                start = time.perf_counter()
+                call(batch)
+                timings[name].append(time.perf_counter() - start)
+        # The first round is the warm-up
+        encoder_ms, reference_ms = (float(np.median(timings[name][1:])) * 1000 for name in ('encoder', 'reference'))
+        results.append({
+            'batch_size': size,
+            'encoder_ms': round(encoder_ms, 4),
+            'reference_ms': round(reference_ms, 4),
+            'speedup': round(reference_ms / encoder_ms, 2)
+        })
+    return results
+
+
+def cold_start(row):
+    """Measure a fresh process: imports, model load and first prediction and request"""
+    start = time.perf_counter()
+    import predictor
+    imported = time.perf_counter()
+    predictor.get_loaded_model()
+    loaded = time.perf_counter()
+    predictor.predict(row)
+    predicted = time.perf_counter()
+    import app as app_module
+    app_imported = time.perf_counter()
+    app_module.app.test_client().post('/predict', json=row)
+    requested = time.perf_counter()
+    return {
+        'import_s': round(imported - start, 4),
+        'model_load_s': round(loaded - imported, 4),
+        'first_predict_ms': round((predicted - loaded) * 1000, 4),
+        'app_import_s': round(app_imported - predicted, 4),
+        'first_request_ms': round((requested - app_imported) * 1000, 4),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+
+
+def cold_cases(row, runs):
+    """Run the cold start measure in fresh processes, return the median of each value"""
+    measures = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, __file__, '--cold-start', json.dumps(row)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        measures.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: float(np.median([m[key] for m in measures])) for key in measures[0]} | {'runs': runs}
+
+
+def environment():
+    """Describe what was measured, so runs can be compared over time"""
+    import predictor
+    import sklearn
+    import xgboost
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'xgboost': xgboost.__version__,
+        'scikit-learn': sklearn.__version__,
+        'model_version': predictor.get_model_version(),
+        'config': {name: value for name, value in sorted(os.environ.items()) if name.startswith('PREDICTION_')}
+    }
+
+
+def print_results(report, baseline=None):
+    """Print the cases as a table, with the p50 ratio to a baseline run when given"""
+    previous = {}
+    if baseline:
+        previous = {(case['name'], case['batch_size']): case for case in baseline['cases']}
+    print(f"\n{'case':<22}{'rows':>8}{'p50 ms':>12}{'p99 ms':>12}{'rows/s':>14}{'RSS MB':>9}"
+          + (f"{'vs base':>9}" if baseline else ''))
+    for case in report['cases']:
+        line = (f"{case['name']:<22}{case['batch_size']:>8}{case['p50_ms']:>12.3f}{case['p99_ms']:>12.3f}"
+                f"{case['rows_per_s']:>14.0f}{case['peak_rss_mb']:>9.0f}")
+        base = previous.get((case['name'], case['batch_size']))
+        if base:
+            line += f"{case['p50_ms'] / base['p50_ms']:>8.2f}x"
+        print(line)
+    print(f"\nEncoder vs pandas reference (target {MIN_ENCODER_SPEEDUP}x): " + ', '.join(
+        f"{check['batch_size']} rows {check['encoder_ms']:.3f} vs {check['reference_ms']:.3f} ms = {check['speedup']}x"
+        for check in report['encoder_speedup']
+    ))
+    print(f"\nCold start (median of {report['cold_start']['runs']} processes): "
+          + ', '.join(f"{key} {value}" for key, value in report['cold_start'].items() if key != 'runs'))
+
+
+# Benchmark the serving path and save the results as JSON, e.g.
+#   python scripts/benchmark_suite.py --compare reports/benchmarks/<previous run>.json
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing, prediction and the /predict endpoints")
+    parser.add_argument('--output', help=f"JSON results file, defaults to {RESULTS_DIR}/<timestamp>.json")
+    parser.add_argument('--max-batch-size', type=int, default=max(BATCH_SIZES), help="Largest batch size measured")
+    parser.add_argument('--cold-runs', type=int, default=COLD_RUNS)
+    parser.add_argument('--compare', help="Previous results file to compare with")
+    parser.add_argument('--check', action='store_true',
+                        help=f"Exit with an error when the encoder is less than {MIN_ENCODER_SPEEDUP}x faster than pandas")
+    parser.add_argument('--cold-start', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_start:
+        # Child process of cold_cases, prints one JSON line
+        print(json.dumps(cold_start(json.loads(args.cold_start))))
+        sys.exit()
+
+    from sample_inputs import load_sample_rows
+
+    batch_sizes = [size for size in BATCH_SIZES if size <= args.max_batch_size]
+    report = {
+        'environment': environment(),
+        'cold_start': cold_cases(load_sample_rows(1)[0], args.cold_runs),
+        'cases': warm_cases(batch_sizes),
+        'encoder_speedup': encoder_speedup(ENCODER_CHECK_SIZES, ENCODER_CHECK_REPEATS)
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, report['environment']['timestamp'].replace(':', '') + '.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(report, baseline)
+    print(f"\nResults written to {output}")
+
+    slow = [check for check in report['encoder_speedup'] if check['speedup'] < MIN_ENCODER_SPEEDUP]
+    if args.check and slow:
+        raise SystemExit(f"Encoder below {MIN_ENCODER_SPEEDUP}x the pandas reference for "
+                         + ', '.join(f"{check['batch_size']} rows ({check['speedup']}x)" for check in slow))
@@ -0,0 +1,56 @@
+import time
+
+import numpy as np
+
+from sample_inputs import load_sample_rows
+from predictor import INFERENCE_BACKENDS, load_backend, preprocessing_batch
+
+BATCH_SIZES = [1, 100, 10000]
+# Maximum accepted difference with the sklearn backend, on the predicted log delay
+TOLERANCE = 1e-4
+# Approximate number of rows scored for each latency measurement
+ROWS_PER_MEASURE = 20000
+
+
+def measure_latency(backend, features, repeats):
+    """Return the median latency (in ms) of one predict call"""
+    backend.predict(features)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        backend.predict(features)
+        timings.append(time.perf_counter() - start)
+    return np.median(timings) * 1000
+
+
+features = preprocessing_batch(load_sample_rows(max(BATCH_SIZES)))
+
+backends = {}
+for name in INFERENCE_BACKENDS:
+    try:
+        backends[name], _ = load_backend(name)
+    except (ImportError, OSError) as e:
+        print(f"Skipping backend {name}: {e}")
+
+# Parity with the current (sklearn wrapper) outputs
+reference = backends['sklearn'].predict(features)
+failed = False
+print("\nParity with the sklearn backend (log delay):")
+for name, backend in backends.items():
+    difference = np.abs(backend.predict(features) - reference).max()
+    status = "OK" if difference <= TOLERANCE else "FAILED"
+    failed |= difference > TOLERANCE
+    print(f"  {name:<8} max abs difference {difference:.2e}  {status}")
+
+# Latency per batch size
+print("\nMedian latency per predict call (ms):")
+print(f"  {'backend':<8}" + "".join(f"{size:>12}" for size in BATCH_SIZES))
+for name, backend in backends.items():
+    latencies = [
+        measure_latency(backend, features[:size], repeats=max(5, min(200, ROWS_PER_MEASURE // size)))
+        for size in BATCH_SIZES
+    ]
+    print(f"  {name:<8}" + "".join(f"{latency:>12.3f}" for latency in latencies))
+
+if failed:
+    raise SystemExit("Parity check failed")
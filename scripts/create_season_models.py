@@ -0,0 +1,50 @@
+import os
+
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from train_utils import *
+from train_utils import create_xgboost
+import joblib
+
+from export_model import export_model, export_preprocessor
+
+# Same fixed parameters as the global model (see create_model.py)
+params = {
+    "n_estimators": 1236,
+    "learning_rate": 0.0313923876812973,
+    "max_depth": 9,
+    "min_child_weight": 6.014600609509807,
+    "gamma": 2.6680304612895065,
+    "max_delta_step": 3,
+    "reg_alpha": 3.8071116085239384e-05,
+    "reg_lambda": 0.0006293589732767163,
+    "subsample": 0.8625686073282707,
+    "colsample_bytree": 0.8422167488737703,
+    "colsample_bylevel": 0.6524388161783657,
+    "colsample_bynode": 0.7633436352327931,
+    "booster": "gbtree"
+}
+
+# Datasets written by data_preprocessing_only_summer.py and data_preprocessing_only_winter.py,
+# which also export the matching ./models/<season>/preprocessor.pkl
+for season in ['summer', 'winter']:
+    df = pd.read_csv(f'./data/4_preprocessed_dataset_{season}.csv')
+
+    # Split between train set, and the combined test and val sets
+    X_train, X_test, y_train, y_test = train_test_split(df.drop(columns=["DELAY_LOG1P"]), df["DELAY_LOG1P"], test_size=0.2)
+
+    print(f"Training the {season} XGBoost model with fixed parameters...")
+    xgb_model = create_xgboost(params)
+    xgb_model.fit(X_train, y_train)
+
+    print(f"Evaluating the {season} XGBoost model...")
+    y_pred = xgb_model.predict(X_test)
+    eval_model(y_test, y_pred)
+
+    # Save the model, and its other formats for the inference backends
+    model_dir = f'./models/{season}'
+    os.makedirs(model_dir, exist_ok=True)
+    joblib.dump(xgb_model, os.path.join(model_dir, 'xgb_model.pkl'))
+    export_model(xgb_model, model_dir)
+    export_preprocessor(os.path.join(model_dir, 'preprocessor.pkl'), model_dir)
+    print(f"XGBoost model trained and exported to {model_dir}")
@@ -3,6 +3,8 @@ import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import MultiLabelBinarizer, OrdinalEncoder, StandardScaler, OneHotEncoder, PowerTransformer
+import joblib
+import os
 
 def cyclical_encoding(df, column, max_value):
     """
@@ -215,6 +217,9 @@ preprocessor = ColumnTransformer(
 )
 
 features_processed = preprocessor.fit_transform(df.drop('DELAY_LOG1P', axis=1))
+# Export the preprocessor, loaded by the prediction service with PREDICTION_SEASON_MODELS=true
+os.makedirs('./models/winter', exist_ok=True)
+joblib.dump(preprocessor, './models/winter/preprocessor.pkl')
 # Convert sparse matrix to dense array
 if hasattr(features_processed, 'toarray'):
     features_processed = features_processed.toarray()
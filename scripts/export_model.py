@@ -0,0 +1,82 @@
+import os
+import sys
+
+import joblib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models'))
+from tree_ensemble import TreeEnsemble, flatten_booster
+from feature_encoder import FeatureEncoder
+from model_registry import sha256_file
+from predictor import PREPROCESSOR_SPEC, load_preprocessor
+
+MODEL_FILE = './models/xgb_model.pkl'
+PREPROCESSOR_FILE = './models/preprocessor.pkl'
+EXPORT_DIR = './models'
+
+
+def export_model(xgb_model, directory):
+    """
+    Export a fitted XGBRegressor to the formats used by the inference backends.
+
+    Returns:
+    list: Paths of the written files.
+    """
+    n_features = xgb_model.get_booster().num_features()
+    written = []
+
+    # Native XGBoost format, loaded by the "booster" backend
+    booster_file = os.path.join(directory, 'xgb_model.ubj')
+    xgb_model.save_model(booster_file)
+    written.append(booster_file)
+    print(f"Booster exported to {booster_file}")
+
+    # Flattened node tables, evaluated by the "numpy" backend
+    trees_file = os.path.join(directory, 'xgb_model_trees.npz')
+    TreeEnsemble.save(flatten_booster(xgb_model.get_booster()), trees_file)
+    written.append(trees_file)
+    print(f"Node tables exported to {trees_file}")
+
+    # ONNX format, loaded by the "onnx" backend (optional dependency)
+    try:
+        from onnxmltools import convert_xgboost
+        from onnxmltools.convert.common.data_types import FloatTensorType
+    except ImportError:
+        print("onnxmltools is not installed, skipping the ONNX export")
+    else:
+        # The converter expects unnamed (f0, f1, ...) features
+        xgb_model.get_booster().feature_names = None
+        onnx_model = convert_xgboost(
+            xgb_model,
+            initial_types=[('input', FloatTensorType([None, n_features]))],
+            target_opset=15
+        )
+        onnx_file = os.path.join(directory, 'xgb_model.onnx')
+        with open(onnx_file, 'wb') as f:
+            f.write(onnx_model.SerializeToString())
+        written.append(onnx_file)
+        print(f"ONNX model exported to {onnx_file}")
+    return written
+
+
+def export_preprocessor(preprocessor_file, directory):
+    """
+    Export the fitted parameters of a pickled preprocessor to the JSON spec
+    the service loads without pandas and sklearn.
+
+    Returns:
+    str: Path of the written spec.
+    """
+    encoder = FeatureEncoder.from_preprocessor(load_preprocessor(preprocessor_file))
+    spec_file = os.path.join(directory, PREPROCESSOR_SPEC)
+    # The digest lets the service detect a preprocessor.pkl changed after the export
+    encoder.save(spec_file, source={
+        'file': os.path.basename(preprocessor_file),
+        'sha256': sha256_file(preprocessor_file)
+    })
+    print(f"Preprocessor spec exported to {spec_file}")
+    return spec_file
+
+
+if __name__ == '__main__':
+    export_model(joblib.load(MODEL_FILE), EXPORT_DIR)
+    export_preprocessor(PREPROCESSOR_FILE, EXPORT_DIR)
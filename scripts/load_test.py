@@ -0,0 +1,222 @@
+import argparse
+import base64
+import http.client
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from sample_inputs import load_sample_rows
+
+# Running prediction API (python models/app.py or python models/serve.py)
+PREDICTION_API_URL = os.environ.get('PREDICTION_API_URL', 'http://localhost:5000')
+# Synthetic /predict requests built from the 2023 delay and climate data
+SYNTHETIC_ROWS = 20000
+DURATION = 20
+# Concurrency levels tried by --saturation, until the throughput stops growing
+SATURATION_CONCURRENCY = [1, 2, 4, 8, 16, 32, 64, 128]
+SATURATION_GAIN = 0.05
+# Client threads of the open-loop mode, later arrivals wait for a free thread
+MAX_IN_FLIGHT = 512
+
+
+def load_captured_requests(path):
+    """Read the (method, path, content type, body) of requests captured by the API"""
+    requests = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'body' in record:
+                body = record['body'].encode()
+            else:
+                body = base64.b64decode(record['body_base64'])
+            requests.append((record['method'], record['path'], record['content_type'], body))
+    return requests
+
+
+def synthetic_requests(n_rows):
+    """Build /predict requests from sample rows of the 2023 bus delays and climate data"""
+    return [
+        ('POST', '/predict', 'application/json', json.dumps(row).encode())
+        for row in load_sample_rows(n_rows)
+    ]
+
+
+class Client:
+    """Sends requests on one keep-alive connection per thread"""
+
+    def __init__(self, url, headers=None):
+        parsed = urllib.parse.urlsplit(url)
+        self.headers = headers or {}
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.local = threading.local()
+
+    def send(self, method, path, content_type, body):
+        """Send one request, return True when the answer is a 2xx"""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            connection.request(method, path, body=body, headers={'Content-Type': content_type, **self.headers})
+            response = connection.getresponse()
+            response.read()
+            return 200 <= response.status < 300
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self.local.connection = None
+            return False
+
+
+def summarize(latencies, errors, elapsed):
+    """Summarize (latency, ok) pairs; the accepted_* percentiles only count 2xx answers"""
+    accepted = np.array([latency for latency, ok in latencies if ok]) * 1000
+    all_latencies = np.array([latency for latency, _ in latencies]) * 1000
+    summary = {
+        'requests': len(latencies),
+        'throughput': round(len(latencies) / elapsed, 1),
+        'accepted_throughput': round(len(accepted) / elapsed, 1),
+        'error_rate': round(errors / len(latencies), 4) if len(latencies) else None
+    }
+    for prefix, values in (('', all_latencies), ('accepted_', accepted)):
+        for q in (50, 95, 99):
+            summary[f'{prefix}p{q}_ms'] = round(float(np.percentile(values, q)), 2) if len(values) else None
+    return summary
+
+
+def run_closed_loop(client, source, concurrency, duration):
+    """Keep `concurrency` requests from the `source` iterator in flight for `duration` seconds"""
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+    stop = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < stop:
+            with lock:
+                request = next(source)
+            start = time.perf_counter()
+            ok = client.send(*request)
+            latency = time.perf_counter() - start
+            with lock:
+                latencies.append((latency, ok))
+                errors[0] += not ok
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - start)
+
+
+def run_open_loop(client, source, rate, duration, seed=0):
+    """
+    Send requests at Poisson arrivals of `rate` per second for `duration` seconds.
+
+    Latencies are measured from the scheduled arrival time, so the time a
+    request waits for a free client thread when the server falls behind is
+    included (no coordinated omission).
+    """
+    rng = np.random.default_rng(seed)
+    arrivals = np.cumsum(rng.exponential(1 / rate, size=int(rate * duration * 1.2) + 1))
+    arrivals = arrivals[arrivals < duration]
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+
+    def send(scheduled, request):
+        ok = client.send(*request)
+        with lock:
+            latencies.append((time.perf_counter() - scheduled, ok))
+            errors[0] += not ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT) as pool:
+        for arrival, request in zip(arrivals, source):
+            delay = start + arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, start + arrival, request)
+    return summarize(latencies, errors[0], time.perf_counter() - start)
+
+
+def find_saturation(client, source, duration):
+    """Raise the concurrency until two levels in a row beat the best throughput by less than SATURATION_GAIN"""
+    runs = []
+    best = None
+    stalled = 0
+    for concurrency in SATURATION_CONCURRENCY:
+        result = {'concurrency': concurrency, **run_closed_loop(client, source, concurrency, duration)}
+        print_result(result)
+        runs.append(result)
+        if best is None or result['throughput'] >= best['throughput'] * (1 + SATURATION_GAIN):
+            stalled = 0
+        else:
+            stalled += 1
+            if stalled == 2:
+                break
+        if best is None or result['throughput'] > best['throughput']:
+            best = result
+    return {'saturation_throughput': best['throughput'], 'saturation_concurrency': best['concurrency'], 'runs': runs}
+
+
+def print_result(result):
+    mode = f"{result['concurrency']} clients" if 'concurrency' in result else f"{result['rate']} req/s offered"
+    print(f"{mode:>18}: {result['throughput']:>8.1f} req/s  p50 {result['p50_ms']} ms  "
+          f"p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  errors {result['error_rate']:.2%}", flush=True)
+    if result['error_rate']:
+        print(f"{'accepted':>18}: {result['accepted_throughput']:>8.1f} req/s  p50 {result['accepted_p50_ms']} ms  "
+              f"p95 {result['accepted_p95_ms']} ms  p99 {result['accepted_p99_ms']} ms", flush=True)
+
+
+# Replay captured traffic (PREDICTION_CAPTURE_RATE) or synthetic traffic against a running API, e.g.
+#   python scripts/load_test.py --replay captures/traffic.jsonl --rate 200
+#   python scripts/load_test.py --saturation --output load_test.json
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test a running prediction API")
+    parser.add_argument('--url', default=PREDICTION_API_URL)
+    parser.add_argument('--replay', help="JSONL file captured by the API, synthetic /predict traffic otherwise")
+    parser.add_argument('--duration', type=float, default=DURATION, help="Seconds per run")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16], help="Closed-loop clients")
+    mode.add_argument('--rate', type=float, nargs='+', help="Open-loop arrival rates (requests per second)")
+    mode.add_argument('--saturation', action='store_true', help="Find the saturation throughput")
+    parser.add_argument('--deadline-ms', type=float, help="Send X-Request-Deadline-Ms with each request")
+    parser.add_argument('--output', help="JSON results file")
+    args = parser.parse_args()
+
+    requests = load_captured_requests(args.replay) if args.replay else synthetic_requests(SYNTHETIC_ROWS)
+    # Runs continue through the requests where the previous one stopped
+    source = itertools.cycle(requests)
+    client = Client(args.url, {'X-Request-Deadline-Ms': str(args.deadline_ms)} if args.deadline_ms else None)
+    print(f"{len(requests)} {'captured' if args.replay else 'synthetic'} requests against {args.url}")
+
+    if args.saturation:
+        report = find_saturation(client, source, args.duration)
+        print(f"Saturation throughput: {report['saturation_throughput']} req/s "
+              f"with {report['saturation_concurrency']} clients")
+    elif args.rate:
+        report = {'runs': []}
+        for rate in args.rate:
+            result = {'rate': rate, **run_open_loop(client, source, rate, args.duration)}
+            print_result(result)
+            report['runs'].append(result)
+    else:
+        report = {'runs': []}
+        for concurrency in args.concurrency:
+            result = {'concurrency': concurrency, **run_closed_loop(client, source, concurrency, args.duration)}
+            print_result(result)
+            report['runs'].append(result)
+
+    if args.output:
+        report = {'url': args.url, 'source': args.replay or 'synthetic', 'duration': args.duration,
+                  'deadline_ms': args.deadline_ms, **report}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import joblib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models'))
+from export_model import export_model, export_preprocessor
+from model_registry import sha256_file
+from predictor import load_preprocessor, registry
+
+TRAINING_DATA_FILE = './data/4_preprocessed_dataset.csv'
+
+# Publish a preprocessor/model pair as a new version of the model registry, e.g.
+#   python scripts/publish_model.py opt --preprocessor ./models/preprocessor_opt.pkl \
+#       --model ./models/xgb_model_opt.pkl --metrics metrics.json --activate
+parser = argparse.ArgumentParser(description="Publish a model version to the registry")
+parser.add_argument('version', help="Name of the new version")
+parser.add_argument('--preprocessor', default='./models/preprocessor.pkl')
+parser.add_argument('--model', default='./models/xgb_model.pkl')
+parser.add_argument('--training-data', default=TRAINING_DATA_FILE)
+parser.add_argument('--season-models', help="Directory holding summer/ and winter/ model artifacts to include")
+parser.add_argument('--metrics', help="JSON file of evaluation metrics (R2, MAE, RMSE...)")
+parser.add_argument('--latency-tiers', help="latency_tiers.json written by scripts/tune_latency_tiers.py for this model")
+parser.add_argument('--activate', action='store_true', help="Make it the current version")
+args = parser.parse_args()
+
+preprocessor = load_preprocessor(args.preprocessor)
+xgb_model = joblib.load(args.model)
+features = [str(name) for name in preprocessor.get_feature_names_out()]
+n_features = xgb_model.get_booster().num_features()
+if len(features) != n_features:
+    raise SystemExit(f"The preprocessor produces {len(features)} features, the model expects {n_features}")
+
+metrics = {}
+if args.metrics:
+    with open(args.metrics) as f:
+        metrics = json.load(f)
+
+training_data = None
+if os.path.exists(args.training_data):
+    training_data = {'path': args.training_data, 'sha256': sha256_file(args.training_data)}
+else:
+    print(f"{args.training_data} not found, the manifest will not record the training data")
+
+with tempfile.TemporaryDirectory() as export_dir:
+    # Artifacts are stored under the names the inference backends look for
+    files = [os.path.join(export_dir, 'preprocessor.pkl'), os.path.join(export_dir, 'xgb_model.pkl')]
+    shutil.copyfile(args.preprocessor, files[0])
+    shutil.copyfile(args.model, files[1])
+    files += export_model(xgb_model, export_dir)
+    files.append(export_preprocessor(files[0], export_dir))
+    if args.latency_tiers:
+        files.append(os.path.join(export_dir, 'latency_tiers.json'))
+        shutil.copyfile(args.latency_tiers, files[-1])
+
+    # Season models are stored in summer/ and winter/ subdirectories of the version
+    if args.season_models:
+        for season in ['summer', 'winter']:
+            season_dir = os.path.join(args.season_models, season)
+            if os.path.isdir(season_dir):
+                files += [(os.path.join(season_dir, name), f"{season}/{name}") for name in sorted(os.listdir(season_dir))]
+
+    manifest = registry.publish(
+        args.version,
+        files,
+        source={'preprocessor': args.preprocessor, 'model': args.model},
+        n_features=n_features,
+        features=features,
+        training_data=training_data,
+        metrics=metrics
+    )
+print(f"Published version {manifest['version']} to {registry.root}")
+
+if args.activate:
+    registry.activate(args.version)
+    print(f"Version {args.version} is now current, running servers pick it up on their next registry poll")
@@ -0,0 +1,86 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Make the prediction service modules importable from the scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models'))
+from predictor import get_one_hot_block
+
+CLIMATE_FILE = "./data/climate/climate-hourly-2023.csv"
+BUS_DELAYS_FILE = "./data/bus-delay/ttc-bus-delay-data-2023.csv"
+
+# Grouping of the raw incident types into the model's categories (notebooks/2_eda.ipynb)
+INCIDENT_MAP = {
+    'Cleaning - Unsanitary': 'Technical',
+    'Collision - TTC': 'Safety',
+    'Diversion': 'External',
+    'Emergency Services': 'Safety',
+    'General Delay': 'Other',
+    'Held By': 'Operational',
+    'Investigation': 'Safety',
+    'Mechanical': 'Technical',
+    'Operations - Operator': 'Operational',
+    'Road Blocked - NON-TTC Collision': 'External',
+    'Security': 'Safety',
+    'Utilized Off Route': 'Operational',
+    'Vision': 'Other'
+}
+
+WEATHER_COLUMNS = [
+    'TEMP', 'DEW_POINT_TEMP', 'HUMIDEX', 'PRECIP_AMOUNT', 'RELATIVE_HUMIDITY',
+    'STATION_PRESSURE', 'VISIBILITY', 'WEATHER_ENG_DESC', 'WIND_DIRECTION', 'WIND_SPEED'
+]
+
+
+def load_sample_rows(n_rows, seed=0, labelled=False):
+    """
+    Build prediction inputs from the 2023 bus delays joined with the hourly climate data.
+
+    Routes unknown to the fitted encoder are dropped, the incident type is drawn
+    uniformly among the known categories and missing weather values are filled
+    the same way for every run, so the rows can be replayed against /predict.
+    With `labelled`, the recorded incident type (grouped with INCIDENT_MAP) is
+    kept instead and each row gets the recorded delay in minutes as DELAY.
+
+    Returns:
+    list: `n_rows` dicts in the /predict input format.
+    """
+    rng = np.random.default_rng(seed)
+    routes, _ = get_one_hot_block('ROUTE')
+    incidents, _ = get_one_hot_block('INCIDENT')
+
+    bus_df = pd.read_csv(BUS_DELAYS_FILE, usecols=['Date', 'Route', 'Time', 'Day', 'Incident', 'Min Delay'])
+    bus_df['ROUTE'] = pd.to_numeric(bus_df['Route'], errors='coerce')
+    bus_df = bus_df[bus_df['ROUTE'].isin(routes)]
+    if labelled:
+        bus_df['INCIDENT'] = bus_df['Incident'].map(lambda incident: INCIDENT_MAP.get(incident, incident))
+        bus_df = bus_df[bus_df['INCIDENT'].isin(incidents) & bus_df['Min Delay'].notna()]
+    bus_df = bus_df.sample(n=n_rows, replace=n_rows > len(bus_df), random_state=seed)
+
+    date_time = pd.to_datetime(bus_df['Date'] + ' ' + bus_df['Time'], format='%d-%b-%y %H:%M')
+    bus_df['LOCAL_DATE'] = date_time.dt.floor('h').dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    climate_df = pd.read_csv(CLIMATE_FILE, usecols=['LOCAL_DATE'] + WEATHER_COLUMNS)
+    # HUMIDEX is only reported in warm weather, the temperature is the closest value otherwise
+    climate_df['HUMIDEX'] = climate_df['HUMIDEX'].fillna(climate_df['TEMP'])
+    climate_df['WEATHER_ENG_DESC'] = climate_df['WEATHER_ENG_DESC'].fillna('Clear')
+    climate_df = climate_df.ffill().bfill()
+
+    df = bus_df.merge(climate_df, on='LOCAL_DATE', how='left')
+    df[WEATHER_COLUMNS] = df[WEATHER_COLUMNS].fillna(climate_df[WEATHER_COLUMNS].iloc[0])
+
+    rows = pd.DataFrame({
+        'ROUTE': df['ROUTE'].astype(int),
+        'LOCAL_TIME': date_time.dt.strftime('%H:%M:%S').values,
+        'WEEK_DAY': df['Day'],
+        'INCIDENT': df['INCIDENT'].values if labelled else rng.choice(incidents, size=len(df)),
+        'LOCAL_MONTH': date_time.dt.month.astype(float).values,
+        'LOCAL_DAY': date_time.dt.day.astype(float).values,
+    })
+    for column in WEATHER_COLUMNS:
+        rows[column] = df[column].values
+    if labelled:
+        rows['DELAY'] = df['Min Delay'].astype(float).values
+    return rows.to_dict(orient='records')
@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+import pyarrow
+import pyarrow.parquet
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models'))
+from predictor import get_loaded_model, predict_columns, select_rows, set_inference_threads, validate_columns
+
+CHUNK_SIZE = 50000
+# Scored chunks are kept in <output>.parts/ until the whole file is done
+PARTS_SUFFIX = '.parts'
+JOB_FILE = 'job.json'
+# Columns added to the input ones, typed explicitly: a chunk without errors
+# would otherwise get a null-typed error column
+OUTPUT_FIELDS = [pyarrow.field('prediction', pyarrow.float64()), pyarrow.field('error', pyarrow.string())]
+
+
+def read_chunks(path, chunk_size):
+    """Yield DataFrames of at most chunk_size rows from a CSV or Parquet file"""
+    if path.endswith('.parquet'):
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def empty_chunk(path):
+    """Return the columns of an input file without its rows"""
+    if path.endswith('.parquet'):
+        return pyarrow.parquet.read_schema(path).empty_table().to_pandas()
+    return pd.read_csv(path, nrows=0)
+
+
+def part_path(parts_dir, index):
+    return os.path.join(parts_dir, f'part-{index:06d}.parquet')
+
+
+def score_chunk(index, df, parts_dir):
+    """
+    Validate and score one chunk, write it with its predictions to its part file.
+
+    Returns:
+    tuple: (chunk index, rows, rows with an error)
+    """
+    columns, errors = validate_columns({name: df[name].to_numpy() for name in df.columns})
+    valid_indices = np.flatnonzero([error is None for error in errors])
+
+    # Make predictions for all valid rows of the chunk in one pass
+    predictions = np.full(len(df), np.nan)
+    predictions[valid_indices] = predict_columns(select_rows(columns, valid_indices))
+
+    table = pyarrow.Table.from_pandas(df.assign(prediction=predictions, error=errors), preserve_index=False)
+    for field in OUTPUT_FIELDS:
+        position = table.schema.get_field_index(field.name)
+        table = table.set_column(position, field, table.column(position).cast(field.type))
+    # Written aside then renamed, so a part file is either complete or absent
+    path = part_path(parts_dir, index)
+    pyarrow.parquet.write_table(table, path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return index, len(df), len(df) - len(valid_indices)
+
+
+def start_job(input_file, chunk_size, parts_dir):
+    """Create the parts directory, or check that it belongs to the same job when resuming"""
+    stat = os.stat(input_file)
+    job = {
+        'input': os.path.abspath(input_file),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'chunk_size': chunk_size
+    }
+    job_file = os.path.join(parts_dir, JOB_FILE)
+    if os.path.exists(job_file):
+        with open(job_file) as f:
+            if json.load(f) != job:
+                raise SystemExit(f"{parts_dir} holds chunks of another input file or chunk size, remove it to start over")
+    else:
+        os.makedirs(parts_dir, exist_ok=True)
+        with open(job_file, 'w') as f:
+            json.dump(job, f)
+
+
+def combine_parts(parts_dir, n_chunks, output_file):
+    """Write the part files, in input order, to a single Parquet or CSV file"""
+    tmp_file = output_file + '.tmp'
+    if output_file.endswith('.parquet'):
+        # Input columns read per chunk may differ in type, e.g. a column that is
+        # empty in one chunk is null-typed there
+        schema = pyarrow.unify_schemas(
+            [pyarrow.parquet.read_schema(part_path(parts_dir, index)) for index in range(n_chunks)],
+            promote_options='permissive'
+        )
+        with pyarrow.parquet.ParquetWriter(tmp_file, schema) as writer:
+            for index in range(n_chunks):
+                writer.write_table(pyarrow.parquet.read_table(part_path(parts_dir, index)).cast(schema))
+    else:
+        for index in range(n_chunks):
+            pd.read_parquet(part_path(parts_dir, index)).to_csv(
+                tmp_file, mode='w' if index == 0 else 'a', header=index == 0, index=False
+            )
+    os.replace(tmp_file, output_file)
+
+
+def report(result, n_rows, n_errors, started):
+    """Print the progress after a chunk, return the updated row and error counts"""
+    index, rows, errors = result
+    n_rows += rows
+    n_errors += errors
+    print(f"Chunk {index}: {rows} rows, {errors} errors - "
+          f"{n_rows} rows at {n_rows / (time.perf_counter() - started):.0f} rows/s", flush=True)
+    return n_rows, n_errors
+
+
+def score_file(input_file, output_file, chunk_size=CHUNK_SIZE, workers=None):
+    """
+    Score a CSV or Parquet file of prediction inputs (one column per input field).
+
+    Chunks are scored in parallel by `workers` processes and written to
+    <output_file>.parts/ as they complete; a run interrupted and started
+    again with the same arguments only scores the missing chunks. The
+    output holds the input columns plus `prediction` and `error`.
+    """
+    workers = workers or os.cpu_count()
+    parts_dir = output_file + PARTS_SUFFIX
+    start_job(input_file, chunk_size, parts_dir)
+
+    # Loaded before the pool starts, so forked workers share the model
+    set_inference_threads(max(1, os.cpu_count() // workers))
+    get_loaded_model()
+
+    started = time.perf_counter()
+    n_chunks = n_rows = n_errors = n_skipped = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for index, df in enumerate(read_chunks(input_file, chunk_size)):
+            n_chunks += 1
+            if os.path.exists(part_path(parts_dir, index)):
+                n_skipped += 1
+                continue
+            # At most two chunks per worker are held in memory
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    n_rows, n_errors = report(future.result(), n_rows, n_errors, started)
+            pending.add(pool.submit(score_chunk, index, df, parts_dir))
+        for future in pending:
+            n_rows, n_errors = report(future.result(), n_rows, n_errors, started)
+    if n_chunks == 0:
+        # An input without rows gives an output with the columns only
+        score_chunk(0, empty_chunk(input_file), parts_dir)
+        n_chunks = 1
+
+    if n_skipped:
+        print(f"{n_skipped} chunks were already scored by a previous run")
+    combine_parts(parts_dir, n_chunks, output_file)
+    shutil.rmtree(parts_dir)
+    elapsed = time.perf_counter() - started
+    print(f"Scored {n_rows} rows ({n_errors} with errors) in {elapsed:.1f}s, "
+          f"{n_rows / elapsed:.0f} rows/s, written to {output_file}")
+
+
+# Score a file offline instead of calling the API row by row, e.g.
+#   python scripts/score_file.py scenarios.csv predictions.parquet --workers 4
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of prediction inputs")
+    parser.add_argument('input', help="CSV or Parquet file, one column per input field")
+    parser.add_argument('output', help="Parquet (.parquet) or CSV file of the inputs with their predictions")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows per chunk")
+    parser.add_argument('--workers', type=int, help="Scoring processes, defaults to the number of cores")
+    args = parser.parse_args()
+
+    score_file(args.input, args.output, args.chunk_size, args.workers)
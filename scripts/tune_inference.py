@@ -0,0 +1,176 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models'))
+import predictor
+from sample_inputs import load_sample_rows
+
+# Share of the requests of each batch size: mostly single /predict calls and a few batches
+BATCH_MIX = {1: 0.8, 100: 0.15, 1000: 0.05}
+DURATION = 5
+# Combinations within this fraction of the best throughput are ties (measurement
+# noise), the one with the lowest p99 latency among them is chosen
+THROUGHPUT_TOLERANCE = 0.05
+SAMPLE_ROWS = 10000
+
+
+def powers_of_two(limit):
+    """Return 1, 2, 4, ... up to limit, and limit itself"""
+    values = [1]
+    while values[-1] * 2 <= limit:
+        values.append(values[-1] * 2)
+    return sorted(set(values + [limit]))
+
+
+def candidates(n_cores, workers, threads, affinity):
+    """
+    Return the (workers, threads per worker, pinned) combinations to measure.
+
+    Oversubscribed combinations (more threads than cores) are kept as the
+    reference: a worker per core with the library default of one thread per
+    core is what an unconfigured server runs.
+    """
+    combinations = []
+    for n_workers in workers:
+        for n_threads in threads:
+            combinations.append((n_workers, n_threads, False))
+            if affinity and n_workers * n_threads <= n_cores and n_threads < n_cores:
+                combinations.append((n_workers, n_threads, True))
+    return combinations
+
+
+def worker_loop(rows, sizes, n_threads, cores, duration, barrier, results):
+    """Score the batch sizes in turn for `duration` seconds, report the rows scored and latencies"""
+    if cores:
+        predictor.pin_to_cores(cores)
+    predictor.set_inference_threads(n_threads)
+    predictor.predict_batch(rows[:100])
+
+    latencies = []
+    n_rows = 0
+    offset = 0
+    barrier.wait()
+    stop = time.monotonic() + duration
+    for size in sizes:
+        start = time.monotonic()
+        if start >= stop:
+            break
+        offset = (offset + size) % (len(rows) - size)
+        if size == 1:
+            predictor.predict(rows[offset])
+        else:
+            predictor.predict_batch(rows[offset:offset + size])
+        latencies.append(time.monotonic() - start)
+        n_rows += size
+    results.put((n_rows, latencies))
+
+
+def measure(rows, mix, n_workers, n_threads, pinned, duration, seed=0):
+    """Run n_workers forked scoring processes at once, return their combined throughput and latency"""
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(n_workers)
+    results = context.Queue()
+    rng = np.random.default_rng(seed)
+    cores = predictor.available_cores()
+    processes = []
+    for slot in range(n_workers):
+        sizes = rng.choice(list(mix), size=100000, p=np.array(list(mix.values())) / sum(mix.values()))
+        worker_cores = predictor.worker_cores(slot, n_threads, cores) if pinned else None
+        process = context.Process(
+            target=worker_loop, args=(rows, sizes, n_threads, worker_cores, duration, barrier, results)
+        )
+        process.start()
+        processes.append(process)
+
+    n_rows = 0
+    latencies = []
+    for _ in processes:
+        worker_rows, worker_latencies = results.get()
+        n_rows += worker_rows
+        latencies += worker_latencies
+    for process in processes:
+        process.join()
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'workers': n_workers,
+        'threads_per_worker': n_threads,
+        'cpu_affinity': pinned,
+        'rows_per_s': round(n_rows / duration, 1),
+        'requests_per_s': round(len(latencies) / duration, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3)
+    }
+
+
+def choose(results, tolerance=THROUGHPUT_TOLERANCE):
+    """Return the result with the lowest p99 among those within `tolerance` of the best throughput"""
+    best_throughput = max(result['rows_per_s'] for result in results)
+    ties = [result for result in results if result['rows_per_s'] >= best_throughput * (1 - tolerance)]
+    return min(ties, key=lambda result: result['p99_ms'])
+
+
+def parse_mix(value):
+    """Parse 'size:share,...' into {size: share}"""
+    mix = {}
+    for item in value.split(','):
+        size, share = item.split(':')
+        mix[int(size)] = float(share)
+    return mix
+
+
+# Find the worker count, inference threads per worker and pinning with the best
+# throughput on this host, and write them for serve.py, e.g.
+#   python scripts/tune_inference.py --mix 1:0.9,1000:0.1
+if __name__ == '__main__':
+    n_cores = len(predictor.available_cores())
+    parser = argparse.ArgumentParser(description="Tune the inference workers and threads for this host")
+    parser.add_argument('--mix', type=parse_mix, default=BATCH_MIX, help="Batch sizes and their share of the requests")
+    parser.add_argument('--workers', type=int, nargs='+', default=powers_of_two(n_cores))
+    parser.add_argument('--threads', type=int, nargs='+', default=powers_of_two(n_cores))
+    parser.add_argument('--no-affinity', action='store_true', help="Do not try pinning workers to cores")
+    parser.add_argument('--duration', type=float, default=DURATION, help="Seconds per combination")
+    parser.add_argument('--output', default=predictor.INFERENCE_CONFIG_FILE)
+    args = parser.parse_args()
+
+    rows = load_sample_rows(SAMPLE_ROWS)
+    # Loaded and warmed up single-threaded, so no OpenMP thread pool exists when forking
+    predictor.set_inference_threads(1)
+    predictor.warm_up()
+
+    affinity = not args.no_affinity and hasattr(os, 'sched_setaffinity')
+    results = []
+    print(f"{n_cores} cores, {predictor.INFERENCE_BACKEND} backend, batch mix {args.mix}")
+    for n_workers, n_threads, pinned in candidates(n_cores, args.workers, args.threads, affinity):
+        result = measure(rows, args.mix, n_workers, n_threads, pinned, args.duration)
+        results.append(result)
+        print(f"{n_workers:>3} workers x {n_threads:>2} threads{' pinned' if pinned else '':<7}: "
+              f"{result['rows_per_s']:>10.0f} rows/s {result['requests_per_s']:>9.0f} req/s  "
+              f"p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms", flush=True)
+
+    best = choose(results)
+    config = {
+        'workers': best['workers'],
+        'threads_per_worker': best['threads_per_worker'],
+        'cpu_affinity': best['cpu_affinity'],
+        'backend': predictor.INFERENCE_BACKEND,
+        'tuned': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'host': platform.node(),
+            'cores': n_cores,
+            'batch_mix': {str(size): share for size, share in args.mix.items()},
+            'duration_s': args.duration,
+            'results': results
+        }
+    }
+    with open(args.output, 'w') as f:
+        json.dump(config, f, indent=2)
+    print(f"\nBest: {best['workers']} workers x {best['threads_per_worker']} threads"
+          f"{', pinned' if best['cpu_affinity'] else ''} at {best['rows_per_s']:.0f} rows/s, written to {args.output}")
@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models'))
+import predictor
+from sample_inputs import load_sample_rows
+
+VALIDATION_ROWS = 10000
+# Truncations measured, as fractions of the model's boosting rounds
+ROUND_FRACTIONS = [0.025, 0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0]
+# Largest accepted increase of the validation MAE (minutes, against the recorded
+# delays) over the full model's, as a fraction of it; each tier gets the fewest
+# rounds within its tolerance, and is left out (not served) when only the full
+# model is within it. The difference with the full model's predictions is recorded
+# in the curve as well
+TIER_TOLERANCE = {'fast': 0.1, 'balanced': 0.02}
+LATENCY_BATCH_SIZES = [1, 1000]
+ROWS_PER_MEASURE = 20000
+
+
+def load_validation_rows(path, n_rows):
+    """Return /predict input rows and their recorded delays (minutes), from a CSV or the 2023 delays"""
+    if path:
+        rows = pd.read_csv(path).to_dict(orient='records')
+    else:
+        rows = load_sample_rows(n_rows, labelled=True)
+    delays = np.array([row.pop('DELAY') for row in rows], dtype=float)
+    return rows, delays
+
+
+def measure_latency(backend, features, iteration_range):
+    """Return the median latency (ms) of one backend call on features"""
+    repeats = max(5, min(200, ROWS_PER_MEASURE // len(features)))
+    backend.predict(features, iteration_range)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        backend.predict(features, iteration_range)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def accuracy_curve(backend, features, delays, round_counts):
+    """Measure the validation error and the latency of the model truncated to each round count"""
+    full = backend.predict(features)
+    full_minutes = float(np.expm1(full).mean())
+    curve = []
+    for n_rounds in round_counts:
+        pred = backend.predict(features, (0, n_rounds))
+        curve.append({
+            'n_rounds': n_rounds,
+            'mae_log1p': round(float(np.abs(pred - np.log1p(delays)).mean()), 5),
+            'mae_minutes': round(float(np.abs(np.expm1(pred) - delays).mean()), 4),
+            # Mean difference with the predictions of every round, in minutes
+            'deviation_minutes': round(float(np.abs(np.expm1(pred) - np.expm1(full)).mean()), 4),
+            'relative_deviation': round(float(np.abs(np.expm1(pred) - np.expm1(full)).mean()) / full_minutes, 5),
+            'latency_ms': {
+                str(size): round(measure_latency(backend, features[:size], (0, n_rounds)), 4)
+                for size in LATENCY_BATCH_SIZES
+            }
+        })
+    return curve
+
+
+def choose_tiers(curve, tolerance, n_rounds):
+    """Give each tier the fewest rounds whose validation MAE is within its tolerance of the full model's
+
+    Tiers for which no truncation is within the tolerance save no latency and are left out.
+    """
+    full_mae = next(point['mae_minutes'] for point in curve if point['n_rounds'] == n_rounds)
+    tiers = {}
+    for tier, allowed in tolerance.items():
+        rounds = min(point['n_rounds'] for point in curve if point['mae_minutes'] <= full_mae * (1 + allowed))
+        if rounds < n_rounds:
+            tiers[tier] = rounds
+    tiers['full'] = None
+    return tiers
+
+
+# Record the accuracy-versus-latency curve of the truncated model and pick the
+# rounds of each latency tier, e.g.
+#   python scripts/tune_latency_tiers.py --validation validation.csv --fast 0.05
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pick the boosting rounds of the fast and balanced latency tiers")
+    parser.add_argument('--validation', help="CSV of /predict input columns and the recorded DELAY (minutes), "
+                                             "sampled from the 2023 bus delays by default")
+    parser.add_argument('--rows', type=int, default=VALIDATION_ROWS, help="Rows sampled without --validation")
+    parser.add_argument('--model-dir', default=predictor.current_dir, help="Model artifacts directory")
+    for tier, allowed in TIER_TOLERANCE.items():
+        parser.add_argument(f'--{tier}', type=float, default=allowed,
+                            help=f"Tolerance of the {tier} tier (default {allowed})")
+    parser.add_argument('--output', help=f"Defaults to <model dir>/{predictor.LATENCY_TIERS_FILE}")
+    args = parser.parse_args()
+
+    loaded = predictor.LoadedModel(args.model_dir)
+    backend = loaded.backend
+    if backend.n_rounds is None:
+        raise SystemExit(f"The {predictor.INFERENCE_BACKEND} backend cannot score a subset of the rounds")
+
+    rows, delays = load_validation_rows(args.validation, args.rows)
+    features = predictor.preprocessing_batch(rows, loaded)
+    round_counts = sorted({max(1, round(backend.n_rounds * fraction)) for fraction in ROUND_FRACTIONS})
+    curve = accuracy_curve(backend, features, delays, round_counts)
+    tolerance = {tier: getattr(args, tier) for tier in TIER_TOLERANCE}
+    tiers = choose_tiers(curve, tolerance, backend.n_rounds)
+
+    print(f"{'rounds':>8}{'MAE log1p':>12}{'MAE min':>10}{'vs full min':>13}{'vs full %':>11}"
+          + ''.join(f"{f'{size} rows ms':>14}" for size in LATENCY_BATCH_SIZES))
+    for point in curve:
+        print(f"{point['n_rounds']:>8}{point['mae_log1p']:>12.5f}{point['mae_minutes']:>10.3f}"
+              f"{point['deviation_minutes']:>13.3f}{point['relative_deviation'] * 100:>11.2f}"
+              + ''.join(f"{point['latency_ms'][str(size)]:>14.3f}" for size in LATENCY_BATCH_SIZES))
+
+    output = args.output or os.path.join(args.model_dir, predictor.LATENCY_TIERS_FILE)
+    with open(output, 'w') as f:
+        json.dump({
+            'tiers': tiers,
+            'n_rounds': backend.n_rounds,
+            'tolerance': tolerance,
+            'validation': {'source': args.validation or 'load_sample_rows(labelled=True)', 'rows': len(rows)},
+            'backend': predictor.INFERENCE_BACKEND,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'curve': curve
+        }, f, indent=2)
+    print("\nTiers: " + ', '.join(f"{tier} {n_rounds or 'all'} rounds" for tier, n_rounds in tiers.items())
+          + f", written to {output}")
+    for tier in sorted(set(tolerance) - set(tiers)):
+        print(f"No truncation keeps the {tier} tier within {tolerance[tier]:.0%} of the full model's MAE, "
+              f"it is not served")
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+# No registry watcher thread reloading models behind the tests' back
+os.environ.setdefault('PREDICTION_MODEL_WATCH_INTERVAL', '0')
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'models'))
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+
+@pytest.fixture
+def row():
+    """A valid /predict input row"""
+    return {
+        "ROUTE": 47,
+        "LOCAL_TIME": "13:16:00",
+        "WEEK_DAY": "Monday",
+        "INCIDENT": "Operational",
+        "LOCAL_MONTH": 9.0,
+        "LOCAL_DAY": 18.0,
+        "TEMP": 20.7,
+        "DEW_POINT_TEMP": 11.6,
+        "HUMIDEX": 20.7,
+        "PRECIP_AMOUNT": 0.0,
+        "RELATIVE_HUMIDITY": 56.0,
+        "STATION_PRESSURE": 100.14,
+        "VISIBILITY": 16.1,
+        "WEATHER_ENG_DESC": "Clear",
+        "WIND_DIRECTION": 33.0,
+        "WIND_SPEED": 13.0
+    }
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
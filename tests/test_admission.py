@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, Overloaded
+
+
+def queue_request(controller, results, timeout=None):
+    """Start a thread acquiring a slot, its outcome is appended to results"""
+    def acquire():
+        try:
+            controller.acquire(timeout)
+            results.append('admitted')
+        except Overloaded as e:
+            results.append(e.reason)
+
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    while controller.stats()['queued'] == 0 and not results:
+        time.sleep(0.001)
+    return thread
+
+
+def test_requests_beyond_the_slots_wait_for_a_release():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, target_wait=5)
+    assert controller.acquire() == 0.0
+    results = []
+    thread = queue_request(controller, results)
+
+    controller.release(0.01)
+    thread.join(5)
+    assert results == ['admitted']
+    assert controller.stats()['active'] == 1
+
+
+def test_full_queue_is_shed_with_retry_after():
+    controller = AdmissionController(max_concurrency=1, max_queue=0, target_wait=5)
+    controller.acquire()
+    controller.release(2.5)
+    controller.acquire()
+
+    with pytest.raises(Overloaded) as shed:
+        controller.acquire()
+    assert shed.value.reason == 'queue_full'
+    # The running request of about 2.5 s, rounded up to whole seconds
+    assert shed.value.retry_after == 3
+
+
+def test_expected_wait_above_the_target_is_shed():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, target_wait=0.1)
+    controller.acquire()
+    controller.release(0.2)
+    controller.acquire()
+
+    with pytest.raises(Overloaded) as shed:
+        controller.acquire()
+    assert shed.value.reason == 'expected_wait'
+
+
+def test_queued_request_is_shed_after_the_target_wait():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, target_wait=0.02)
+    controller.acquire()
+    results = []
+    queue_request(controller, results).join(5)
+
+    assert results == ['timeout']
+    assert controller.stats()['shed_timeout'] == 1
+
+
+def test_queued_request_waits_at_most_its_deadline():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, target_wait=5)
+    controller.acquire()
+    results = []
+    queue_request(controller, results, timeout=0.02).join(5)
+
+    assert results == ['deadline']
+    with pytest.raises(Overloaded) as shed:
+        controller.acquire(timeout=0)
+    assert shed.value.reason == 'deadline'
+
+
+def test_unsampled_requests_leave_the_service_time_out():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, target_wait=1, smoothing=0.5)
+    controller.acquire()
+    controller.release(None)
+    assert controller.stats()['service_time_ms'] is None
+
+    for service_time in (0.01, 0.03):
+        controller.acquire()
+        controller.release(service_time)
+    assert controller.stats()['service_time_ms'] == pytest.approx(20)
+
+
+def test_wait_idle_returns_once_the_last_request_is_released():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, target_wait=5)
+    controller.acquire()
+    threading.Timer(0.02, controller.release, (0.02,)).start()
+
+    start = time.monotonic()
+    controller.wait_idle(5)
+    assert time.monotonic() - start < 1
+    assert controller.stats()['active'] == 0
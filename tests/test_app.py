@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+
+import pytest
+
+import predictor
+
+
+@pytest.mark.parametrize('field, value', [('ROUTE', [91]), ('WEEK_DAY', {}), ('INCIDENT', ['Operational'])])
+def test_batch_reports_unhashable_values_per_row(client, row, field, value):
+    response = client.post('/predict/batch', json={'rows': [row, dict(row, **{field: value}), row]})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert results[0]['success'] and results[2]['success']
+    assert results[1] == {"success": False, "error": f"Unknown {field}: {value!r}"}
+
+
+@pytest.mark.parametrize('endpoint', ['/predict', '/predict/incidents'])
+@pytest.mark.parametrize('body', [[1, 2], 5, "row"])
+def test_non_object_body_is_rejected(client, endpoint, body):
+    response = client.post(endpoint, json=body)
+
+    assert response.status_code == 400
+    assert response.get_json() == {"success": False, "error": "Request body must be a JSON object"}
+
+
+def test_stream_reports_unexpected_errors_on_the_chunk_rows(client, row, monkeypatch, app_module):
+    def fail(row):
+        raise RuntimeError("validation failed")
+
+    monkeypatch.setattr(app_module, 'validate_row', fail)
+    body = '\n'.join(json.dumps(row) for _ in range(3))
+    response = client.post('/predict/stream', data=body, content_type='application/x-ndjson')
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines == [{"line": n, "success": False, "error": "validation failed"} for n in (1, 2, 3)]
+
+
+def test_stream_ends_with_an_error_line_when_scoring_fails(client, row, monkeypatch, app_module):
+    def fail(chunk, tier):
+        raise RuntimeError("scoring failed")
+
+    monkeypatch.setattr(app_module, 'score_stream_chunk', fail)
+    response = client.post('/predict/stream', data=json.dumps(row), content_type='application/x-ndjson')
+
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == json.dumps({"success": False, "error": "scoring failed"}) + '\n'
+
+
+@pytest.mark.parametrize('worker_threads, status', [(1, 409), (4, 200)])
+def test_profile_needs_several_request_threads(client, monkeypatch, app_module, worker_threads, status):
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(app_module, 'PROFILER_ENABLED', True)
+    monkeypatch.setitem(app_module.app.config, 'WORKER_THREADS', worker_threads)
+    response = client.post('/admin/profile', json={"seconds": 0.05}, headers={'X-Admin-Token': 'secret'})
+
+    assert response.status_code == status
+
+
+def test_tiers_are_served_when_configured(client, row, monkeypatch):
+    assert client.post('/predict?tier=fast', json=row).status_code == 200
+
+    monkeypatch.setattr(predictor.get_loaded_model(), 'tiers', {'full': None})
+    assert client.post('/predict?tier=fast', json=row).status_code == 404
+    assert client.post('/predict?tier=full', json=row).status_code == 200
+
+
+def test_identical_requests_keep_their_own_deadlines(client, row, monkeypatch, app_module):
+    if app_module.prediction_cache is None:
+        pytest.skip("Prediction cache disabled")
+    started = threading.Event()
+    calls = []
+
+    def slow_predict(row, tier):
+        calls.append(tier)
+        if len(calls) == 1:
+            started.set()
+            time.sleep(0.1)
+        app_module.check_deadline('inference')
+        return 1.0
+
+    # Loads the model, so the short deadline is only spent in the prediction
+    assert client.post('/predict', json=row).status_code == 200
+    monkeypatch.setattr(app_module, 'predict_one', slow_predict)
+    data = dict(row, TEMP=-12.34)
+    statuses = {}
+
+    def post(name, headers):
+        statuses[name] = app_module.app.test_client().post('/predict', json=data, headers=headers).status_code
+
+    first = threading.Thread(target=post, args=('short deadline', {'X-Request-Deadline-Ms': '50'}))
+    first.start()
+    assert started.wait(5)
+    second = threading.Thread(target=post, args=('long deadline', {'X-Request-Deadline-Ms': '5000'}))
+    second.start()
+    for thread in (first, second):
+        thread.join(5)
+
+    assert statuses == {'short deadline': 504, 'long deadline': 200}
+    assert len(calls) == 2
+
+
+def test_deadline_is_checked_between_encoding_and_inference(client, row, monkeypatch):
+    encode = predictor.preprocessing_batch
+
+    def slow_encode(rows, loaded=None):
+        time.sleep(0.1)
+        return encode(rows, loaded)
+
+    assert client.post('/predict/batch', json={'rows': [row]}).status_code == 200
+    monkeypatch.setattr(predictor, 'preprocessing_batch', slow_encode)
+    monkeypatch.setattr(predictor, 'SEASON_ROUTING', False)
+    response = client.post('/predict/batch', json={'rows': [row]}, headers={'X-Request-Deadline-Ms': '50'})
+
+    assert response.status_code == 504
+    assert response.get_json()['error'] == "Deadline exceeded before inference"
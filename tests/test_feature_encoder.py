@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+import predictor
+from feature_encoder import RowColumn, factorize
+from sample_inputs import load_sample_rows
+
+
+def test_factorize_numbers_values_in_order_of_appearance():
+    distinct, inverse = factorize(['b', 'a', 'b', 'c', 'a'])
+
+    assert distinct == ['b', 'a', 'c']
+    assert inverse.tolist() == [0, 1, 0, 2, 1]
+
+
+def test_row_column_reads_one_field_of_the_rows():
+    column = RowColumn([{'ROUTE': 7}, {'ROUTE': 9}], 'ROUTE')
+
+    assert len(column) == 2
+    assert list(column) == [7, 9]
+    assert column[1] == 9
+
+
+def test_encoder_matches_the_pandas_reference():
+    rows = load_sample_rows(2000)
+    reference = predictor.reference_preprocessing_batch(rows)
+    # The ColumnTransformer returns a sparse matrix
+    reference = reference.toarray() if hasattr(reference, 'toarray') else reference
+
+    np.testing.assert_allclose(predictor.preprocessing_batch(rows), reference, atol=1e-6)
+
+
+def test_encoder_reports_unknown_categories(row):
+    with pytest.raises(ValueError, match="unknown categories"):
+        predictor.preprocessing_batch([row, dict(row, ROUTE=-1)])
@@ -0,0 +1,33 @@
+import json
+from types import SimpleNamespace
+
+from predictor import LATENCY_TIERS_FILE, load_latency_tiers
+from tune_latency_tiers import choose_tiers
+
+CURVE = [
+    {'n_rounds': 10, 'mae_minutes': 13.0},
+    {'n_rounds': 50, 'mae_minutes': 10.5},
+    {'n_rounds': 90, 'mae_minutes': 10.1},
+    {'n_rounds': 100, 'mae_minutes': 10.0}
+]
+
+
+def test_tiers_get_the_fewest_rounds_within_tolerance():
+    assert choose_tiers(CURVE, {'fast': 0.1, 'balanced': 0.02}, 100) == {'fast': 50, 'balanced': 90, 'full': None}
+
+
+def test_truncations_more_accurate_than_the_full_model_are_kept():
+    curve = [dict(point, mae_minutes=point['n_rounds'] / 10) for point in CURVE]
+    assert choose_tiers(curve, {'fast': 0.1}, 100) == {'fast': 10, 'full': None}
+
+
+def test_tiers_needing_every_round_are_left_out():
+    assert choose_tiers(CURVE, {'fast': 0.1, 'balanced': 0.001}, 100) == {'fast': 50, 'full': None}
+
+
+def test_only_the_full_tier_without_tuning(tmp_path):
+    backend = SimpleNamespace(n_rounds=100)
+    assert load_latency_tiers(tmp_path, backend) == {'full': None}
+
+    (tmp_path / LATENCY_TIERS_FILE).write_text(json.dumps({'n_rounds': 100, 'tiers': {'fast': 50, 'full': None}}))
+    assert load_latency_tiers(tmp_path, backend) == {'full': None, 'fast': (0, 50)}
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from admission import DeadlineExceeded
+from micro_batcher import MicroBatcher
+
+
+def test_rows_expired_while_queued_are_not_scored():
+    scoring = threading.Event()
+    release = threading.Event()
+    batches = []
+
+    def predict_batch(rows):
+        batches.append(rows)
+        scoring.set()
+        release.wait(5)
+        return [float(row) for row in rows]
+
+    batcher = MicroBatcher(predict_batch, max_wait=0)
+    results = {}
+
+    def submit(row, timeout=None):
+        try:
+            results[row] = batcher.submit(row, timeout)
+        except DeadlineExceeded as e:
+            results[row] = e
+
+    # Row 1 occupies the batcher while rows 2 (10 ms left) and 3 (no deadline) queue
+    first = threading.Thread(target=submit, args=(1,))
+    first.start()
+    assert scoring.wait(5)
+    queued = [threading.Thread(target=submit, args=(2, 0.01)), threading.Thread(target=submit, args=(3,))]
+    for thread in queued:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in [first, *queued]:
+        thread.join(5)
+
+    assert batches == [[1], [3]]
+    assert results[1] == 1.0 and results[3] == 3.0
+    assert isinstance(results[2], DeadlineExceeded)
+    assert batcher.stats()['expired'] == 1
+
+
+def test_row_within_its_deadline_is_scored():
+    batcher = MicroBatcher(lambda rows: [2.0 * row for row in rows], max_wait=0)
+
+    assert batcher.submit(21, timeout=5) == pytest.approx(42.0)
+    assert batcher.stats()['expired'] == 0
+
+
+def test_window_follows_the_arrival_rate():
+    batcher = MicroBatcher(lambda rows: rows, max_batch_size=10, max_wait=0.002)
+
+    # Unknown or low traffic: score immediately
+    assert batcher.window(1) == 0.0
+    batcher.interarrival = 0.01
+    assert batcher.window(1) == 0.0
+    # Fill time at the observed rate, capped by max_wait
+    batcher.interarrival = 0.0001
+    assert batcher.window(5) == pytest.approx(0.0005)
+    batcher.interarrival = 0.001
+    assert batcher.window(1) == pytest.approx(0.002)
+    assert batcher.window(10) == 0.0
+
+
+def test_concurrent_rows_share_one_batch_and_its_error():
+    scoring = threading.Event()
+    release = threading.Event()
+    batches = []
+
+    def predict_batch(rows):
+        batches.append(rows)
+        scoring.set()
+        release.wait(5)
+        if len(batches) > 1:
+            raise RuntimeError("model failed")
+        return [0.0] * len(rows)
+
+    batcher = MicroBatcher(predict_batch, max_wait=0)
+    errors = []
+
+    def submit(row):
+        try:
+            batcher.submit(row)
+        except RuntimeError as e:
+            errors.append(e)
+
+    first = threading.Thread(target=submit, args=(0,))
+    first.start()
+    assert scoring.wait(5)
+    # Rows queued while the first batch is scored are coalesced into the next one
+    queued = [threading.Thread(target=submit, args=(row,)) for row in (1, 2, 3)]
+    for thread in queued:
+        thread.start()
+    while batcher.stats()['queued'] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in [first, *queued]:
+        thread.join(5)
+
+    assert batches[0] == [0] and sorted(batches[1]) == [1, 2, 3]
+    assert len(errors) == 3
+    assert batcher.stats()['largest_batch'] == 3 and batcher.stats()['errors'] == 1
@@ -0,0 +1,83 @@
+import pytest
+
+import predictor
+from model_registry import ModelRegistry
+
+
+class FakeModel:
+    def __init__(self, version, fail=False):
+        self.version = version
+        self.fail = fail
+
+    def warm_up(self):
+        if self.fail:
+            raise RuntimeError("broken artifact")
+
+
+@pytest.fixture
+def registry(tmp_path):
+    artifact = tmp_path / 'model.bin'
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    for version in ('v1', 'v2', 'v3'):
+        artifact.write_text(version)
+        registry.publish(version, [str(artifact)])
+    return registry
+
+
+@pytest.fixture
+def loaded_models(monkeypatch, registry):
+    """Versions of the test registry loaded as FakeModel, 'v3' failing its warm-up"""
+    monkeypatch.setattr(predictor, 'registry', registry)
+    monkeypatch.setattr(predictor, 'load_model_version', lambda version: FakeModel(version, fail=version == 'v3'))
+    monkeypatch.setattr(predictor, 'active_model', FakeModel('v1'))
+    monkeypatch.setitem(predictor.reload_state, 'error', None)
+    monkeypatch.setitem(predictor.watcher, 'failed', None)
+    registry.activate('v1')
+
+
+def test_publish_rejects_invalid_and_existing_versions(registry):
+    with pytest.raises(ValueError):
+        registry.publish('../v4', [])
+    with pytest.raises(ValueError):
+        registry.publish('v1', [])
+    assert registry.versions() == ['v1', 'v2', 'v3']
+
+
+def test_verify_detects_modified_artifacts(registry):
+    assert registry.verify('v1')['version'] == 'v1'
+    with open(registry.path('v1') + '/model.bin', 'w') as f:
+        f.write('tampered')
+    with pytest.raises(ValueError):
+        registry.verify('v1')
+
+
+def test_activate_and_rollback(loaded_models, registry):
+    assert predictor.activate_model('v2') == 'v2'
+    assert predictor.active_model.version == 'v2' and registry.current() == 'v2'
+
+    assert predictor.rollback_model() == 'v1'
+    assert predictor.active_model.version == 'v1' and registry.current() == 'v1'
+
+    with pytest.raises(KeyError):
+        predictor.activate_model('v9')
+
+
+def test_failed_activation_keeps_the_active_version(loaded_models, registry):
+    with pytest.raises(RuntimeError):
+        predictor.activate_model('v3')
+
+    assert predictor.active_model.version == 'v1' and registry.current() == 'v1'
+    assert predictor.reload_state['error'].startswith('v3')
+
+
+def test_watcher_reloads_versions_activated_elsewhere(loaded_models, registry):
+    assert predictor.check_registry() is None
+
+    registry.activate('v2')
+    assert predictor.check_registry() == 'v2'
+    assert predictor.active_model.version == 'v2'
+
+    # A version that failed to load is not retried until CURRENT changes
+    registry.activate('v3')
+    assert predictor.check_registry() is None
+    assert predictor.watcher['failed'] == 'v3' and predictor.active_model.version == 'v2'
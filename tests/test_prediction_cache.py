@@ -0,0 +1,167 @@
+import threading
+import time
+
+import pytest
+
+from admission import DeadlineExceeded
+from prediction_cache import PredictionCache, canonical_row
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_canonical_row_quantizes_numeric_fields(row):
+    key, canonical = canonical_row({**row, 'TEMP': 5.004, 'WIND_SPEED': '13'}, decimals=2)
+
+    assert canonical['TEMP'] == 5.0 and canonical['WIND_SPEED'] == 13.0
+    assert canonical['ROUTE'] == row['ROUTE']
+    assert canonical_row({**row, 'TEMP': 5.0, 'WIND_SPEED': 13})[0] == key
+
+
+def test_cached_prediction_is_that_of_the_rounded_row(client, row, app_module):
+    if app_module.prediction_cache is None:
+        pytest.skip("Prediction cache disabled")
+    precise = client.post('/predict', json={**row, 'TEMP': row['TEMP'] + 0.004}).get_json()['prediction']
+    app_module.prediction_cache.clear()
+    rounded = client.post('/predict', json=row).get_json()['prediction']
+
+    assert precise == rounded
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = PredictionCache(ttl=10, clock=clock)
+    calls = []
+
+    def compute():
+        calls.append(clock.now)
+        return len(calls)
+
+    assert cache.get_or_compute('key', compute) == 1
+    clock.now = 9
+    assert cache.get_or_compute('key', compute) == 1
+    clock.now = 11
+    assert cache.get_or_compute('key', compute) == 2
+    assert cache.stats()['expirations'] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PredictionCache(max_entries=2)
+    cache.get_or_compute('a', lambda: 1)
+    cache.get_or_compute('b', lambda: 2)
+    cache.get_or_compute('a', lambda: None)
+    cache.get_or_compute('c', lambda: 3)
+
+    assert list(cache.entries) == ['a', 'c']
+    assert cache.stats()['evictions'] == 1
+
+
+def test_memory_cap_evicts_entries():
+    cache = PredictionCache(max_bytes=1)
+    cache.get_or_compute('a', lambda: 1.0)
+
+    assert cache.stats()['entries'] == 0 and cache.stats()['bytes'] == 0
+
+
+def test_version_change_drops_every_entry():
+    version = ['v1']
+    cache = PredictionCache(version_func=lambda: version[0])
+    cache.get_or_compute('a', lambda: 1)
+    version[0] = 'v2'
+
+    assert cache.get_or_compute('a', lambda: 2) == 2
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_concurrent_misses_share_one_computation_and_its_error():
+    cache = PredictionCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        raise RuntimeError("model failed")
+
+    errors = []
+
+    def request():
+        try:
+            cache.get_or_compute('a', compute)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=request)
+    leader.start()
+    assert started.wait(5)
+    follower = threading.Thread(target=request)
+    follower.start()
+    while not cache.stats()['deduplicated']:
+        time.sleep(0.001)
+    release.set()
+    for thread in (leader, follower):
+        thread.join(5)
+
+    assert len(calls) == 1 and len(errors) == 2
+    assert cache.stats()['in_flight'] == 0 and cache.stats()['entries'] == 0
+
+
+def test_follower_recomputes_when_the_leader_runs_out_of_time():
+    cache = PredictionCache()
+    started = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        if len(calls) == 1:
+            started.set()
+            time.sleep(0.05)
+            raise DeadlineExceeded('inference')
+        return 42.0
+
+    results = {}
+
+    def request(name, timeout):
+        try:
+            results[name] = cache.get_or_compute('a', compute, timeout)
+        except DeadlineExceeded as e:
+            results[name] = e
+
+    leader = threading.Thread(target=request, args=('leader', 0.01))
+    leader.start()
+    assert started.wait(5)
+    follower = threading.Thread(target=request, args=('follower', None))
+    follower.start()
+    for thread in (leader, follower):
+        thread.join(5)
+
+    assert isinstance(results['leader'], DeadlineExceeded)
+    assert results['follower'] == 42.0 and len(calls) == 2
+
+
+def test_follower_waits_at_most_its_own_deadline():
+    cache = PredictionCache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(5)
+        return 1.0
+
+    leader = threading.Thread(target=cache.get_or_compute, args=('a', compute))
+    leader.start()
+    assert started.wait(5)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        cache.get_or_compute('a', compute, timeout=0.02)
+    assert time.monotonic() - start < 1
+    release.set()
+    leader.join(5)
@@ -0,0 +1,53 @@
+import time
+
+import numpy as np
+import pytest
+
+from admission import AdmissionController
+
+
+@pytest.fixture
+def lanes(monkeypatch, app_module):
+    lanes = {
+        'interactive': AdmissionController(max_concurrency=1, max_queue=0, target_wait=1),
+        'bulk': AdmissionController(max_concurrency=1, max_queue=0, target_wait=1)
+    }
+    monkeypatch.setattr(app_module, 'lanes', lanes)
+    return lanes
+
+
+def test_bulk_requests_do_not_take_interactive_slots(client, row, lanes):
+    lanes['interactive'].acquire()
+
+    assert client.post('/predict', json=row).status_code == 503
+    assert client.post('/predict/batch', json={'rows': [row, row]}).status_code == 200
+    assert lanes['bulk'].stats()['admitted'] == 1
+
+
+def test_bulk_work_yields_while_interactive_requests_run(monkeypatch, app_module, lanes):
+    monkeypatch.setattr(app_module, 'BULK_SHARE', 0.5)
+
+    start = time.monotonic()
+    app_module.yield_to_interactive(0.05)
+    assert time.monotonic() - start < 0.04
+
+    # With a 50% share, a 50 ms chunk waits up to 50 ms for interactive requests to drain
+    lanes['interactive'].acquire()
+    start = time.monotonic()
+    app_module.yield_to_interactive(0.05)
+    assert 0.04 < time.monotonic() - start < 1
+
+
+def test_bulk_rows_are_scored_in_chunks(monkeypatch, app_module, lanes):
+    monkeypatch.setattr(app_module, 'BULK_CHUNK_SIZE', 4)
+    chunks = []
+
+    def score_rows(start, end):
+        chunks.append((start, end))
+        return np.arange(start, end, dtype=float)
+
+    with app_module.app.test_request_context('/predict/batch', method='POST'):
+        predictions = app_module.score_in_chunks(score_rows, 10)
+
+    assert chunks == [(0, 4), (4, 8), (8, 10)]
+    assert predictions.tolist() == list(range(10))
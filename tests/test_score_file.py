@@ -0,0 +1,53 @@
+import pandas as pd
+import pyarrow.parquet
+import pytest
+
+from predictor import INPUT_FIELDS
+from sample_inputs import load_sample_rows
+from score_file import score_file
+
+
+@pytest.fixture
+def input_rows():
+    """200 rows, the only invalid one in the second chunk of 100"""
+    rows = pd.DataFrame(load_sample_rows(200))
+    rows.loc[150, 'ROUTE'] = -1
+    return rows
+
+
+@pytest.mark.parametrize('output_name', ['scored.parquet', 'scored.csv'])
+def test_errors_only_in_a_later_chunk(tmp_path, input_rows, output_name):
+    input_file = tmp_path / 'input.csv'
+    input_rows.to_csv(input_file, index=False)
+    output_file = str(tmp_path / output_name)
+
+    score_file(str(input_file), output_file, chunk_size=100, workers=1)
+
+    scored = pd.read_parquet(output_file) if output_name.endswith('.parquet') else pd.read_csv(output_file)
+    assert len(scored) == 200
+    assert scored['error'].notna().tolist() == [index == 150 for index in range(200)]
+    assert scored['error'][150] == "Unknown ROUTE: -1"
+    assert scored['prediction'].isna().sum() == 1
+
+
+def test_empty_parquet_input(tmp_path):
+    input_file = str(tmp_path / 'input.parquet')
+    pd.DataFrame(load_sample_rows(10)).iloc[:0].to_parquet(input_file, index=False)
+    output_file = str(tmp_path / 'scored.parquet')
+
+    score_file(input_file, output_file, workers=1)
+
+    schema = pyarrow.parquet.read_schema(output_file)
+    assert schema.names == INPUT_FIELDS + ['prediction', 'error']
+    assert schema.field('error').type == pyarrow.string()
+    assert pyarrow.parquet.read_metadata(output_file).num_rows == 0
+
+
+def test_header_only_csv_input(tmp_path):
+    input_file = tmp_path / 'input.csv'
+    input_file.write_text(','.join(INPUT_FIELDS) + '\n')
+    output_file = tmp_path / 'scored.csv'
+
+    score_file(str(input_file), str(output_file), workers=1)
+
+    assert output_file.read_text().splitlines() == [','.join(INPUT_FIELDS + ['prediction', 'error'])]
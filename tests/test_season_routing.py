@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import predictor
+
+
+class FakeModel:
+    """A model scoring every row with the same value, knowing only some routes and incidents"""
+
+    def __init__(self, value, routes=(), incidents=(), seasons=None):
+        self.value = value
+        self.encoder = SimpleNamespace(nominal_lookup={
+            'ROUTE': dict.fromkeys(routes), 'INCIDENT': dict.fromkeys(incidents)
+        })
+        self.seasons = seasons or {}
+
+    def season_model(self, season):
+        return self.seasons.get(season)
+
+
+@pytest.fixture
+def scored_by_model(monkeypatch):
+    monkeypatch.setattr(predictor, 'preprocessing_columns', lambda columns, loaded: columns['ROUTE'])
+    monkeypatch.setattr(predictor, 'score', lambda rows, loaded, tier: np.full(len(rows), loaded.value))
+
+
+def columns(months, routes, incidents):
+    return {
+        'LOCAL_MONTH': np.array(months, dtype=np.float64),
+        'ROUTE': list(routes),
+        'INCIDENT': list(incidents)
+    }
+
+
+def test_rows_go_to_the_model_of_their_season(scored_by_model):
+    summer = FakeModel(1.0, routes=[10, 11], incidents=['Operational'])
+    winter = FakeModel(2.0, routes=[10], incidents=['Operational'])
+    loaded = FakeModel(0.0, seasons={'Summer': summer, 'Winter': winter})
+    rows = columns([7, 1, 6, 12], [10, 10, 11, 10], ['Operational'] * 4)
+
+    assert predictor.predict_by_season(rows, loaded).tolist() == [1.0, 2.0, 1.0, 2.0]
+
+
+def test_unknown_categories_and_missing_seasons_use_the_global_model(scored_by_model):
+    summer = FakeModel(1.0, routes=[10], incidents=['Operational'])
+    loaded = FakeModel(0.0, seasons={'Summer': summer})
+    rows = columns([7, 7, 7, 1], [10, 99, 10, 10], ['Operational', 'Operational', 'Security', 'Operational'])
+
+    assert predictor.predict_by_season(rows, loaded).tolist() == [1.0, 0.0, 0.0, 0.0]
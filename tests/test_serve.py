@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+
+# Loads the app like the Gunicorn master does, then lists the running threads
+MASTER_THREADS = """
+import sys, threading
+sys.path.insert(0, sys.argv[1])
+import serve
+serve.PredictionServer.load(object.__new__(serve.PredictionServer))
+print(' '.join(thread.name for thread in threading.enumerate()))
+"""
+
+
+def test_master_does_not_watch_the_registry():
+    env = dict(os.environ, PREDICTION_MODEL_WATCH_INTERVAL='5')
+    output = subprocess.run(
+        [sys.executable, '-c', MASTER_THREADS, MODELS_DIR], env=env, check=True, capture_output=True, text=True
+    ).stdout
+
+    assert 'registry-watcher' not in output.split()
@@ -0,0 +1,41 @@
+import time
+
+from snapshot import SnapshotManager, advance_hours, weather_hour
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_advance_hours_crosses_midnight(row):
+    payload = weather_hour({**row, 'LOCAL_TIME': '23:40:00', 'WEEK_DAY': 'Sunday', 'LOCAL_MONTH': 12, 'LOCAL_DAY': 31})
+    moved = advance_hours(payload, 2, 2023)
+
+    assert (moved['LOCAL_TIME'], moved['WEEK_DAY'], moved['LOCAL_MONTH'], moved['LOCAL_DAY']) == ('01:00:00', 'Monday', 1, 1)
+    assert moved['TEMP'] == payload['TEMP']
+
+
+def test_snapshot_follows_the_model_version_and_the_hour(row):
+    version = ['v1']
+    now = [3600 * 1000 + 10]
+    computed = []
+
+    def compute(payload):
+        computed.append(payload)
+        return [1], ['Operational'], [[float(len(computed))]]
+
+    manager = SnapshotManager(compute, lambda: version[0], refresh_interval=0.01, clock=lambda: now[0])
+    assert manager.submit(row)
+    wait_for(lambda: manager.current() is not None)
+    assert not manager.refresh()
+
+    version[0] = 'v2'
+    wait_for(lambda: manager.current().model_version == 'v2')
+    assert manager.current().payload == computed[0]
+
+    now[0] += 3600
+    wait_for(lambda: len(computed) == 3)
+    assert computed[2]['LOCAL_TIME'] == advance_hours(computed[0], 1, 2023)['LOCAL_TIME']